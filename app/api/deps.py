@@ -0,0 +1,12 @@
+from fastapi import Request
+
+from app.services.product_catalog import ProductCatalog
+from app.settings import Settings
+
+
+async def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
+
+
+async def get_product_catalog(request: Request) -> ProductCatalog:
+    return request.app.state.product_catalog
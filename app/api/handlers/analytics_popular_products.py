@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.deps import get_session
+from app.api.deps import get_settings
+from app.database.deps import get_read_session
 from app.redis.deps import get_redis
 from app.services.analytics_service import AnalyticsService
+from app.settings import Settings
+from app.utils.json_response import conditional_json_response
 
 router = APIRouter(tags=["Analytics"])
 
 
 @router.get("/analytics/popular-products")
 async def get_popular_products(
-    session: AsyncSession = Depends(get_session),
+    days: int = Query(AnalyticsService.DEFAULT_DAYS, ge=1, le=30),
+    limit: int = Query(AnalyticsService.DEFAULT_LIMIT, ge=1, le=50),
+    if_none_match: str | None = Header(None),
+    session: AsyncSession = Depends(get_read_session),
     redis: Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
 ):
-    service = AnalyticsService(session, redis)
-    return await service.get_popular()
+    service = AnalyticsService(session, redis, settings.services)
+    return await conditional_json_response(
+        if_none_match,
+        lambda: service.get_popular_version(days, limit),
+        lambda: service.get_popular_versioned(days, limit),
+    )
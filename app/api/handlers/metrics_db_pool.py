@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.deps import get_engine
+from app.database.engine import MeteredPool
+from app.exceptions.database import PoolMetricsUnavailableError
+from app.schemas.metrics import PoolMetricsSchema
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics/db-pool", response_model=PoolMetricsSchema)
+async def db_pool_metrics(engine: AsyncEngine = Depends(get_engine)):
+    # метрики одного процесса: при нескольких воркерах uvicorn их собирают
+    # с каждого
+    if not isinstance(engine.pool, MeteredPool):
+        raise PoolMetricsUnavailableError()
+    return engine.pool.metrics()
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, status
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.deps import get_session
+from app.api.deps import get_product_catalog, get_settings
+from app.database.deps import get_session, pin_user_to_primary
 from app.redis.deps import get_redis
+from app.services.product_catalog import ProductCatalog
 from app.services.purchase_service import PurchaseService
-from app.utils.rate_limiter import simple_rate_limit
+from app.settings import Settings
+from app.utils.idempotency import Idempotency
+from app.utils.rate_limiter import simple_rate_limit, user_or_ip
 
 router = APIRouter(tags=["Products"])
 
@@ -14,10 +18,18 @@ router = APIRouter(tags=["Products"])
 async def purchase(
     product_id: int,
     user_id: int,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
-    _rl=Depends(simple_rate_limit(5, 60)),
+    settings: Settings = Depends(get_settings),
+    catalog: ProductCatalog = Depends(get_product_catalog),
+    _rl=Depends(simple_rate_limit(5, 60, key_func=user_or_ip)),
+    _idem=Depends(Idempotency("purchase", required=False)),
+    _pin=Depends(pin_user_to_primary),
 ):
-    service = PurchaseService(session, redis)
+    service = PurchaseService(session, redis, settings.services, catalog)
     result = await service.purchase(user_id, product_id)
+    if "purchase_id" in result:
+        # асинхронный режим: покупка принята в очередь, статус — по purchase_id
+        response.status_code = status.HTTP_202_ACCEPTED
     return result
@@ -2,10 +2,14 @@ from fastapi import APIRouter, Depends, Query
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.deps import get_session
+from app.api.deps import get_product_catalog, get_settings
+from app.database.deps import get_session, pin_user_to_primary
 from app.redis.deps import get_redis
+from app.services.product_catalog import ProductCatalog
 from app.services.product_service import ProductUseService
-from app.utils.rate_limiter import simple_rate_limit
+from app.settings import Settings
+from app.utils.idempotency import Idempotency
+from app.utils.rate_limiter import simple_rate_limit, user_or_ip
 
 router = APIRouter(tags=["Products"])
 
@@ -16,8 +20,12 @@ async def use_consumable(
     user_id: int = Query(...),
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
-    _rl=Depends(simple_rate_limit(5, 60)),
+    settings: Settings = Depends(get_settings),
+    catalog: ProductCatalog = Depends(get_product_catalog),
+    _rl=Depends(simple_rate_limit(5, 60, key_func=user_or_ip)),
+    _idem=Depends(Idempotency("use", required=False)),
+    _pin=Depends(pin_user_to_primary),
 ):
-    service = ProductUseService(session, redis)
+    service = ProductUseService(session, redis, settings.services, catalog)
     result = await service.use_product(user_id, product_id)
     return result
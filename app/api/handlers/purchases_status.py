@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_product_catalog, get_settings
+from app.database.deps import get_session
+from app.redis.deps import get_redis
+from app.schemas.purchase import PurchaseStatusSchema
+from app.services.product_catalog import ProductCatalog
+from app.services.purchase_service import PurchaseService
+from app.settings import Settings
+
+router = APIRouter(tags=["Products"])
+
+
+@router.get("/purchases/{purchase_id}", response_model=PurchaseStatusSchema)
+async def purchase_status(
+    purchase_id: str,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
+    catalog: ProductCatalog = Depends(get_product_catalog),
+):
+    service = PurchaseService(session, redis, settings.services, catalog)
+    return await service.get_status(purchase_id)
@@ -3,16 +3,24 @@ from fastapi import APIRouter
 from app.api.handlers import (
     analytics_popular_products,
     life_handler,
+    metrics_db_pool,
     products_purchase,
     products_use,
+    purchases_status,
     users_add_funds,
     users_inventory,
+    users_inventory_batch,
+    users_purchases_batch,
 )
 
 api_router = APIRouter()
 api_router.include_router(life_handler.router)
 api_router.include_router(products_purchase.router)
 api_router.include_router(products_use.router)
+api_router.include_router(purchases_status.router)
 api_router.include_router(users_inventory.router)
+api_router.include_router(users_inventory_batch.router)
 api_router.include_router(users_add_funds.router)
+api_router.include_router(users_purchases_batch.router)
 api_router.include_router(analytics_popular_products.router)
+api_router.include_router(metrics_db_pool.router)
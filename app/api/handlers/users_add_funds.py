@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel, ConfigDict, Field
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.deps import get_session
+from app.api.deps import get_settings
+from app.database.deps import get_session, pin_user_to_primary
 from app.redis.deps import get_redis
 from app.services.user_service import UserService
-from app.utils.rate_limiter import simple_rate_limit
+from app.settings import Settings
+from app.utils.idempotency import Idempotency
+from app.utils.rate_limiter import simple_rate_limit, user_or_ip
 
 router = APIRouter(tags=["Users"])
 
@@ -26,17 +29,15 @@ class UserBalanceResponse(BaseModel):
 async def add_funds(
     user_id: int,
     data: AddFundsDTO,
-    idempotency_key: str = Header(..., alias="Idempotency-Key"),
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
-    _rl=Depends(simple_rate_limit(5, 60)),
+    settings: Settings = Depends(get_settings),
+    _rl=Depends(simple_rate_limit(5, 60, key_func=user_or_ip)),
+    _idem=Depends(Idempotency("add-funds")),
+    _pin=Depends(pin_user_to_primary),
 ):
-    service = UserService(session, redis)
+    service = UserService(session, redis, settings.services)
 
-    user = await service.add_funds(
-        user_id=user_id,
-        amount=data.amount,
-        idem_key=idempotency_key,
-    )
+    balance = await service.add_funds(user_id=user_id, amount=data.amount)
 
-    return UserBalanceResponse.model_validate(user).model_dump()
+    return UserBalanceResponse(user_id=user_id, new_balance=balance).model_dump()
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.deps import get_session
+from app.api.deps import get_settings
+from app.database.deps import get_user_read_session
 from app.redis.deps import get_redis
 from app.schemas.inventar import InventorySchema
 from app.services.inventory_service import InventoryService
+from app.settings import Settings
+from app.utils.json_response import conditional_json_response
 
 router = APIRouter(tags=["Users"])
 
@@ -13,8 +16,15 @@ router = APIRouter(tags=["Users"])
 @router.get("/users/{user_id}/inventory", response_model=InventorySchema)
 async def get_inventory(
     user_id: int,
-    session: AsyncSession = Depends(get_session),
+    if_none_match: str | None = Header(None),
+    session: AsyncSession = Depends(get_user_read_session),
     redis: Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
 ):
-    service = InventoryService(session, redis)
-    return await service.get_inventory(user_id)
+    service = InventoryService(session, redis, settings.services)
+    # response_model — для схемы OpenAPI: готовый JSON отдаётся как есть
+    return await conditional_json_response(
+        if_none_match,
+        lambda: service.get_inventory_version(user_id),
+        lambda: service.get_inventory_versioned(user_id),
+    )
@@ -0,0 +1,46 @@
+from typing import AsyncGenerator
+
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel, Field
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_settings
+from app.database.deps import get_session, users_read_session
+from app.redis.deps import get_redis
+from app.schemas.inventar import InventorySchema
+from app.services.inventory_service import InventoryService
+from app.settings import Settings
+from app.utils.json_response import json_response
+
+router = APIRouter(tags=["Users"])
+
+
+class InventoryBatchDTO(BaseModel):
+    user_ids: list[int] = Field(..., min_length=1, max_length=200)
+
+
+async def get_users_read_session(
+    data: InventoryBatchDTO,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+) -> AsyncGenerator[AsyncSession, None]:
+    async with users_read_session(request, session, redis, data.user_ids) as routed:
+        yield routed
+
+
+@router.post("/users/inventory:batch", response_model=dict[int, InventorySchema])
+async def get_inventory_batch(
+    data: InventoryBatchDTO,
+    session: AsyncSession = Depends(get_users_read_session),
+    redis: Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
+):
+    service = InventoryService(session, redis, settings.services)
+    inventories = await service.get_inventories_json(list(dict.fromkeys(data.user_ids)))
+    # документы из кэша склеиваются в объект как есть, без разбора
+    body = ",".join(
+        f'"{user_id}":{document}' for user_id, document in inventories.items()
+    )
+    return json_response(f"{{{body}}}")
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_product_catalog, get_settings
+from app.database.deps import get_session, pin_user_to_primary
+from app.redis.deps import get_redis
+from app.services.product_catalog import ProductCatalog
+from app.services.purchase_service import PurchaseService
+from app.settings import Settings
+from app.utils.idempotency import Idempotency
+from app.utils.rate_limiter import simple_rate_limit, user_or_ip
+
+router = APIRouter(tags=["Users"])
+
+
+class PurchaseItemDTO(BaseModel):
+    product_id: int
+    quantity: int = Field(1, gt=0, le=100)
+
+
+class PurchaseBatchDTO(BaseModel):
+    items: list[PurchaseItemDTO] = Field(..., min_length=1, max_length=50)
+
+
+@router.post("/users/{user_id}/purchases:batch")
+async def purchase_batch(
+    user_id: int,
+    data: PurchaseBatchDTO,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
+    catalog: ProductCatalog = Depends(get_product_catalog),
+    _rl=Depends(simple_rate_limit(5, 60, key_func=user_or_ip)),
+    _idem=Depends(Idempotency("purchases-batch", required=False)),
+    _pin=Depends(pin_user_to_primary),
+):
+    service = PurchaseService(session, redis, settings.services, catalog)
+    return await service.purchase_batch(
+        user_id, [(item.product_id, item.quantity) for item in data.items]
+    )
@@ -10,3 +10,8 @@ class APISettings(BaseSettings):
     name: str = Field("Application name API")
     debug: bool = Field(False)
     version: str = Field("0.1.0")
+
+    # локальный уровень лимитера: отказы без похода в Redis, аренда лимита пачками
+    rate_limit_local: bool = Field(False)
+    rate_limit_local_max_keys: int = Field(10_000)
+    rate_limit_local_max_lease: int = Field(10)
@@ -20,5 +20,27 @@ celery_app.conf.beat_schedule = {
     "clear-inventory-cache-daily": {
         "task": "app.background.tasks.clear_inventory_cache.clear_inventory_cache",
         "schedule": crontab(hour=3, minute=0),
-    }
+    },
+    "maintain-transaction-partitions-daily": {
+        "task": "app.background.tasks.maintain_transaction_partitions"
+        ".maintain_transaction_partitions",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "compact-balance-snapshots": {
+        "task": "app.background.tasks.compact_balance_snapshots"
+        ".compact_balance_snapshots",
+        "schedule": crontab(minute="*/5"),
+    },
+    # асинхронные покупки (SERVICE_PURCHASE_MODE=async); при пустой очереди
+    # запуск — один XAUTOCLAIM и один XREADGROUP
+    "settle-purchases": {
+        "task": "app.background.tasks.settle_purchases.settle_purchases",
+        "schedule": 2.0,
+    },
+    # outbox (SERVICE_OUTBOX_ENABLED=true): задержка обновления кэшей
+    # после коммита — не больше интервала запуска
+    "relay-outbox": {
+        "task": "app.background.tasks.relay_outbox.relay_outbox",
+        "schedule": 1.0,
+    },
 }
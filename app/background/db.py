@@ -0,0 +1,38 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database.engine import create_engine
+from app.database.replica import ReadYourWrites
+from app.database.settings import DBSettings
+from app.redis.client import close_redis, create_redis
+from app.redis.settings import RedisSettings
+
+
+@asynccontextmanager
+async def task_session() -> AsyncIterator[AsyncSession]:
+    """Сессия для задачи Celery: свой движок на один asyncio.run, без пула."""
+    engine = create_engine(DBSettings(), pooled=False)
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+def task_read_your_writes(redis: Redis) -> ReadYourWrites | None:
+    """Метки primary для пользователей, за которых пишет задача; None без реплики."""
+    settings = DBSettings()
+    return ReadYourWrites(redis, settings) if settings.replica_url else None
+
+
+@asynccontextmanager
+async def task_redis() -> AsyncIterator[Redis]:
+    """Асинхронный клиент Redis на один asyncio.run."""
+    redis = await create_redis(RedisSettings())
+    try:
+        yield redis
+    finally:
+        await close_redis(redis)
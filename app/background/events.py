@@ -0,0 +1,99 @@
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.services.event_stream import Event
+from app.services.settings import ServiceSettings
+
+EventHandler = Callable[[list[Event]], Awaitable[None]]
+
+
+class EventConsumer:
+    """Чтение потока доменных событий через consumer group.
+
+    Каждая группа (аналитика, антифрод, экспорт) получает все события и
+    хранит свою позицию в Redis; потребители одной группы делят события
+    между собой. Событие считается обработанным после ack; неподтверждённые
+    события упавшего потребителя через `claim_idle_ms` забирает другой.
+    Доставка «хотя бы один раз»: обработчик должен переносить повторы.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        group: str,
+        consumer: str,
+        settings: ServiceSettings | None = None,
+        claim_idle_ms: int = 60_000,
+    ):
+        self.redis = redis
+        self.group = group
+        self.consumer = consumer
+        self.settings = settings or ServiceSettings()
+        self.stream = self.settings.events_stream
+        self.claim_idle_ms = claim_idle_ms
+
+    async def ensure_group(self, offset: str = "$"):
+        """Создаёт группу; по умолчанию она читает только новые события."""
+        try:
+            await self.redis.xgroup_create(
+                self.stream, self.group, id=offset, mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    async def read(self, count: int = 100, block_ms: int | None = None) -> list[Event]:
+        """Пачка событий: сначала зависшие у упавших потребителей, затем новые."""
+        _, entries, *_ = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms, count=count
+        )
+        if not entries:
+            response = await self.redis.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=count,
+                block=block_ms,
+            )
+            entries = response[0][1] if response else []
+
+        return [Event.from_entry(entry_id, fields) for entry_id, fields in entries]
+
+    async def ack(self, events: list[Event]):
+        if events:
+            await self.redis.xack(
+                self.stream, self.group, *(event.id for event in events)
+            )
+
+    async def consume(
+        self, handler: EventHandler, count: int = 100, max_batches: int = 50
+    ) -> int:
+        """Читает и подтверждает пачки, пока поток не опустеет.
+
+        Пачка подтверждается только после успешного handler; при ошибке она
+        останется в pending группы и будет прочитана снова.
+        """
+        consumed = 0
+        for _ in range(max_batches):
+            events = await self.read(count)
+            if not events:
+                break
+            await handler(events)
+            await self.ack(events)
+            consumed += len(events)
+        return consumed
+
+    async def seek(self, offset: str):
+        """Переставляет позицию группы: следующее чтение начнётся после `offset`.
+
+        `offset` — id записи потока ("0" — с начала, "$" — только новые).
+        События старше обрезки MAXLEN повторить уже нельзя.
+        """
+        await self.redis.xgroup_setid(self.stream, self.group, offset)
+
+    async def replay(self, offset: str = "0", count: int = 100) -> list[Event]:
+        """События после `offset` без группы и ack — для выгрузок и отладки."""
+        entries = await self.redis.xrange(self.stream, min=f"({offset}", count=count)
+        return [Event.from_entry(entry_id, fields) for entry_id, fields in entries]
@@ -1,3 +1,17 @@
-__all__ = ["clear_inventory_cache"]
+__all__ = [
+    "clear_inventory_cache",
+    "compact_balance_snapshots",
+    "invalidate_product_cache",
+    "maintain_transaction_partitions",
+    "relay_outbox",
+    "reshard_user_balance",
+    "settle_purchases",
+]
 
 from .clear_inventory_cache import clear_inventory_cache
+from .compact_balance_snapshots import compact_balance_snapshots
+from .invalidate_product_cache import invalidate_product_cache
+from .maintain_transaction_partitions import maintain_transaction_partitions
+from .relay_outbox import relay_outbox
+from .reshard_user_balance import reshard_user_balance
+from .settle_purchases import settle_purchases
@@ -16,19 +16,25 @@ def clear_inventory_cache():
     start = time.perf_counter()
     logger.info("🔥 Starting inventory cache cleanup…")
 
-    cursor = 0
-    pattern = "user:*:inventory"
     deleted = 0
 
-    while True:
-        cursor, keys = redis.scan(cursor=cursor, match=pattern, count=100)
+    # JSON-документы с версиями строк и hash-бэкенд инвентаря
+    for pattern in (
+        "user:*:inventory",
+        "user:*:inventory:rows",
+        "user:*:inventory:hash",
+    ):
+        cursor = 0
 
-        if keys:
-            redis.delete(*keys)
-            deleted += len(keys)
+        while True:
+            cursor, keys = redis.scan(cursor=cursor, match=pattern, count=100)
 
-        if cursor == 0:
-            break
+            if keys:
+                redis.delete(*keys)
+                deleted += len(keys)
+
+            if cursor == 0:
+                break
 
     elapsed = round(time.perf_counter() - start, 3)
 
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from app.background.celery_app import celery_app
+from app.background.db import task_session
+from app.services.balance_snapshot_service import BalanceSnapshotService
+
+logger = logging.getLogger(__name__)
+
+
+async def _compact() -> int:
+    async with task_session() as session:
+        return await BalanceSnapshotService(session).compact()
+
+
+@celery_app.task
+def compact_balance_snapshots():
+    compacted = asyncio.run(_compact())
+
+    logger.info(f"Balance snapshots compacted. Users={compacted}.")
+
+    return {"status": "ok", "compacted": compacted}
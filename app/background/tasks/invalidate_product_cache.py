@@ -0,0 +1,22 @@
+import logging
+
+import redis
+
+from app.background.celery_app import celery_app
+from app.redis.settings import RedisSettings
+from app.services.product_catalog import ProductCatalog
+
+logger = logging.getLogger(__name__)
+redis_settings = RedisSettings()
+redis = redis.Redis.from_url(redis_settings.url)
+
+
+@celery_app.task
+def invalidate_product_cache(product_id: int):
+    """Сбрасывает товар в каталоге всех воркеров после его изменения."""
+    redis.delete(ProductCatalog.key(product_id))
+    receivers = redis.publish(ProductCatalog.INVALIDATION_CHANNEL, product_id)
+
+    logger.info(f"Product {product_id} invalidated, receivers={receivers}")
+
+    return {"status": "ok", "product_id": product_id, "receivers": receivers}
@@ -0,0 +1,25 @@
+import asyncio
+import logging
+
+from app.background.celery_app import celery_app
+from app.background.db import task_session
+from app.services.partition_service import TransactionPartitionService
+
+logger = logging.getLogger(__name__)
+
+
+async def _maintain() -> dict[str, list[str]]:
+    async with task_session() as session:
+        return await TransactionPartitionService(session).maintain()
+
+
+@celery_app.task
+def maintain_transaction_partitions():
+    result = asyncio.run(_maintain())
+
+    logger.info(
+        f"Transaction partitions maintained. "
+        f"Created={result['created']}, archived={result['archived']}."
+    )
+
+    return {"status": "ok", **result}
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+
+from app.background.celery_app import celery_app
+from app.background.db import task_read_your_writes, task_redis, task_session
+from app.services.outbox import OutboxRelay
+
+logger = logging.getLogger(__name__)
+
+# не держим воркер дольше интервала beat, остальное заберёт следующий запуск
+MAX_BATCHES = 20
+
+
+async def _relay() -> int:
+    relayed = 0
+
+    async with task_session() as session, task_redis() as redis:
+        relay = OutboxRelay(
+            session, redis, read_your_writes=task_read_your_writes(redis)
+        )
+
+        for _ in range(MAX_BATCHES):
+            processed = await relay.relay()
+            if not processed:
+                break
+            relayed += processed
+
+    return relayed
+
+
+@celery_app.task
+def relay_outbox():
+    relayed = asyncio.run(_relay())
+
+    if relayed:
+        logger.info(f"Outbox relayed. Events={relayed}.")
+
+    return {"status": "ok", "relayed": relayed}
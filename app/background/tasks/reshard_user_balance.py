@@ -0,0 +1,29 @@
+import asyncio
+import logging
+
+from app.background.celery_app import celery_app
+from app.background.db import task_session
+from app.repositories.balance_repository import BalanceShardRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def _reshard(user_id: int, shards: int) -> int | None:
+    async with task_session() as session:
+        async with session.begin():
+            return await BalanceShardRepository(session).reshard(user_id, shards)
+
+
+@celery_app.task
+def reshard_user_balance(user_id: int, shards: int):
+    """Раскладывает баланс пользователя на `shards` шардов (0 — убрать шарды).
+
+    Шарды используются при SERVICE_BALANCE_BACKEND=sharded.
+    """
+    balance = asyncio.run(_reshard(user_id, shards))
+    if balance is None:
+        return {"status": "not_found", "user_id": user_id}
+
+    logger.info(f"User {user_id} balance split into {shards} shards.")
+
+    return {"status": "ok", "user_id": user_id, "shards": shards, "balance": balance}
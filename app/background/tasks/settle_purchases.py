@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import os
+import socket
+
+from app.background.celery_app import celery_app
+from app.background.db import task_read_your_writes, task_redis, task_session
+from app.services.purchase_settlement_service import PurchaseSettlementService
+
+logger = logging.getLogger(__name__)
+
+# не держим воркер дольше интервала beat, остальное заберёт следующий запуск
+MAX_BATCHES = 50
+
+
+async def _settle() -> int:
+    consumer = f"{socket.gethostname()}:{os.getpid()}"
+    settled = 0
+
+    async with task_session() as session, task_redis() as redis:
+        service = PurchaseSettlementService(
+            session, redis, read_your_writes=task_read_your_writes(redis)
+        )
+        await service.queue.ensure_group()
+
+        for _ in range(MAX_BATCHES):
+            processed = await service.settle(consumer)
+            if not processed:
+                break
+            settled += processed
+
+    return settled
+
+
+@celery_app.task
+def settle_purchases():
+    settled = asyncio.run(_settle())
+
+    if settled:
+        logger.info(f"Purchases settled. Entries={settled}.")
+
+    return {"status": "ok", "settled": settled}
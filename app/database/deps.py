@@ -1,11 +1,87 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Iterable
 
-from fastapi import Request
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, Request
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database.replica import ReadYourWrites, ReplicaRouter, RoutedSession
+from app.redis.deps import get_redis
 
 
 async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
-    """Зависимость для FastAPI, создающая отдельную сессию через sessionmaker."""
+    """Зависимость для FastAPI, создающая отдельную сессию через sessionmaker.
+
+    Соединение берётся из пула только на первом запросе сессии: если ответ
+    нашёлся в кэше, пул не трогается.
+    """
     async_session_maker = request.app.state.session_maker
     async with async_session_maker() as session:
         yield session
+
+
+def _replica_router(request: Request) -> ReplicaRouter | None:
+    return getattr(request.app.state, "replica_router", None)
+
+
+async def get_read_session(
+    request: Request, session: AsyncSession = Depends(get_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для маршрутов, которые только читают: реплика, если она догнала
+    primary, иначе — primary. Выбор делается перед первым запросом."""
+    router = _replica_router(request)
+    if router is None:
+        yield session
+        return
+
+    async with RoutedSession(
+        bind=session.bind, expire_on_commit=False, choose_bind=router.engine_for_read
+    ) as routed:
+        yield routed
+
+
+async def get_user_read_session(
+    user_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Как get_read_session, но сразу после своей записи пользователь
+    читает из primary."""
+    async with users_read_session(request, session, redis, [user_id]) as routed:
+        yield routed
+
+
+@asynccontextmanager
+async def users_read_session(
+    request: Request, session: AsyncSession, redis: Redis, user_ids: Iterable[int]
+) -> AsyncIterator[AsyncSession]:
+    """Сессия чтения данных нескольких пользователей: primary, если хоть
+    один из них только что писал."""
+    router = _replica_router(request)
+    if router is None:
+        yield session
+        return
+
+    async def choose_bind() -> AsyncEngine | None:
+        if await ReadYourWrites(redis, router.settings).pinned(*user_ids):
+            return None
+        return await router.engine_for_read()
+
+    async with RoutedSession(
+        bind=session.bind, expire_on_commit=False, choose_bind=choose_bind
+    ) as routed:
+        yield routed
+
+
+async def pin_user_to_primary(
+    user_id: int, request: Request, redis: Redis = Depends(get_redis)
+):
+    """Для маршрутов записи: следующие чтения пользователя пойдут в primary."""
+    router = _replica_router(request)
+    if router is not None:
+        await ReadYourWrites(redis, router.settings).pin(user_id)
+
+
+async def get_engine(request: Request) -> AsyncEngine:
+    return request.app.state.engine
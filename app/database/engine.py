@@ -0,0 +1,114 @@
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import NullPool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.database.settings import DBSettings, PoolerMode
+
+
+class PoolStats:
+    """Счётчики получения соединений из пула с момента старта процесса."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, seconds: float):
+        self.acquired += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который меряет время получения соединения.
+
+    Время включает ожидание свободного соединения, открытие нового
+    (overflow) и pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return connection
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "acquired": self.stats.acquired,
+            "timeouts": self.stats.timeouts,
+            "wait_avg_ms": (
+                self.stats.wait_total / self.stats.acquired * 1000
+                if self.stats.acquired
+                else 0.0
+            ),
+            "wait_max_ms": self.stats.wait_max * 1000,
+        }
+
+
+def connect_args(settings: DBSettings) -> dict[str, Any]:
+    """Аргументы подключения asyncpg для create_async_engine."""
+    if settings.driver != "asyncpg":
+        return {}
+
+    if settings.pooler_mode == PoolerMode.TRANSACTION:
+        # соседние транзакции могут попасть на разные серверные соединения:
+        # кэш выражений ссылался бы на чужие prepared statements, а имена
+        # без уникального суффикса совпали бы у разных клиентов
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return {
+        "statement_cache_size": settings.statement_cache_size,
+        "prepared_statement_cache_size": settings.prepared_statement_cache_size,
+    }
+
+
+def create_engine(
+    settings: DBSettings, pooled: bool = True, url: str | None = None
+) -> AsyncEngine:
+    """Движок с настройками пула и кэша выражений из DBSettings.
+
+    `pooled=False` — без пула (задачи Celery: движок живёт один asyncio.run).
+    За внешним пулером пул приложения можно отключить через pool_size=0.
+    `url` — другой сервер с теми же настройками (реплика).
+    """
+    url = url or settings.url
+    kwargs: dict[str, Any] = {"connect_args": connect_args(settings)}
+
+    if not pooled or (
+        settings.pooler_mode == PoolerMode.TRANSACTION and settings.pool_size == 0
+    ):
+        return create_async_engine(url, poolclass=NullPool, **kwargs)
+
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        **kwargs,
+    )
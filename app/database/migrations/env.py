@@ -10,6 +10,7 @@ from sqlalchemy import engine_from_config, pool
 sys.path.insert(0, dirname(dirname(dirname((dirname(abspath(__file__)))))))
 
 from app.database.base import Base
+from app.database.engine import connect_args
 from app.database.models import *  # noqa: F403
 from app.settings import Settings
 
@@ -71,6 +72,7 @@ def run_migrations_online() -> None:
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        connect_args=connect_args(settings.db),
     )
 
     with connectable.connect() as connection:
@@ -0,0 +1,67 @@
+"""unique inventory user product
+
+Revision ID: 5c54c918705b
+Revises: 22c473a09d40
+Create Date: 2026-10-18 12:00:41.118302
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c54c918705b"
+down_revision: Union[str, Sequence[str], None] = "22c473a09d40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # дубликаты могли появиться из-за гонки read-then-insert — схлопываем их в одну строку
+    op.execute(
+        """
+        WITH duplicates AS (
+            SELECT
+                i.user_id,
+                i.product_id,
+                min(i.id) AS keep_id,
+                CASE
+                    WHEN p.type = 'permanent' THEN 1
+                    ELSE sum(i.quantity)
+                END AS quantity,
+                min(i.purchased_at) AS purchased_at
+            FROM inventory i
+            JOIN products p ON p.id = i.product_id
+            GROUP BY i.user_id, i.product_id, p.type
+            HAVING count(*) > 1
+        ),
+        merged AS (
+            UPDATE inventory i
+            SET quantity = d.quantity, purchased_at = d.purchased_at
+            FROM duplicates d
+            WHERE i.id = d.keep_id
+        )
+        DELETE FROM inventory i
+        USING duplicates d
+        WHERE i.user_id = d.user_id
+          AND i.product_id = d.product_id
+          AND i.id <> d.keep_id
+        """
+    )
+    op.drop_index("idx_inventory_user_product", table_name="inventory")
+    op.create_unique_constraint(
+        "uq_inventory_user_product", "inventory", ["user_id", "product_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_inventory_user_product", "inventory", type_="unique")
+    op.create_index(
+        "idx_inventory_user_product",
+        "inventory",
+        ["user_id", "product_id"],
+        unique=False,
+    )
@@ -0,0 +1,146 @@
+"""partition transactions by month
+
+Revision ID: 8e3f1a6b2d47
+Revises: 5c54c918705b
+Create Date: 2026-10-18 13:00:12.604917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f1a6b2d47"
+down_revision: Union[str, Sequence[str], None] = "5c54c918705b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# партиции на столько месяцев вперёд; дальше их создаёт maintain_transaction_partitions
+PARTITIONS_AHEAD = 3
+
+TRANSACTION_INDEXES = {
+    "idx_transactions_status_created": ["status", "created_at"],
+    "ix_transactions_created_at": ["created_at"],
+    "ix_transactions_product_id": ["product_id"],
+    "ix_transactions_status": ["status"],
+}
+
+
+def create_transaction_indexes() -> None:
+    for name, columns in TRANSACTION_INDEXES.items():
+        op.create_index(name, "transactions", columns, unique=False)
+
+
+def drop_transaction_indexes() -> None:
+    for name in TRANSACTION_INDEXES:
+        op.drop_index(name)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # старую таблицу убираем в сторону вместе с её индексами (имена индексов
+    # уникальны в схеме), последовательность id переезжает в новую таблицу
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute(
+        "ALTER TABLE transactions_unpartitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey"
+    )
+    drop_transaction_indexes()
+
+    op.execute(
+        """
+        CREATE TABLE transactions (
+            id integer NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            product_id integer NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+            amount integer NOT NULL,
+            status transaction_status_enum NOT NULL DEFAULT 'pending',
+            created_at timestamp with time zone NOT NULL,
+            CONSTRAINT transactions_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    # месячные партиции от самой старой строки до PARTITIONS_AHEAD месяцев вперёд
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            partition_month date;
+        BEGIN
+            FOR partition_month IN
+                SELECT generate_series(
+                    date_trunc(
+                        'month',
+                        coalesce(min(created_at), now()) AT TIME ZONE 'UTC'
+                    ),
+                    date_trunc('month', now() AT TIME ZONE 'UTC')
+                        + interval '{PARTITIONS_AHEAD} months',
+                    interval '1 month'
+                )::date
+                FROM transactions_unpartitioned
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_' || to_char(partition_month, '"y"YYYY"m"MM'),
+                    partition_month::text || ' 00:00+00',
+                    (partition_month + interval '1 month')::date::text || ' 00:00+00'
+                );
+            END LOOP;
+        END
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO transactions (id, user_id, product_id, amount, status, created_at)
+        SELECT id, user_id, product_id, amount, status, created_at
+        FROM transactions_unpartitioned
+        """
+    )
+    op.execute("DROP TABLE transactions_unpartitioned")
+
+    # индексы на родителе создаются и на каждой партиции
+    create_transaction_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute(
+        "ALTER TABLE transactions_partitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey"
+    )
+    drop_transaction_indexes()
+
+    op.execute(
+        """
+        CREATE TABLE transactions (
+            id integer NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            product_id integer NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+            amount integer NOT NULL,
+            status transaction_status_enum NOT NULL DEFAULT 'pending',
+            created_at timestamp with time zone NOT NULL,
+            CONSTRAINT transactions_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+
+    # архивные (отсоединённые) партиции не возвращаются
+    op.execute(
+        """
+        INSERT INTO transactions (id, user_id, product_id, amount, status, created_at)
+        SELECT id, user_id, product_id, amount, status, created_at
+        FROM transactions_partitioned
+        """
+    )
+    op.execute("DROP TABLE transactions_partitioned")
+
+    create_transaction_indexes()
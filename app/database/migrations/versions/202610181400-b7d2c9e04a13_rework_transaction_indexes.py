@@ -0,0 +1,59 @@
+"""rework transaction indexes
+
+Revision ID: b7d2c9e04a13
+Revises: 8e3f1a6b2d47
+Create Date: 2026-10-18 14:00:37.215480
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2c9e04a13"
+down_revision: Union[str, Sequence[str], None] = "8e3f1a6b2d47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # единственный запрос по времени/статусу — аналитика по completed за окно;
+    # частичный индекс с product_id в INCLUDE отвечает на него index-only scan
+    op.create_index(
+        "idx_transactions_completed_created",
+        "transactions",
+        ["created_at"],
+        unique=False,
+        postgresql_include=["product_id"],
+        postgresql_where=sa.text("status = 'completed'"),
+    )
+    op.drop_index("idx_transactions_status_created", table_name="transactions")
+    op.drop_index(op.f("ix_transactions_created_at"), table_name="transactions")
+    op.drop_index(op.f("ix_transactions_status"), table_name="transactions")
+
+    # покрывается uq_inventory_user_product: user_id — его первая колонка
+    op.drop_index(op.f("ix_inventory_user_id"), table_name="inventory")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_inventory_user_id"), "inventory", ["user_id"], unique=False
+    )
+
+    op.create_index(
+        op.f("ix_transactions_status"), "transactions", ["status"], unique=False
+    )
+    op.create_index(
+        op.f("ix_transactions_created_at"), "transactions", ["created_at"], unique=False
+    )
+    op.create_index(
+        "idx_transactions_status_created",
+        "transactions",
+        ["status", "created_at"],
+        unique=False,
+    )
+    op.drop_index("idx_transactions_completed_created", table_name="transactions")
@@ -0,0 +1,60 @@
+"""add balance ledger
+
+Revision ID: 3f9a7c1e5d28
+Revises: b7d2c9e04a13
+Create Date: 2026-10-18 15:00:44.918203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a7c1e5d28"
+down_revision: Union[str, Sequence[str], None] = "b7d2c9e04a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # снимки не заполняем: пока снимка нет, начальным балансом служит users.balance
+    op.create_table(
+        "balance_entries",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column(
+            "reason",
+            sa.Enum("top_up", "purchase", name="balance_entry_reason_enum"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_balance_entries_user_id",
+        "balance_entries",
+        ["user_id", "id"],
+        unique=False,
+    )
+    op.create_table(
+        "balance_snapshots",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("balance", sa.Integer(), nullable=False),
+        sa.Column("last_entry_id", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("balance_snapshots")
+    op.drop_index("idx_balance_entries_user_id", table_name="balance_entries")
+    op.drop_table("balance_entries")
+    op.execute("DROP TYPE IF EXISTS balance_entry_reason_enum")
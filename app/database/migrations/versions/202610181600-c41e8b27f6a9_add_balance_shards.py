@@ -0,0 +1,49 @@
+"""add balance shards
+
+Revision ID: c41e8b27f6a9
+Revises: 3f9a7c1e5d28
+Create Date: 2026-10-18 16:00:09.337412
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e8b27f6a9"
+down_revision: Union[str, Sequence[str], None] = "3f9a7c1e5d28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "balance_shards",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("balance", sa.Integer(), nullable=False),
+        sa.CheckConstraint("balance >= 0", name="ck_balance_shards_balance"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "shard"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # баланс шардированных пользователей возвращается в колонку
+    op.execute(
+        """
+        UPDATE users
+        SET balance = users.balance + shards.balance
+        FROM (
+            SELECT user_id, sum(balance) AS balance
+            FROM balance_shards
+            GROUP BY user_id
+        ) AS shards
+        WHERE users.id = shards.user_id
+        """
+    )
+    op.drop_table("balance_shards")
@@ -0,0 +1,55 @@
+"""add purchase requests
+
+Revision ID: 5d2b9e4f1c73
+Revises: c41e8b27f6a9
+Create Date: 2026-10-18 17:00:51.402196
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2b9e4f1c73"
+down_revision: Union[str, Sequence[str], None] = "c41e8b27f6a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "purchase_requests",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "pending", "completed", "failed", name="purchase_request_status_enum"
+            ),
+            nullable=False,
+        ),
+        sa.Column("error", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("settled_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_purchase_requests_user_id"),
+        "purchase_requests",
+        ["user_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_purchase_requests_user_id"), table_name="purchase_requests")
+    op.drop_table("purchase_requests")
+    op.execute("DROP TYPE IF EXISTS purchase_request_status_enum")
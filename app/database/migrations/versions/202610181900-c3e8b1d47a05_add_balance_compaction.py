@@ -0,0 +1,34 @@
+"""add balance compaction watermark
+
+Revision ID: c3e8b1d47a05
+Revises: 8e1f4a6c2b95
+Create Date: 2026-10-18 19:00:41.204917
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8b1d47a05"
+down_revision: Union[str, Sequence[str], None] = "8e1f4a6c2b95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "balance_compaction",
+        sa.Column("id", sa.SmallInteger(), nullable=False),
+        sa.Column("last_entry_id", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("balance_compaction")
@@ -0,0 +1,39 @@
+"""add inventory version
+
+Revision ID: 7b4e2f9c1d68
+Revises: c3e8b1d47a05
+Create Date: 2026-10-18 20:00:12.530816
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7b4e2f9c1d68"
+down_revision: Union[str, Sequence[str], None] = "c3e8b1d47a05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence("inventory_version_seq")))
+    # существующие строки получают версии из последовательности
+    op.add_column(
+        "inventory",
+        sa.Column(
+            "version",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('inventory_version_seq')"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("inventory", "version")
+    op.execute(sa.schema.DropSequence(sa.Sequence("inventory_version_seq")))
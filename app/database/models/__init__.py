@@ -1,6 +1,25 @@
-__all__ = ["User", "Product", "Inventory", "TransactionStatus"]
+__all__ = [
+    "User",
+    "Product",
+    "Inventory",
+    "TransactionStatus",
+    "BalanceCompaction",
+    "BalanceEntry",
+    "BalanceSnapshot",
+    "BalanceShard",
+    "PurchaseRequest",
+    "OutboxEvent",
+]
 
+from app.database.models.balance import (
+    BalanceCompaction,
+    BalanceEntry,
+    BalanceShard,
+    BalanceSnapshot,
+)
 from app.database.models.inventory import Inventory
+from app.database.models.outbox import OutboxEvent
 from app.database.models.product import Product
+from app.database.models.purchase_request import PurchaseRequest
 from app.database.models.transaction import TransactionStatus
 from app.database.models.user import User
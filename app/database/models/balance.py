@@ -0,0 +1,103 @@
+import enum
+from datetime import UTC, datetime
+
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+)
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class BalanceEntryReason(str, enum.Enum):
+    TOP_UP = "top_up"
+    PURCHASE = "purchase"
+
+
+class BalanceEntry(Base):
+    """Строка журнала баланса: amount > 0 — зачисление, < 0 — списание.
+
+    Таблица только дополняется; история движения средств пользователя —
+    это его строки журнала.
+    """
+
+    __tablename__ = "balance_entries"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[BalanceEntryReason] = mapped_column(
+        SAEnum(
+            BalanceEntryReason,
+            name="balance_entry_reason_enum",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+
+    __table_args__ = (
+        # остаток после снимка: строки пользователя с id > last_entry_id
+        Index("idx_balance_entries_user_id", "user_id", "id"),
+    )
+
+
+class BalanceSnapshot(Base):
+    """Свёрнутый баланс: сумма журнала пользователя до `last_entry_id` включительно."""
+
+    __tablename__ = "balance_snapshots"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    balance: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_entry_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+
+
+class BalanceCompaction(Base):
+    """Водяной знак свёртки: строки журнала с id <= `last_entry_id` уже в снимках.
+
+    Одна строка (id = 1); свёртка ищет пользователей только среди строк
+    журнала выше знака, а не по всему журналу.
+    """
+
+    __tablename__ = "balance_compaction"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    last_entry_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+
+
+class BalanceShard(Base):
+    """Часть баланса «горячего» пользователя.
+
+    У пользователя с шардами баланс — сумма его строк здесь, а users.balance
+    равен нулю: зачисления и списания блокируют одну строку-шард вместо
+    строки пользователя.
+    """
+
+    __tablename__ = "balance_shards"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    balance: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("balance >= 0", name="ck_balance_shards_balance"),
+    )
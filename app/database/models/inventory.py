@@ -1,7 +1,14 @@
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Sequence,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.base import Base
@@ -9,15 +16,19 @@ from app.database.base import Base
 if TYPE_CHECKING:
     from app.database.models import Product, User
 
+# версия строки для кэша инвентаря: новое значение при каждом изменении
+# quantity; последовательность общая, поэтому версия не начинается заново,
+# когда строку удалили и товар купили снова
+INVENTORY_VERSION = Sequence("inventory_version_seq")
+
 
 class Inventory(Base):
     __tablename__ = "inventory"
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), index=True
-    )
+    # поиск по user_id обслуживает uq_inventory_user_product (user_id — первая колонка)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     product_id: Mapped[int] = mapped_column(
         ForeignKey("products.id", ondelete="CASCADE")
     )
@@ -26,8 +37,16 @@ class Inventory(Base):
     purchased_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
     )
+    version: Mapped[int] = mapped_column(
+        BigInteger,
+        INVENTORY_VERSION,
+        server_default=INVENTORY_VERSION.next_value(),
+        nullable=False,
+    )
 
     user: Mapped["User"] = relationship(back_populates="inventory")
     product: Mapped["Product"] = relationship(back_populates="inventory_items")
 
-    __table_args__ = (Index("idx_inventory_user_product", "user_id", "product_id"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_inventory_user_product"),
+    )
@@ -0,0 +1,50 @@
+import enum
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class PurchaseRequestStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class PurchaseRequest(Base):
+    """Итог асинхронной покупки: строка пишется при проведении в Postgres.
+
+    Пока покупка в очереди, её статус есть только в Redis; id — тот же,
+    что вернул POST, поэтому повторное проведение после сбоя не дублирует её.
+    """
+
+    __tablename__ = "purchase_requests"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE")
+    )
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[PurchaseRequestStatus] = mapped_column(
+        SAEnum(
+            PurchaseRequestStatus,
+            name="purchase_request_status_enum",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+    )
+    # имя доменной ошибки, из-за которой покупка не прошла
+    error: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    settled_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
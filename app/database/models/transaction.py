@@ -2,7 +2,7 @@ import enum
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer
+from sqlalchemy import DDL, DateTime, ForeignKey, Index, Integer, event, text
 from sqlalchemy import Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -22,9 +22,12 @@ class TransactionStatus(str, enum.Enum):
 class Transaction(Base):
     __tablename__ = "transactions"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    # таблица партиционирована по created_at (RANGE, по месяцам),
+    # поэтому ключ партиционирования входит в первичный ключ
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    # индекс нужен каскадному удалению товара, иначе оно сканирует все партиции
     product_id: Mapped[int] = mapped_column(
         ForeignKey("products.id", ondelete="CASCADE"), index=True
     )
@@ -40,17 +43,38 @@ class Transaction(Base):
         default=TransactionStatus.PENDING,
         server_default="pending",
         nullable=False,
-        index=True,
     )
 
-    __table_args__ = (Index("idx_transactions_status_created", "status", "created_at"),)
+    __table_args__ = (
+        # аналитика: completed за окно, GROUP BY product_id — index-only scan
+        Index(
+            "idx_transactions_completed_created",
+            "created_at",
+            postgresql_include=["product_id"],
+            postgresql_where=text("status = 'completed'"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(UTC),
         nullable=False,
-        index=True,
+        primary_key=True,
     )
 
     user: Mapped["User"] = relationship(back_populates="transactions")
     product: Mapped["Product"] = relationship(back_populates="transactions")
+
+
+# Месячные партиции создаёт миграция и задача maintain_transaction_partitions.
+# DEFAULT-партиция нужна, чтобы create_all (тесты) давал рабочую таблицу,
+# и ловит строки за месяцы, партиция для которых ещё не создана.
+event.listen(
+    Transaction.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS transactions_default "
+        "PARTITION OF transactions DEFAULT"
+    ),
+)
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database.settings import DBSettings
+
+logger = logging.getLogger(__name__)
+
+# отставание реплики в секундах; 0 — если реплика догнала primary (на
+# простаивающем primary время последней транзакции ничего не говорит)
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaRouter:
+    """Выбор реплики для маршрутов, которые только читают.
+
+    Отставание реплики проверяется не чаще раза в replica_lag_check_interval
+    и кэшируется в процессе. Пока оно больше replica_max_lag или реплика не
+    отвечает, available() возвращает False и чтения идут в primary.
+    """
+
+    CHECK_TIMEOUT = 1.0
+
+    def __init__(self, engine: AsyncEngine, settings: DBSettings):
+        self.engine = engine
+        self.settings = settings
+        self.lag: float | None = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def engine_for_read(self) -> AsyncEngine | None:
+        return self.engine if await self.available() else None
+
+    async def available(self) -> bool:
+        if self._stale():
+            async with self._lock:
+                # пока ждали блокировку, проверку мог сделать другой запрос
+                if self._stale():
+                    self.lag = await self._check_lag()
+                    self._checked_at = time.monotonic()
+
+        return self.lag is not None and self.lag <= self.settings.replica_max_lag
+
+    def _stale(self) -> bool:
+        elapsed = time.monotonic() - self._checked_at
+        return elapsed >= self.settings.replica_lag_check_interval
+
+    async def _check_lag(self) -> float | None:
+        try:
+            async with asyncio.timeout(self.CHECK_TIMEOUT):
+                async with self.engine.connect() as conn:
+                    lag = await conn.scalar(REPLICA_LAG_SQL)
+        except (SQLAlchemyError, OSError, TimeoutError):
+            logger.warning("Replica lag check failed", exc_info=True)
+            return None
+        return float(lag) if lag is not None else None
+
+
+class RoutedSession(AsyncSession):
+    """Сессия, которая выбирает сервер только перед первым запросом.
+
+    `choose_bind` возвращает движок реплики или None (остаться на `bind`).
+    Пока запросов нет, не трогаются ни пул, ни проверка отставания, ни
+    Redis — ответ из кэша обходится без них.
+    """
+
+    def __init__(
+        self,
+        *args,
+        choose_bind: Callable[[], Awaitable[AsyncEngine | None]],
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._choose_bind: Callable[[], Awaitable[AsyncEngine | None]] | None = (
+            choose_bind
+        )
+
+    async def _route(self):
+        if self._choose_bind is None:
+            return
+
+        choose, self._choose_bind = self._choose_bind, None
+        engine = await choose()
+        if engine is not None:
+            self.bind = engine
+            self.sync_session.bind = engine.sync_engine
+
+    async def execute(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().scalar(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().scalars(*args, **kwargs)
+
+    async def get(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().get(*args, **kwargs)
+
+    async def stream(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().stream(*args, **kwargs)
+
+    async def connection(self, *args, **kwargs) -> Any:
+        await self._route()
+        return await super().connection(*args, **kwargs)
+
+
+class ReadYourWrites:
+    """Закрепление чтений пользователя за primary после его записи.
+
+    Метка `db:primary:{user_id}` живёт read_your_writes_ttl секунд и видна
+    всем воркерам. Ставится до записи: в худшем случае пользователь лишний
+    раз прочитает из primary.
+    """
+
+    def __init__(self, redis: Redis, settings: DBSettings):
+        self.redis = redis
+        self.ttl = settings.read_your_writes_ttl
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"db:primary:{user_id}"
+
+    async def pin(self, *user_ids: int):
+        if not user_ids:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user_id in user_ids:
+                    pipe.set(self.key(user_id), 1, ex=self.ttl)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to pin user reads to primary", exc_info=True)
+
+    async def pinned(self, *user_ids: int) -> bool:
+        """Закреплён ли хоть один из пользователей — одним EXISTS."""
+        try:
+            return bool(await self.redis.exists(*map(self.key, user_ids)))
+        except RedisError:
+            # без метки нельзя гарантировать свежесть — читаем из primary
+            return True
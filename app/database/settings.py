@@ -1,7 +1,14 @@
+import enum
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class PoolerMode(str, enum.Enum):
+    NONE = "none"
+    TRANSACTION = "transaction"
+
+
 class DBSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", env_prefix="DB_", extra="ignore"
@@ -14,7 +21,42 @@ class DBSettings(BaseSettings):
     driver: str = Field("asyncpg")
     name: str
 
+    # пул на процесс: при N воркерах uvicorn к Postgres может открыться
+    # N * (pool_size + max_overflow) соединений
+    pool_size: int = Field(5)
+    max_overflow: int = Field(10)
+    # сколько секунд ждать свободное соединение до TimeoutError
+    pool_timeout: float = Field(30)
+    # пересоздавать соединения старше N секунд (-1 — никогда)
+    pool_recycle: int = Field(1800)
+    pool_pre_ping: bool = Field(False)
+    # кэши подготовленных выражений asyncpg и SQLAlchemy на соединение
+    statement_cache_size: int = Field(100)
+    prepared_statement_cache_size: int = Field(100)
+
+    # transaction: перед Postgres стоит внешний пулер (PgBouncer в режиме
+    # pool_mode=transaction) — кэши подготовленных выражений выключаются,
+    # а pool_size=0 отключает пул приложения (NullPool)
+    pooler_mode: PoolerMode = Field(PoolerMode.NONE)
+
+    # реплика для чтения инвентаря и аналитики; без replica_host все запросы
+    # идут в primary. Реплика с отставанием больше replica_max_lag секунд
+    # не используется, отставание проверяется раз в replica_lag_check_interval
+    replica_host: str | None = Field(None)
+    replica_port: int | None = Field(None)
+    replica_max_lag: float = Field(2.0)
+    replica_lag_check_interval: float = Field(1.0)
+    # сколько секунд после своей записи пользователь читает из primary
+    read_your_writes_ttl: int = Field(5)
+
     @property
     def url(self) -> str:
         """Формирует строку подключения к PostgreSQL."""
         return f"postgresql+{self.driver}://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
+
+    @property
+    def replica_url(self) -> str | None:
+        if not self.replica_host:
+            return None
+        port = self.replica_port or self.port
+        return f"postgresql+{self.driver}://{self.user}:{self.password}@{self.replica_host}:{port}/{self.name}"
@@ -0,0 +1,7 @@
+from app.exceptions.base import AppError
+
+
+class PoolMetricsUnavailableError(AppError):
+    """Пул приложения отключён (NullPool за внешним пулером) — метрик нет."""
+
+    pass
@@ -0,0 +1,13 @@
+from app.exceptions.base import AppError
+
+
+class IdempotencyInProgressError(AppError):
+    """Запрос с этим Idempotency-Key ещё выполняется."""
+
+    pass
+
+
+class IdempotencyKeyReusedError(AppError):
+    """Idempotency-Key уже использован для запроса с другим телом."""
+
+    pass
@@ -15,3 +15,9 @@ class ProductNotConsumableError(AppError):
 
 class ProductNotPermanentError(AppError):
     pass
+
+
+class ProductPermanentQuantityError(AppError):
+    """Постоянный товар можно купить только в одном экземпляре."""
+
+    pass
@@ -0,0 +1,7 @@
+from app.exceptions.base import AppError
+
+
+class PurchaseNotFoundError(AppError):
+    """Покупки с таким id нет ни в очереди, ни в purchase_requests."""
+
+    pass
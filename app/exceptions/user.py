@@ -10,8 +10,4 @@ class UserLowBalanceError(AppError):
 
 class UserInvalidTopUpAmountError(AppError):
     """Пополнение на некорректную сумму."""
-    pass
-
-class UserIdempotencyConflictError(AppError):
-    """Повторный запрос по тому же idempotency-key."""
     pass
\ No newline at end of file
@@ -1,11 +1,15 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from app.api.handlers.routers_v1 import api_router as v1_routers
+from app.database.engine import create_engine
+from app.database.replica import ReplicaRouter
 from app.middlewares import add_middlewares
 from app.redis.client import close_redis, create_redis
+from app.services.product_catalog import ProductCatalog
 from app.settings import Settings
 
 settings = Settings()
@@ -13,13 +17,26 @@ settings = Settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.engine = create_async_engine(settings.db.url)
+    app.state.engine = create_engine(settings.db)
     app.state.session_maker = async_sessionmaker(
         app.state.engine, expire_on_commit=False
     )
+    app.state.replica_router = None
+    if settings.db.replica_url:
+        app.state.replica_router = ReplicaRouter(
+            create_engine(settings.db, url=settings.db.replica_url), settings.db
+        )
     app.state.redis = await create_redis(settings.redis)
+    catalog_listener = asyncio.create_task(
+        app.state.product_catalog.listen(app.state.redis)
+    )
     yield
+    catalog_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await catalog_listener
     await app.state.engine.dispose()
+    if app.state.replica_router:
+        await app.state.replica_router.engine.dispose()
     await close_redis(app.state.redis)
 
 
@@ -29,6 +46,8 @@ app = FastAPI(
     debug=settings.api.debug,
     lifespan=lifespan,
 )
+app.state.settings = settings
+app.state.product_catalog = ProductCatalog(settings.services)
 
 add_middlewares(app)
 app.include_router(v1_routers, prefix="/api/v1")
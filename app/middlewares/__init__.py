@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 
 from app.middlewares.error_handler import install_error_middleware
+from app.middlewares.idempotency import install_idempotency_middleware
 
 
 def add_middlewares(app: FastAPI):
     """Add all middleware to the FastAPI application"""
 
+    # idempotency — внутренний слой: доменные ошибки проходят через него
+    # исключениями (резерв снимается) и дальше превращаются в ответ error-слоем
+    install_idempotency_middleware(app)
     install_error_middleware(app)
@@ -5,6 +5,7 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
 from app.exceptions.base import AppError
+from app.exceptions.database import PoolMetricsUnavailableError
 from app.exceptions.inventory import (
     InventoryAlreadyOwnedError,
     InventoryNotFoundError,
@@ -15,9 +16,14 @@ from app.exceptions.product import (
     ProductNotConsumableError,
     ProductNotFoundError,
     ProductNotPermanentError,
+    ProductPermanentQuantityError,
 )
-from app.exceptions.user import UserLowBalanceError, UserNotFoundError, UserInvalidTopUpAmountError, \
-    UserIdempotencyConflictError
+from app.exceptions.idempotency import (
+    IdempotencyInProgressError,
+    IdempotencyKeyReusedError,
+)
+from app.exceptions.purchase import PurchaseNotFoundError
+from app.exceptions.user import UserLowBalanceError, UserNotFoundError, UserInvalidTopUpAmountError
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +38,23 @@ ERROR_MAP = {
     UserNotFoundError: (404, "User not found"),
     UserLowBalanceError: (409, "Not enough funds"),
     UserInvalidTopUpAmountError: (400, "Amount must be greater than zero"),
-    UserIdempotencyConflictError: (409, "Duplicate top-up request"),
     # product
     ProductNotFoundError: (404, "Product not found"),
     ProductInactiveError: (400, "Product is inactive"),
     ProductNotConsumableError: (400, "Product is not consumable"),
     ProductNotPermanentError: (400, "Product is not permanent"),
+    ProductPermanentQuantityError: (400, "Permanent product can be bought only once"),
+    # purchase
+    PurchaseNotFoundError: (404, "Purchase not found"),
     # inventory
     InventoryNotFoundError: (400, "Item not found in inventory"),
     InventoryEmptyError: (400, "Item quantity is zero"),
     InventoryAlreadyOwnedError: (409, "Permanent product already owned"),
+    # idempotency
+    IdempotencyInProgressError: (409, "Request with this key is in progress"),
+    IdempotencyKeyReusedError: (422, "Idempotency-Key reused with another request"),
+    # database
+    PoolMetricsUnavailableError: (404, "Connection pool is disabled"),
 }
 
 
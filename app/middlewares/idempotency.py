@@ -0,0 +1,44 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from app.utils.idempotency import IdempotencyReservation, IdempotentReplay
+
+
+def install_idempotency_middleware(app: FastAPI):
+    @app.middleware("http")
+    async def idempotency_middleware(request: Request, call_next):
+        try:
+            response = await call_next(request)
+        except IdempotentReplay as replay:
+            return replay.response()
+        except BaseException:
+            await _release(request)
+            raise
+
+        reservation: IdempotencyReservation | None = getattr(
+            request.state, "idempotency", None
+        )
+        if reservation is None:
+            return response
+
+        # сохраняем только успешный ответ: ошибка ничего не изменила,
+        # и повтор с тем же ключом должен выполниться заново
+        if response.status_code >= 400:
+            await reservation.release()
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        await reservation.complete(
+            response.status_code, body, response.headers.get("content-type")
+        )
+
+        replayable = Response(content=body, status_code=response.status_code)
+        # raw_headers, а не dict(headers): повторяющиеся Set-Cookie не схлопываются
+        replayable.raw_headers = list(response.raw_headers)
+        return replayable
+
+
+async def _release(request: Request):
+    reservation = getattr(request.state, "idempotency", None)
+    if reservation is not None:
+        await reservation.release()
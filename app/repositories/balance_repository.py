@@ -0,0 +1,311 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import (
+    BalanceCompaction,
+    BalanceEntry,
+    BalanceShard,
+    BalanceSnapshot,
+    User,
+)
+from app.database.models.balance import BalanceEntryReason
+
+
+class BalanceRepository:
+    """Журнал баланса и его снимки.
+
+    Баланс = снимок (или users.balance, если снимка ещё нет) + строки журнала
+    после `last_entry_id` снимка. Блокировки строки пользователя:
+    зачисление — FOR KEY SHARE (не мешает другим зачислениям и списаниям),
+    списание — FOR NO KEY UPDATE (списания одного пользователя идут по очереди),
+    свёртка — FOR UPDATE (ждёт все незакоммиченные записи журнала пользователя).
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def lock_for_credit(self, user_id: int) -> bool:
+        stmt = (
+            select(User.id)
+            .where(User.id == user_id)
+            .with_for_update(read=True, key_share=True)
+        )
+        return await self.session.scalar(stmt) is not None
+
+    async def lock_for_debit(self, user_id: int) -> bool:
+        stmt = select(User.id).where(User.id == user_id).with_for_update(key_share=True)
+        return await self.session.scalar(stmt) is not None
+
+    async def balance(self, user_id: int) -> int | None:
+        """Текущий баланс одним запросом — снимок и остаток журнала согласованы."""
+        snapshot = (
+            select(BalanceSnapshot).where(BalanceSnapshot.user_id == user_id).subquery()
+        )
+        delta = (
+            select(func.coalesce(func.sum(BalanceEntry.amount), 0))
+            .where(
+                BalanceEntry.user_id == user_id,
+                BalanceEntry.id > func.coalesce(snapshot.c.last_entry_id, 0),
+            )
+            .scalar_subquery()
+        )
+        stmt = (
+            select(func.coalesce(snapshot.c.balance, User.balance) + delta)
+            .select_from(User)
+            .outerjoin(snapshot, snapshot.c.user_id == User.id)
+            .where(User.id == user_id)
+        )
+        return await self.session.scalar(stmt)
+
+    async def add_entry(self, user_id: int, amount: int, reason: BalanceEntryReason):
+        self.session.add(BalanceEntry(user_id=user_id, amount=amount, reason=reason))
+        await self.session.flush()
+
+    async def history(self, user_id: int, limit: int = 100) -> list[BalanceEntry]:
+        stmt = (
+            select(BalanceEntry)
+            .where(BalanceEntry.user_id == user_id)
+            .order_by(BalanceEntry.id.desc())
+            .limit(limit)
+        )
+        return list(await self.session.scalars(stmt))
+
+    async def watermark(self) -> int:
+        """id строки журнала, до которой включительно всё уже свёрнуто."""
+        stmt = select(BalanceCompaction.last_entry_id).where(BalanceCompaction.id == 1)
+        return await self.session.scalar(stmt) or 0
+
+    async def advance_watermark(self, entry_id: int):
+        stmt = insert(BalanceCompaction).values(
+            id=1, last_entry_id=entry_id, updated_at=datetime.now(UTC)
+        )
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[BalanceCompaction.id],
+                set_={
+                    "last_entry_id": func.greatest(
+                        BalanceCompaction.last_entry_id, stmt.excluded.last_entry_id
+                    ),
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+
+    async def pending_users(self, after_id: int, limit: int) -> list[int]:
+        """Пользователи со строками после снимка среди строк журнала после `after_id`.
+
+        Читается только хвост журнала по первичному ключу.
+        """
+        stmt = (
+            select(BalanceEntry.user_id)
+            .outerjoin(BalanceSnapshot, BalanceSnapshot.user_id == BalanceEntry.user_id)
+            .where(
+                BalanceEntry.id > after_id,
+                BalanceEntry.id > func.coalesce(BalanceSnapshot.last_entry_id, 0),
+            )
+            .group_by(BalanceEntry.user_id)
+            .limit(limit)
+        )
+        return list(await self.session.scalars(stmt))
+
+    async def settled_entry_id(self, after_id: int, before: datetime) -> int | None:
+        """Последняя строка журнала после `after_id`, созданная раньше `before`."""
+        stmt = select(func.max(BalanceEntry.id)).where(
+            BalanceEntry.id > after_id, BalanceEntry.created_at < before
+        )
+        return await self.session.scalar(stmt)
+
+    async def compact(self, user_id: int) -> int | None:
+        """Сворачивает журнал пользователя в снимок, возвращает новый баланс.
+
+        Под FOR UPDATE все начатые записи журнала пользователя уже закоммичены,
+        а новые ждут окончания свёртки — строка с id меньше `last_entry_id`
+        не может появиться после снимка. users.balance обновляется тем же
+        значением, чтобы колонка оставалась пригодной при возврате в режим column.
+        """
+        opening = await self.session.scalar(
+            select(User.balance).where(User.id == user_id).with_for_update()
+        )
+        if opening is None:
+            return None
+
+        snapshot = (
+            await self.session.execute(
+                select(BalanceSnapshot.balance, BalanceSnapshot.last_entry_id).where(
+                    BalanceSnapshot.user_id == user_id
+                )
+            )
+        ).one_or_none()
+        base, last_entry_id = snapshot if snapshot else (opening, 0)
+
+        delta, max_id = (
+            await self.session.execute(
+                select(
+                    func.coalesce(func.sum(BalanceEntry.amount), 0),
+                    func.max(BalanceEntry.id),
+                ).where(
+                    BalanceEntry.user_id == user_id,
+                    BalanceEntry.id > last_entry_id,
+                )
+            )
+        ).one()
+        if max_id is None:
+            return base
+
+        balance = base + delta
+        stmt = insert(BalanceSnapshot).values(
+            user_id=user_id,
+            balance=balance,
+            last_entry_id=max_id,
+            updated_at=datetime.now(UTC),
+        )
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[BalanceSnapshot.user_id],
+                set_={
+                    "balance": stmt.excluded.balance,
+                    "last_entry_id": stmt.excluded.last_entry_id,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(balance=balance)
+        )
+        return balance
+
+
+class BalanceShardRepository:
+    """Строки balance_shards «горячих» пользователей.
+
+    Шарды одного пользователя блокируются в порядке номера шарда —
+    параллельные списания через несколько шардов не встают в deadlock.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def total(self, user_id: int) -> tuple[int, int] | None:
+        """(баланс, число шардов); баланс — users.balance плюс сумма шардов."""
+        balance = (
+            select(func.coalesce(func.sum(BalanceShard.balance), 0))
+            .where(BalanceShard.user_id == user_id)
+            .scalar_subquery()
+        )
+        count = (
+            select(func.count())
+            .where(BalanceShard.user_id == user_id)
+            .scalar_subquery()
+        )
+        row = (
+            await self.session.execute(
+                select(User.balance + balance, count).where(User.id == user_id)
+            )
+        ).one_or_none()
+        return tuple(row) if row else None
+
+    async def credit_random(self, user_id: int, amount: int) -> bool:
+        """Зачисляет `amount` в случайный шард; False, если шардов нет."""
+        shard = (
+            select(BalanceShard.shard)
+            .where(BalanceShard.user_id == user_id)
+            .order_by(func.random())
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(BalanceShard)
+            .where(BalanceShard.user_id == user_id, BalanceShard.shard == shard)
+            .values(balance=BalanceShard.balance + amount)
+            .returning(BalanceShard.shard)
+            .execution_options(synchronize_session=False)
+        )
+        return await self.session.scalar(stmt) is not None
+
+    async def debit_one(self, user_id: int, amount: int) -> bool:
+        """Списывает из одного свободного шарда, где хватает средств.
+
+        Занятые другими списаниями шарды пропускаются (SKIP LOCKED), так что
+        параллельные списания расходятся по разным шардам.
+        """
+        shard = await self.session.scalar(
+            select(BalanceShard.shard)
+            .where(BalanceShard.user_id == user_id, BalanceShard.balance >= amount)
+            .order_by(func.random())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if shard is None:
+            return False
+
+        await self._add(user_id, shard, -amount)
+        return True
+
+    async def lock_all(self, user_id: int) -> dict[int, int]:
+        """Блокирует все шарды пользователя: {shard: balance}."""
+        stmt = (
+            select(BalanceShard.shard, BalanceShard.balance)
+            .where(BalanceShard.user_id == user_id)
+            .order_by(BalanceShard.shard)
+            .with_for_update()
+        )
+        return dict((await self.session.execute(stmt)).all())
+
+    async def debit_spread(self, user_id: int, amount: int, shards: dict[int, int]):
+        """Списывает `amount` из заблокированных шардов, начиная с самых полных."""
+        for shard, balance in sorted(shards.items(), key=lambda item: -item[1]):
+            if amount <= 0:
+                break
+            taken = min(balance, amount)
+            if taken:
+                await self._add(user_id, shard, -taken)
+                amount -= taken
+
+    async def reshard(self, user_id: int, count: int) -> int | None:
+        """Раскладывает баланс пользователя на `count` шардов (0 — обратно в колонку).
+
+        Возвращает баланс или None, если пользователя нет.
+        """
+        balance = await self.session.scalar(
+            select(User.balance).where(User.id == user_id).with_for_update()
+        )
+        if balance is None:
+            return None
+
+        balance += sum((await self.lock_all(user_id)).values())
+        await self.session.execute(
+            delete(BalanceShard).where(BalanceShard.user_id == user_id)
+        )
+
+        if count == 0:
+            await self.session.execute(
+                update(User).where(User.id == user_id).values(balance=balance)
+            )
+            return balance
+
+        share, rest = divmod(balance, count)
+        await self.session.execute(
+            insert(BalanceShard),
+            [
+                {
+                    "user_id": user_id,
+                    "shard": shard,
+                    "balance": share + (1 if shard < rest else 0),
+                }
+                for shard in range(count)
+            ],
+        )
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(balance=0)
+        )
+        return balance
+
+    async def _add(self, user_id: int, shard: int, amount: int):
+        await self.session.execute(
+            update(BalanceShard)
+            .where(BalanceShard.user_id == user_id, BalanceShard.shard == shard)
+            .values(balance=BalanceShard.balance + amount)
+        )
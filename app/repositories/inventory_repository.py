@@ -1,8 +1,14 @@
-from sqlalchemy import select
+from collections import defaultdict
+
+from sqlalchemy import Integer, any_, bindparam, delete, literal, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.database.models import Inventory
+from app.database.models.inventory import INVENTORY_VERSION
+
+UNIQUE_USER_PRODUCT = "uq_inventory_user_product"
 
 
 class InventoryRepository:
@@ -36,6 +42,109 @@ class InventoryRepository:
         )
         self.session.add(inv)
 
+    async def upsert_increment(
+        self, user_id: int, product_id: int, quantity: int = 1
+    ) -> Inventory:
+        """INSERT ... ON CONFLICT DO UPDATE: добавляет строку или увеличивает quantity."""
+        items = await self.upsert_increment_many(user_id, {product_id: quantity})
+        return items[0]
+
+    async def upsert_increment_many(
+        self, user_id: int, quantities: dict[int, int]
+    ) -> list[Inventory]:
+        stmt = insert(Inventory).values(
+            [
+                {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in quantities.items()
+            ]
+        )
+        stmt = (
+            stmt.on_conflict_do_update(
+                constraint=UNIQUE_USER_PRODUCT,
+                set_={
+                    "quantity": Inventory.quantity + stmt.excluded.quantity,
+                    # версия берётся уже под блокировкой строки
+                    "version": INVENTORY_VERSION.next_value(),
+                },
+            )
+            .returning(Inventory)
+            .execution_options(populate_existing=True)
+        )
+        return list(await self.session.scalars(stmt))
+
+    async def add_if_absent(
+        self, user_id: int, product_ids: list[int]
+    ) -> list[Inventory]:
+        """INSERT ... ON CONFLICT DO NOTHING RETURNING: возвращает только новые строки."""
+        stmt = (
+            insert(Inventory)
+            .values(
+                [
+                    {"user_id": user_id, "product_id": product_id, "quantity": 1}
+                    for product_id in product_ids
+                ]
+            )
+            .on_conflict_do_nothing(constraint=UNIQUE_USER_PRODUCT)
+            .returning(Inventory)
+            .execution_options(populate_existing=True)
+        )
+        return list(await self.session.scalars(stmt))
+
+    async def decrement(self, user_id: int, product_id: int) -> tuple[int, int] | None:
+        """Уменьшает quantity на 1 и удаляет опустевшую строку одним выражением.
+
+        Возвращает (остаток, версия); None — строки нет или quantity уже 0.
+        Удаление тоже получает версию — по ней кэш отличает его от более ранних
+        изменений строки. Строка сначала блокируется в CTE: после ожидания
+        конкурента FOR UPDATE отдаёт свежее quantity, и по нему выбирается
+        ровно одна ветка — UPDATE или DELETE (один CTE не видит изменений другого).
+        """
+        target = (
+            select(Inventory.id, Inventory.quantity)
+            .where(
+                Inventory.user_id == user_id,
+                Inventory.product_id == product_id,
+                Inventory.quantity > 0,
+            )
+            .with_for_update()
+            .cte("target")
+        )
+        decremented = (
+            update(Inventory)
+            .where(Inventory.id == target.c.id, target.c.quantity > 1)
+            .values(
+                quantity=target.c.quantity - 1, version=INVENTORY_VERSION.next_value()
+            )
+            .returning(Inventory.quantity, Inventory.version)
+            .cte("decremented")
+        )
+        emptied = (
+            delete(Inventory)
+            .where(Inventory.id == target.c.id, target.c.quantity == 1)
+            .returning(INVENTORY_VERSION.next_value().label("version"))
+            .cte("emptied")
+        )
+        # data-modifying CTE попадают в запрос, только если на них ссылаются
+        stmt = select(decremented.c.quantity, decremented.c.version).union_all(
+            select(literal(0), emptied.c.version)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        return tuple(row) if row else None
+
+    async def last_version(self) -> int:
+        """Последняя выданная версия строк инвентаря.
+
+        Читается после строк: изменения, удалённые до их чтения, получили
+        версию не больше этой.
+        """
+        # до первого nextval last_value — ещё не выданное стартовое значение
+        return await self.session.scalar(
+            text(
+                "SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END "
+                f"FROM {INVENTORY_VERSION.name}"
+            )
+        )
+
     async def get_by_user(self, user_id: int) -> list[Inventory]:
         stmt = (
             select(Inventory)
@@ -43,3 +152,21 @@ class InventoryRepository:
             .options(selectinload(Inventory.product))
         )
         return list(await self.session.scalars(stmt))
+
+    async def get_by_users(self, user_ids: list[int]) -> dict[int, list[Inventory]]:
+        """Инвентари нескольких пользователей одним запросом.
+
+        `user_id = ANY($1)` с массивом в одном параметре: текст запроса не
+        зависит от числа пользователей, в отличие от раскрываемого IN.
+        """
+        ids = bindparam("user_ids", user_ids, type_=ARRAY(Integer))
+        stmt = (
+            select(Inventory)
+            .where(Inventory.user_id == any_(ids))
+            .options(selectinload(Inventory.product))
+        )
+
+        inventories = defaultdict(list)
+        for item in await self.session.scalars(stmt):
+            inventories[item.user_id].append(item)
+        return inventories
@@ -0,0 +1,30 @@
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import OutboxEvent
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, topic: str, payload: dict[str, Any]):
+        # flush не нужен: строка уйдёт в БД вместе с коммитом бизнес-транзакции
+        self.session.add(OutboxEvent(topic=topic, payload=payload))
+
+    async def lock_batch(self, limit: int) -> list[OutboxEvent]:
+        """Старейшие события; занятые другим relay пропускаются."""
+        stmt = (
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(await self.session.scalars(stmt))
+
+    async def delete(self, event_ids: list[int]):
+        await self.session.execute(
+            delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids))
+        )
@@ -0,0 +1,73 @@
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models.transaction import Transaction
+
+PARTITION_NAME_RE = re.compile(r"^transactions_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    """Первое число месяца, сдвинутого на `months`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class TransactionPartitionRepository:
+    """DDL месячных партиций `transactions_yYYYYmMM`.
+
+    Имена партиций строятся только из дат, поэтому подставляются в DDL напрямую.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def partition_name(month: date) -> str:
+        return f"{Transaction.__tablename__}_y{month.year:04d}m{month.month:02d}"
+
+    @staticmethod
+    def partition_month(name: str) -> date | None:
+        match = PARTITION_NAME_RE.match(name)
+        if not match:
+            return None
+        return date(int(match[1]), int(match[2]), 1)
+
+    async def list_partitions(self) -> list[str]:
+        stmt = text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            ORDER BY child.relname
+            """
+        )
+        return list(
+            await self.session.scalars(stmt, {"parent": Transaction.__tablename__})
+        )
+
+    async def create_month(self, month: date) -> str:
+        name = self.partition_name(month)
+        await self.session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"PARTITION OF {Transaction.__tablename__} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') "
+                f"TO ('{add_months(month, 1).isoformat()} 00:00+00')"
+            )
+        )
+        return name
+
+    async def detach(self, name: str):
+        await self.session.execute(
+            text(f"ALTER TABLE {Transaction.__tablename__} DETACH PARTITION {name}")
+        )
+
+    async def archive(self, name: str, schema: str):
+        """Переносит отсоединённую партицию в схему-архив."""
+        await self.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        await self.session.execute(text(f'ALTER TABLE {name} SET SCHEMA "{schema}"'))
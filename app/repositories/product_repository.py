@@ -14,3 +14,12 @@ class ProductRepository:
             stmt = stmt.where(Product.is_active)
 
         return await self.session.scalar(stmt)
+
+    async def get_many(
+        self, product_ids: list[int], with_is_active=True
+    ) -> dict[int, Product]:
+        stmt = select(Product).where(Product.id.in_(product_ids))
+        if with_is_active:
+            stmt = stmt.where(Product.is_active)
+
+        return {product.id: product for product in await self.session.scalars(stmt)}
@@ -0,0 +1,151 @@
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+from sqlalchemy import exists, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Inventory, Product, User
+from app.database.models.inventory import INVENTORY_VERSION
+from app.database.models.product import ProductType
+from app.database.models.transaction import Transaction, TransactionStatus
+from app.repositories.inventory_repository import UNIQUE_USER_PRODUCT
+
+
+class PurchaseResult(NamedTuple):
+    user_exists: bool
+    product_type: ProductType | None
+    price: int | None
+    current_balance: int | None
+    owned: bool
+    new_balance: int | None
+    quantity: int | None
+    purchased_at: datetime | None
+    version: int | None
+
+
+class PurchaseRepository:
+    """Покупка одним SQL-выражением: списание, инвентарь и транзакция в одном CTE."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def purchase(self, user_id: int, product_id: int) -> PurchaseResult:
+        now = datetime.now(UTC)
+
+        product = (
+            select(Product.id, Product.price, Product.type)
+            .where(Product.id == product_id, Product.is_active)
+            .cte("product")
+        )
+        owned = (
+            select(Inventory.id)
+            .where(Inventory.user_id == user_id, Inventory.product_id == product_id)
+            .cte("owned")
+        )
+
+        # условный UPDATE: строка users блокируется только на время этого выражения,
+        # а условие по балансу перепроверяется Postgres после ожидания блокировки
+        debit = (
+            update(User)
+            .where(
+                User.id == user_id,
+                User.balance >= product.c.price,
+                or_(
+                    product.c.type == ProductType.CONSUMABLE,
+                    ~exists(select(owned.c.id)),
+                ),
+            )
+            .values(balance=User.balance - product.c.price)
+            .returning(User.id, User.balance, product.c.price, product.c.type)
+            .cte("debit")
+        )
+
+        inventory_columns = ["user_id", "product_id", "quantity", "purchased_at"]
+        inventory_row = select(
+            debit.c.id, literal(product_id), literal(1), literal(now)
+        )
+        consumable_upsert = (
+            insert(Inventory)
+            .from_select(
+                inventory_columns,
+                inventory_row.where(debit.c.type == ProductType.CONSUMABLE),
+            )
+            .on_conflict_do_update(
+                constraint=UNIQUE_USER_PRODUCT,
+                set_={
+                    "quantity": Inventory.quantity + 1,
+                    "version": INVENTORY_VERSION.next_value(),
+                },
+            )
+            .returning(Inventory.quantity, Inventory.purchased_at, Inventory.version)
+            .cte("consumable_upsert")
+        )
+        # без ON CONFLICT: параллельная первая покупка упрётся в уникальный индекс
+        # и откатит всё выражение вместе со списанием
+        permanent_insert = (
+            insert(Inventory)
+            .from_select(
+                inventory_columns,
+                inventory_row.where(debit.c.type == ProductType.PERMANENT),
+            )
+            .returning(Inventory.quantity, Inventory.purchased_at, Inventory.version)
+            .cte("permanent_insert")
+        )
+        transaction_insert = (
+            insert(Transaction)
+            .from_select(
+                ["user_id", "product_id", "amount", "status", "created_at"],
+                select(
+                    debit.c.id,
+                    literal(product_id),
+                    debit.c.price,
+                    literal(TransactionStatus.COMPLETED, Transaction.status.type),
+                    literal(now),
+                ),
+            )
+            .returning(Transaction.id)
+            .cte("transaction_insert")
+        )
+
+        stmt = select(
+            exists(select(User.id).where(User.id == user_id)).label("user_exists"),
+            select(product.c.type).scalar_subquery().label("product_type"),
+            select(product.c.price).scalar_subquery().label("price"),
+            select(User.balance)
+            .where(User.id == user_id)
+            .scalar_subquery()
+            .label("current_balance"),
+            exists(select(owned.c.id)).label("owned"),
+            select(debit.c.balance).scalar_subquery().label("new_balance"),
+            # data-modifying CTE попадают в запрос, только если на них ссылаются
+            func.coalesce(
+                select(consumable_upsert.c.quantity).scalar_subquery(),
+                select(permanent_insert.c.quantity).scalar_subquery(),
+            ).label("quantity"),
+            func.coalesce(
+                select(consumable_upsert.c.purchased_at).scalar_subquery(),
+                select(permanent_insert.c.purchased_at).scalar_subquery(),
+            ).label("purchased_at"),
+            func.coalesce(
+                select(consumable_upsert.c.version).scalar_subquery(),
+                select(permanent_insert.c.version).scalar_subquery(),
+            ).label("version"),
+            select(func.count())
+            .select_from(transaction_insert)
+            .scalar_subquery()
+            .label("transactions_inserted"),
+        )
+
+        row = (await self.session.execute(stmt)).one()
+        return PurchaseResult(
+            user_exists=row.user_exists,
+            product_type=row.product_type,
+            price=row.price,
+            current_balance=row.current_balance,
+            owned=row.owned,
+            new_balance=row.new_balance,
+            quantity=row.quantity,
+            purchased_at=row.purchased_at,
+            version=row.version,
+        )
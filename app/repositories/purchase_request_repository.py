@@ -0,0 +1,15 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import PurchaseRequest
+
+
+class PurchaseRequestRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, purchase_id: str) -> PurchaseRequest | None:
+        return await self.session.get(PurchaseRequest, purchase_id)
+
+    async def add(self, purchase: PurchaseRequest):
+        self.session.add(purchase)
+        await self.session.flush()
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+
+class PoolMetricsSchema(BaseModel):
+    """Состояние пула соединений процесса и счётчики ожидания соединения."""
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    acquired: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
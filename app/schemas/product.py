@@ -0,0 +1,15 @@
+from pydantic import BaseModel, ConfigDict
+
+from app.database.models.product import ProductType
+
+
+class ProductSchema(BaseModel):
+    """Снимок метаданных товара, который держит каталог."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    price: int
+    type: ProductType
+    is_active: bool
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.database.models.purchase_request import PurchaseRequestStatus
+
+
+class PurchaseStatusSchema(BaseModel):
+    """Статус асинхронной покупки: из Redis, пока она в очереди, затем из БД."""
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    purchase_id: str = Field(validation_alias="id")
+    status: PurchaseRequestStatus
+    user_id: int
+    product_id: int
+    amount: int
+    error: str | None = None
@@ -1,32 +1,62 @@
 import json
 
 from app.repositories.analytics_repository import AnalyticsRepository
+from app.services.popularity_counter import PopularityCounter
+from app.services.settings import AnalyticsSource, ServiceSettings
+from app.utils.cache_aside import CacheAside
 
 
 class AnalyticsService:
     CACHE_KEY = "analytics:popular-products"
     CACHE_EX = 60 * 60
+    # сколько ещё отдаём устаревший топ, пока один запрос его пересчитывает
+    CACHE_STALE_EX = 5 * 60
 
-    def __init__(self, session, redis):
+    DEFAULT_DAYS = 7
+    DEFAULT_LIMIT = 5
+
+    def __init__(self, session, redis, settings: ServiceSettings | None = None):
         self.session = session
         self.redis = redis
+        self.settings = settings or ServiceSettings()
         self.repo = AnalyticsRepository(session)
+        self.counter = PopularityCounter(redis)
+        self.cache = CacheAside(redis, self.CACHE_EX, stale_ttl=self.CACHE_STALE_EX)
+
+    async def get_popular_version(
+        self, days: int = DEFAULT_DAYS, limit: int = DEFAULT_LIMIT
+    ) -> str | None:
+        """Поколение закэшированного топа одним GET; у счётчиков его нет."""
+        if self.settings.analytics_source == AnalyticsSource.COUNTERS:
+            return None
+        return await self.cache.generation(self._cache_key(days, limit))
+
+    async def get_popular_versioned(
+        self, days: int = DEFAULT_DAYS, limit: int = DEFAULT_LIMIT
+    ) -> tuple[str, str | None]:
+        """Топ готовым JSON вместе с поколением кэша: из кэша — строка как есть,
+        без json.loads."""
+        if self.settings.analytics_source == AnalyticsSource.COUNTERS:
+            # счётчики дёшево читать — отдаём свежий топ без кэша
+            rows = await self.counter.top(days * 24, limit)
+            return json.dumps(self._serialize(rows)), None
+
+        return await self.cache.get_or_load_versioned(
+            self._cache_key(days, limit), lambda: self._load_popular(days, limit)
+        )
 
-    async def get_popular(self):
-        cached = await self.redis.get(self.CACHE_KEY)
-        if cached:
-            return json.loads(cached)
+    async def _load_popular(self, days: int, limit: int) -> str:
+        rows = await self.repo.get_popular_products(days, limit)
+        return json.dumps(self._serialize(rows))
 
-        rows = await self.repo.get_popular_products()
+    def _cache_key(self, days: int, limit: int) -> str:
+        # топ по умолчанию остаётся под прежним ключом
+        if (days, limit) == (self.DEFAULT_DAYS, self.DEFAULT_LIMIT):
+            return self.CACHE_KEY
+        return f"{self.CACHE_KEY}:{days}:{limit}"
 
-        result = [
+    @staticmethod
+    def _serialize(rows) -> list[dict]:
+        return [
             {"product_id": product_id, "count": total} for product_id, total in rows
         ]
-
-        await self.redis.set(
-            self.CACHE_KEY,
-            json.dumps(result),
-            ex=self.CACHE_EX,
-        )
-
-        return result
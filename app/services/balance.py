@@ -0,0 +1,148 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import User
+from app.database.models.balance import BalanceEntryReason
+from app.exceptions.user import UserLowBalanceError
+from app.repositories.balance_repository import (
+    BalanceRepository,
+    BalanceShardRepository,
+)
+from app.repositories.user_repository import UserRepository
+from app.services.settings import BalanceBackend
+
+
+class ColumnBalance:
+    """Баланс в users.balance: любое изменение блокирует строку пользователя."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.user_repo = UserRepository(session)
+
+    async def read(self, user_id: int) -> int | None:
+        """Баланс без блокировок."""
+        return await self.session.scalar(select(User.balance).where(User.id == user_id))
+
+    async def get_for_debit(self, user_id: int) -> int | None:
+        user = await self.user_repo.get(user_id, with_for_update=True)
+        return user.balance if user else None
+
+    async def debit(
+        self, user_id: int, amount: int, balance: int, reason: BalanceEntryReason
+    ) -> int:
+        """Списывает `amount`; `balance` — значение из get_for_debit."""
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(balance=balance - amount)
+        )
+        return balance - amount
+
+    async def credit(
+        self, user_id: int, amount: int, reason: BalanceEntryReason
+    ) -> int | None:
+        return await self.session.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(balance=User.balance + amount)
+            .returning(User.balance)
+        )
+
+
+class LedgerBalance:
+    """Баланс как снимок + журнал balance_entries.
+
+    Зачисление — вставка строки журнала без эксклюзивной блокировки
+    пользователя. Списания одного пользователя сериализуются FOR NO KEY UPDATE
+    и проверяют баланс по снимку и остатку журнала. Снимки сворачивает задача
+    compact_balance_snapshots.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = BalanceRepository(session)
+
+    async def read(self, user_id: int) -> int | None:
+        return await self.repo.balance(user_id)
+
+    async def get_for_debit(self, user_id: int) -> int | None:
+        if not await self.repo.lock_for_debit(user_id):
+            return None
+        return await self.repo.balance(user_id)
+
+    async def debit(
+        self, user_id: int, amount: int, balance: int, reason: BalanceEntryReason
+    ) -> int:
+        await self.repo.add_entry(user_id, -amount, reason)
+        return balance - amount
+
+    async def credit(
+        self, user_id: int, amount: int, reason: BalanceEntryReason
+    ) -> int | None:
+        if not await self.repo.lock_for_credit(user_id):
+            return None
+        await self.repo.add_entry(user_id, amount, reason)
+        # параллельные зачисления не видны друг другу до коммита —
+        # возвращаемый баланс может не учитывать их
+        return await self.repo.balance(user_id)
+
+
+class ShardedBalance(ColumnBalance):
+    """users.balance для обычных пользователей, balance_shards — для «горячих».
+
+    Зачисление «горячему» пользователю попадает в случайный шард, списание —
+    в любой свободный шард, где хватает средств; только если такого нет,
+    блокируются все шарды и сумма собирается из нескольких. Параллельные
+    операции одного пользователя делят между собой N строк вместо одной.
+    Шарды включаются задачей reshard_user_balance.
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+        self.shards = BalanceShardRepository(session)
+        self.sharded: set[int] = set()
+
+    async def read(self, user_id: int) -> int | None:
+        total = await self.shards.total(user_id)
+        return total[0] if total else None
+
+    async def get_for_debit(self, user_id: int) -> int | None:
+        total = await self.shards.total(user_id)
+        if total is None:
+            return None
+
+        balance, shards = total
+        if not shards:
+            return await super().get_for_debit(user_id)
+
+        # без блокировки: точная проверка — при списании из шардов
+        self.sharded.add(user_id)
+        return balance
+
+    async def debit(
+        self, user_id: int, amount: int, balance: int, reason: BalanceEntryReason
+    ) -> int:
+        if user_id not in self.sharded:
+            return await super().debit(user_id, amount, balance, reason)
+
+        if not await self.shards.debit_one(user_id, amount):
+            shards = await self.shards.lock_all(user_id)
+            if sum(shards.values()) < amount:
+                raise UserLowBalanceError()
+            await self.shards.debit_spread(user_id, amount, shards)
+
+        return balance - amount
+
+    async def credit(
+        self, user_id: int, amount: int, reason: BalanceEntryReason
+    ) -> int | None:
+        if not await self.shards.credit_random(user_id, amount):
+            return await super().credit(user_id, amount, reason)
+
+        balance, _ = await self.shards.total(user_id)
+        return balance
+
+
+BALANCE_BACKENDS = {
+    BalanceBackend.COLUMN: ColumnBalance,
+    BalanceBackend.LEDGER: LedgerBalance,
+    BalanceBackend.SHARDED: ShardedBalance,
+}
@@ -0,0 +1,48 @@
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.balance_repository import BalanceRepository
+from app.services.settings import ServiceSettings
+
+
+class BalanceSnapshotService:
+    """Свёртка журнала баланса в снимки.
+
+    Чтение баланса в режиме ledger суммирует строки журнала после снимка,
+    поэтому снимки нужно регулярно подтягивать. Каждый пользователь
+    сворачивается в своей короткой транзакции: FOR UPDATE на его строке
+    ненадолго задерживает только его операции.
+
+    Кандидаты ищутся выше водяного знака balance_compaction. Знак сдвигается,
+    только когда свёрнуты все кандидаты, и не дальше строк старше
+    balance_snapshot_settle_seconds: строка с меньшим id из ещё открытой
+    транзакции иначе осталась бы под знаком несвёрнутой.
+    """
+
+    def __init__(self, session: AsyncSession, settings: ServiceSettings | None = None):
+        self.session = session
+        self.settings = settings or ServiceSettings()
+        self.repo = BalanceRepository(session)
+
+    async def compact(self) -> int:
+        """Сворачивает не больше batch_size пользователей, возвращает их число."""
+        batch_size = self.settings.balance_snapshot_batch_size
+        async with self.session.begin():
+            watermark = await self.repo.watermark()
+            user_ids = await self.repo.pending_users(watermark, batch_size)
+
+        for user_id in user_ids:
+            async with self.session.begin():
+                await self.repo.compact(user_id)
+
+        if len(user_ids) < batch_size:
+            settle = timedelta(seconds=self.settings.balance_snapshot_settle_seconds)
+            async with self.session.begin():
+                settled = await self.repo.settled_entry_id(
+                    watermark, datetime.now(UTC) - settle
+                )
+                if settled is not None:
+                    await self.repo.advance_watermark(settled)
+
+        return len(user_ids)
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.services.settings import ServiceSettings
+
+
+class Event(NamedTuple):
+    """Доменное событие из потока SERVICE_EVENTS_STREAM."""
+
+    id: str
+    topic: str
+    user_id: int
+    payload: dict[str, Any]
+    created_at: datetime
+
+    @classmethod
+    def from_entry(cls, entry_id: str, fields: dict[str, str]) -> "Event":
+        return cls(
+            id=entry_id,
+            topic=fields["topic"],
+            user_id=int(fields["user_id"]),
+            payload=json.loads(fields["payload"]),
+            created_at=datetime.fromisoformat(fields["created_at"]),
+        )
+
+
+class EventStream:
+    """Запись событий покупок, использования и пополнений в Redis Stream.
+
+    Поток обрезается `MAXLEN ~ SERVICE_EVENTS_STREAM_MAXLEN`: Redis удаляет
+    старые записи целыми узлами, так что обрезка почти бесплатна, а длина
+    лишь примерно равна лимиту. Читатели — app.background.events.
+    """
+
+    def __init__(self, redis: Redis, settings: ServiceSettings | None = None):
+        self.redis = redis
+        self.settings = settings or ServiceSettings()
+        self.stream = self.settings.events_stream
+
+    def add(
+        self,
+        pipe: Pipeline,
+        topic: str,
+        payload: dict[str, Any],
+        created_at: datetime,
+    ):
+        """Ставит XADD события в переданный pipeline."""
+        pipe.xadd(
+            self.stream,
+            {
+                "topic": topic,
+                "user_id": payload["user_id"],
+                "payload": json.dumps(payload),
+                "created_at": created_at.isoformat(),
+            },
+            maxlen=self.settings.events_stream_maxlen,
+            approximate=True,
+        )
+
+    async def publish(self, events: list[tuple[str, dict[str, Any], datetime]]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for topic, payload, created_at in events:
+                self.add(pipe, topic, payload, created_at)
+            await pipe.execute()
@@ -0,0 +1,417 @@
+import logging
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError, WatchError
+
+from app.database.models.product import ProductType
+from app.schemas.inventar import (
+    InventoryConsumableItem,
+    InventoryPermanentsItem,
+    InventorySchema,
+)
+
+logger = logging.getLogger(__name__)
+
+# версию двигаем, только если она уже выдана клиентам
+BUMP_VERSION_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("INCR", KEYS[1])
+    return redis.call("EXPIRE", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# покупки в hash: расходуемые пишутся, только если версия строки новее
+# `v:{product_id}` (или версии загрузки в `_loaded`, если поля нет),
+# постоянные — HSETNX; hash без `_loaded` не трогаем
+HASH_PURCHASE_SCRIPT = """
+local loaded = redis.call("HGET", KEYS[1], "_loaded")
+if not loaded then
+    return 0
+end
+for i = 2, #ARGV, 3 do
+    local field, value = ARGV[i], ARGV[i + 1]
+    if string.sub(field, 1, 2) == "p:" then
+        redis.call("HSETNX", KEYS[1], field, value)
+    else
+        local version_field = "v:" .. string.sub(field, 3)
+        local version = tonumber(ARGV[i + 2])
+        local cached = redis.call("HGET", KEYS[1], version_field) or loaded
+        if version > tonumber(cached) then
+            redis.call("HSET", KEYS[1], field, value, version_field, version)
+        elseif redis.call("HEXISTS", KEYS[1], field) == 0 then
+            -- строки нет, а изменение старше загрузки: её могли удалить позже
+            return redis.call("DEL", KEYS[1])
+        end
+    end
+end
+return redis.call("EXPIRE", KEYS[1], ARGV[1])
+"""
+
+# использование: остаток после коммита, если версия новее; последняя штука —
+# HDEL, а `v:{product_id}` остаётся отметкой удаления для опоздавших хуков
+HASH_USE_SCRIPT = """
+local loaded = redis.call("HGET", KEYS[1], "_loaded")
+if not loaded then
+    return 0
+end
+local field, version_field = "c:" .. ARGV[2], "v:" .. ARGV[2]
+local version = tonumber(ARGV[4])
+local cached = redis.call("HGET", KEYS[1], version_field) or loaded
+if version > tonumber(cached) then
+    if tonumber(ARGV[3]) > 0 then
+        redis.call("HSET", KEYS[1], field, ARGV[3], version_field, version)
+    else
+        redis.call("HDEL", KEYS[1], field)
+        redis.call("HSET", KEYS[1], version_field, version)
+    end
+elseif redis.call("HEXISTS", KEYS[1], field) == 0 then
+    return redis.call("DEL", KEYS[1])
+end
+return redis.call("EXPIRE", KEYS[1], ARGV[1])
+"""
+
+
+class InventoryChange(NamedTuple):
+    """Изменение строки инвентаря после коммита покупки."""
+
+    product_id: int
+    product_type: ProductType
+    # значение после коммита, а не прирост: применение хука идемпотентно
+    quantity: int
+    purchased_at: datetime
+    # inventory.version после коммита: хуки могут прийти не по порядку
+    version: int
+
+
+class RowVersions(NamedTuple):
+    """Версии строк инвентаря, из которых собран закэшированный документ."""
+
+    # последняя выданная версия на момент загрузки: изменение без строки в
+    # кэше новее неё — значит, загрузка его ещё не видела
+    loaded: int
+    # product_id -> inventory.version
+    rows: dict[int, int]
+
+
+class JsonInventoryCache:
+    """Весь InventorySchema одной JSON-строкой в `user:{id}:inventory`.
+
+    Документ отдаётся клиенту как есть, поэтому версии строк лежат рядом,
+    в hash `user:{id}:inventory:rows` (`_loaded` и product_id -> version),
+    и пишутся вместе с документом.
+    """
+
+    UPDATE_ATTEMPTS = 3
+
+    def __init__(self, redis: Redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:{user_id}:inventory"
+
+    @staticmethod
+    def rows_key(user_id: int) -> str:
+        return f"user:{user_id}:inventory:rows"
+
+    async def get(self, user_id: int) -> InventorySchema | None:
+        cached = await self.redis.get(self.key(user_id))
+        if not cached:
+            return None
+        return InventorySchema.model_validate_json(cached)
+
+    async def get_raw(self, user_id: int) -> str | None:
+        """Документ как есть, без разбора: его можно сразу отдать клиенту."""
+        return await self.redis.get(self.key(user_id)) or None
+
+    async def get_raw_many(self, user_ids: list[int]) -> list[str | None]:
+        """Документы нескольких пользователей одним MGET, в порядке user_ids."""
+        cached = await self.redis.mget([self.key(user_id) for user_id in user_ids])
+        return [value or None for value in cached]
+
+    async def set(self, user_id: int, dto: InventorySchema, versions: RowVersions):
+        await self.set_many({user_id: dto}, {user_id: versions})
+
+    async def set_many(
+        self, dtos: dict[int, InventorySchema], versions: dict[int, RowVersions]
+    ):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id, dto in dtos.items():
+                rows_key = self.rows_key(user_id)
+                pipe.set(self.key(user_id), dto.model_dump_json(), ex=self.ttl)
+                pipe.delete(rows_key)
+                pipe.hset(rows_key, mapping=self._rows_mapping(versions[user_id]))
+                pipe.expire(rows_key, self.ttl)
+            await pipe.execute()
+
+    @staticmethod
+    def _rows_mapping(versions: RowVersions) -> dict:
+        return {"_loaded": versions.loaded, **versions.rows}
+
+    async def apply_purchase(self, user_id: int, changes: list[InventoryChange]):
+        """Накатывает покупку на закэшированный документ под WATCH/MULTI.
+
+        quantity в изменении — абсолютное значение после коммита; оно пишется,
+        только если версия строки новее закэшированной, так что хук, пришедший
+        после использования или перезагрузки кэша, ничего не откатит. Если
+        строки в документе нет, а версия не новее загрузки, или версий нет
+        вовсе, документ удаляется. Холодный кэш не трогаем.
+        """
+        cache_key, rows_key = self.key(user_id), self.rows_key(user_id)
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for _ in range(self.UPDATE_ATTEMPTS):
+                    try:
+                        await pipe.watch(cache_key, rows_key)
+                        cached = await pipe.get(cache_key)
+                        if not cached:
+                            return
+
+                        dto = InventorySchema.model_validate_json(cached)
+                        rows = await pipe.hgetall(rows_key)
+                        if not self._merge(dto, rows, changes):
+                            break
+
+                        pipe.multi()
+                        pipe.set(cache_key, dto.model_dump_json(), keepttl=True)
+                        pipe.hset(rows_key, mapping=rows)
+                        await pipe.execute()
+                        return
+                    except WatchError:
+                        continue
+
+            await self.redis.delete(cache_key, rows_key)
+        except ValidationError:
+            await self.redis.delete(cache_key, rows_key)
+        except RedisError:
+            # покупка уже закоммичена — кэш догонит по TTL
+            logger.warning("Failed to update inventory cache", exc_info=True)
+
+    async def apply_use(
+        self, user_id: int, product_id: int, remaining: int, version: int
+    ):
+        await self.redis.delete(self.key(user_id), self.rows_key(user_id))
+
+    @staticmethod
+    def _merge(
+        dto: InventorySchema, rows: dict[str, str], changes: list[InventoryChange]
+    ) -> bool:
+        """Меняет документ и версии на месте; False — документ нужно удалить."""
+        if "_loaded" not in rows:
+            return False
+
+        consumables = {item.product_id: item for item in dto.consumables}
+        permanents = {item.product_id for item in dto.permanents}
+
+        for change in changes:
+            if change.product_type == ProductType.PERMANENT:
+                if change.product_id not in permanents:
+                    dto.permanents.append(
+                        InventoryPermanentsItem.model_validate(change)
+                    )
+                continue
+
+            field = str(change.product_id)
+            item = consumables.get(change.product_id)
+            if change.version > int(rows.get(field, rows["_loaded"])):
+                rows[field] = str(change.version)
+                if item:
+                    item.quantity = change.quantity
+                else:
+                    dto.consumables.append(
+                        InventoryConsumableItem.model_validate(change)
+                    )
+            elif not item:
+                # строки нет, а изменение старше загрузки: её могли удалить позже
+                return False
+
+        return True
+
+
+class HashInventoryCache:
+    """Инвентарь как Redis hash: `c:{product_id}` -> quantity, `p:{product_id}` -> purchased_at.
+
+    Поле `_loaded` ставится только при полной загрузке из БД: hash без него
+    считается промахом, а значение — последняя выданная версия строк на момент
+    загрузки. Покупки и использование меняют отдельные поля Lua-скриптом, без
+    пересборки документа. В поля пишутся значения после коммита, а рядом,
+    в `v:{product_id}`, — версия строки: опоздавший хук со старой версией
+    ничего не меняет, в каком бы порядке ни пришли покупки и использования.
+    Если строки в кэше нет, а версия не новее загрузки, hash удаляется.
+    """
+
+    LOADED_FIELD = "_loaded"
+    CONSUMABLE_PREFIX = "c:"
+    PERMANENT_PREFIX = "p:"
+    VERSION_PREFIX = "v:"
+
+    def __init__(self, redis: Redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:{user_id}:inventory:hash"
+
+    async def get(self, user_id: int) -> InventorySchema | None:
+        return self._parse(await self.redis.hgetall(self.key(user_id)))
+
+    def _parse(self, fields: dict[str, str]) -> InventorySchema | None:
+        if self.LOADED_FIELD not in fields:
+            return None
+
+        consumables, permanents = [], []
+        for field, value in fields.items():
+            if field.startswith(self.CONSUMABLE_PREFIX) and int(value) > 0:
+                consumables.append(
+                    InventoryConsumableItem(
+                        product_id=int(field.removeprefix(self.CONSUMABLE_PREFIX)),
+                        quantity=int(value),
+                    )
+                )
+            elif field.startswith(self.PERMANENT_PREFIX):
+                permanents.append(
+                    InventoryPermanentsItem(
+                        product_id=int(field.removeprefix(self.PERMANENT_PREFIX)),
+                        purchased_at=value,
+                    )
+                )
+
+        return InventorySchema(
+            consumables=sorted(consumables, key=lambda item: item.product_id),
+            permanents=sorted(permanents, key=lambda item: item.product_id),
+        )
+
+    async def get_raw(self, user_id: int) -> str | None:
+        # готового JSON в hash нет — собираем документ из полей
+        dto = await self.get(user_id)
+        return dto.model_dump_json() if dto else None
+
+    async def get_raw_many(self, user_ids: list[int]) -> list[str | None]:
+        # MGET для hash нет — HGETALL всех ключей за один round trip
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(self.key(user_id))
+            results = await pipe.execute()
+
+        return [
+            dto.model_dump_json() if (dto := self._parse(fields)) else None
+            for fields in results
+        ]
+
+    async def set(self, user_id: int, dto: InventorySchema, versions: RowVersions):
+        await self.set_many({user_id: dto}, {user_id: versions})
+
+    async def set_many(
+        self, dtos: dict[int, InventorySchema], versions: dict[int, RowVersions]
+    ):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id, dto in dtos.items():
+                cache_key = self.key(user_id)
+                pipe.delete(cache_key)
+                pipe.hset(cache_key, mapping=self._mapping(dto, versions[user_id]))
+                pipe.expire(cache_key, self.ttl)
+            await pipe.execute()
+
+    def _mapping(self, dto: InventorySchema, versions: RowVersions) -> dict:
+        mapping = {self.LOADED_FIELD: versions.loaded}
+        for item in dto.consumables:
+            mapping[f"{self.CONSUMABLE_PREFIX}{item.product_id}"] = item.quantity
+            mapping[f"{self.VERSION_PREFIX}{item.product_id}"] = versions.rows[
+                item.product_id
+            ]
+        for item in dto.permanents:
+            mapping[f"{self.PERMANENT_PREFIX}{item.product_id}"] = (
+                item.purchased_at.isoformat()
+            )
+        return mapping
+
+    async def apply_purchase(self, user_id: int, changes: list[InventoryChange]):
+        """quantity в изменении — абсолютное значение после коммита; пишется,
+        только если версия строки новее закэшированной."""
+        fields = []
+        for change in changes:
+            if change.product_type == ProductType.PERMANENT:
+                fields += [
+                    f"{self.PERMANENT_PREFIX}{change.product_id}",
+                    change.purchased_at.isoformat(),
+                    change.version,
+                ]
+            else:
+                fields += [
+                    f"{self.CONSUMABLE_PREFIX}{change.product_id}",
+                    change.quantity,
+                    change.version,
+                ]
+
+        try:
+            await self.redis.eval(
+                HASH_PURCHASE_SCRIPT, 1, self.key(user_id), self.ttl, *fields
+            )
+        except RedisError:
+            logger.warning("Failed to update inventory cache", exc_info=True)
+
+    async def apply_use(
+        self, user_id: int, product_id: int, remaining: int, version: int
+    ):
+        try:
+            await self.redis.eval(
+                HASH_USE_SCRIPT,
+                1,
+                self.key(user_id),
+                self.ttl,
+                product_id,
+                remaining,
+                version,
+            )
+        except RedisError:
+            logger.warning("Failed to update inventory cache", exc_info=True)
+
+
+class InventoryVersion:
+    """Версия инвентаря пользователя в `user:{id}:inventory:version` — основа ETag.
+
+    Версия растёт после каждого изменения кэша (покупка, использование, сброс
+    relay'ем), поэтому условный GET проверяется одним GET без чтения документа.
+    Новая версия начинается с текущего времени в микросекундах: после истечения
+    ключа она не совпадёт ни с одним выданным ранее ETag.
+    """
+
+    def __init__(self, redis: Redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:{user_id}:inventory:version"
+
+    async def get(self, user_id: int) -> str | None:
+        return await self.redis.get(self.key(user_id))
+
+    async def ensure(self, user_id: int) -> str:
+        """Текущая версия; заводит её, если ключа ещё нет."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self.key(user_id), time.time_ns() // 1000, nx=True, ex=self.ttl)
+            pipe.get(self.key(user_id))
+            _, version = await pipe.execute()
+        return version
+
+    async def bump(self, user_id: int):
+        """Вызывается после изменения кэша, а не до: иначе новая версия успела
+        бы попасть в ETag вместе со старым документом."""
+        try:
+            await self.redis.eval(BUMP_VERSION_SCRIPT, 1, self.key(user_id), self.ttl)
+        except RedisError:
+            logger.warning("Failed to bump inventory version", exc_info=True)
+
+    def bump_in(self, pipe: Pipeline, user_id: int):
+        """Ставит bump в переданный pipeline."""
+        pipe.eval(BUMP_VERSION_SCRIPT, 1, self.key(user_id), self.ttl)
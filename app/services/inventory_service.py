@@ -1,27 +1,109 @@
-import json
-
 from app.database.models.product import ProductType
 from app.repositories.inventory_repository import InventoryRepository
 from app.schemas.inventar import InventorySchema
+from app.services.inventory_cache import (
+    HashInventoryCache,
+    InventoryChange,
+    InventoryVersion,
+    JsonInventoryCache,
+    RowVersions,
+)
+from app.services.settings import InventoryCacheBackend, ServiceSettings
+from app.utils.cache_aside import CacheAside
+
+INVENTORY_CACHES = {
+    InventoryCacheBackend.JSON: JsonInventoryCache,
+    InventoryCacheBackend.HASH: HashInventoryCache,
+}
 
 
 class InventoryService:
     CACHE_EX = 60 * 60 * 5
 
-    def __init__(self, session, redis):
+    def __init__(self, session, redis, settings: ServiceSettings | None = None):
         self.session = session
         self.inventory_repo = InventoryRepository(session)
         self.redis = redis
+        self.settings = settings or ServiceSettings()
+        self.cache = INVENTORY_CACHES[self.settings.inventory_cache_backend](
+            redis, self.CACHE_EX
+        )
+        self.loader = CacheAside(redis, self.CACHE_EX)
+        self.version = InventoryVersion(redis, self.CACHE_EX)
+
+    async def get_inventory_version(self, user_id: int) -> str | None:
+        """Версия для If-None-Match: один GET, без документа и БД."""
+        return await self.version.get(user_id)
 
-    async def get_inventory(self, user_id: int) -> InventorySchema:
-        cache_key = f"user:{user_id}:inventory"
+    async def get_inventory_versioned(self, user_id: int) -> tuple[str, str]:
+        """Инвентарь JSON вместе с версией.
 
-        cached = await self.redis.get(cache_key)
+        Версия читается до документа: изменение между ними даст старую версию
+        с новым документом, и следующий запрос просто получит 200.
+        """
+        version = await self.version.ensure(user_id)
+        return await self.get_inventory_json(user_id), version
+
+    async def get_inventory_json(self, user_id: int) -> str:
+        """Инвентарь готовым JSON: попадание в кэш отдаётся без разбора и
+        валидации, сериализация — только на промахе."""
+        cached = await self.cache.get_raw(user_id)
         if cached:
-            return InventorySchema.model_validate(json.loads(cached))
+            return cached
+
+        # холодный ключ пересобирается из БД один раз, остальные ждут результат
+        dto = await self.loader.coalesce(
+            self.cache.key(user_id),
+            lambda: self._load_inventory(user_id),
+            lambda: self.cache.get(user_id),
+        )
+        return dto.model_dump_json()
+
+    async def get_inventories_json(self, user_ids: list[int]) -> dict[int, str]:
+        """Инвентари нескольких пользователей готовым JSON.
 
+        Кэш читается одним MGET, все промахи грузятся одним запросом в БД и
+        дописываются в кэш одним pipeline.
+        """
+        cached = await self.cache.get_raw_many(user_ids)
+        inventories = {
+            user_id: document
+            for user_id, document in zip(user_ids, cached, strict=True)
+            if document is not None
+        }
+
+        misses = [user_id for user_id in user_ids if user_id not in inventories]
+        if misses:
+            rows = await self.inventory_repo.get_by_users(misses)
+            loaded = await self.inventory_repo.last_version()
+            dtos = {user_id: self._build(rows.get(user_id, [])) for user_id in misses}
+            await self.cache.set_many(
+                dtos,
+                {
+                    user_id: self._versions(loaded, rows.get(user_id, []))
+                    for user_id in misses
+                },
+            )
+            for user_id, dto in dtos.items():
+                inventories[user_id] = dto.model_dump_json()
+
+        return {user_id: inventories[user_id] for user_id in user_ids}
+
+    async def _load_inventory(self, user_id: int) -> InventorySchema:
         inventory = await self.inventory_repo.get_by_user(user_id)
+        loaded = await self.inventory_repo.last_version()
+        dto = self._build(inventory)
+        await self.cache.set(user_id, dto, self._versions(loaded, inventory))
+        return dto
 
+    @staticmethod
+    def _versions(loaded: int, inventory) -> RowVersions:
+        return RowVersions(
+            loaded, {item.product_id: item.version for item in inventory}
+        )
+
+    @staticmethod
+    def _build(inventory) -> InventorySchema:
         consumables = []
         permanents = []
 
@@ -35,15 +117,19 @@ class InventoryService:
             else:
                 raise NotImplementedError
 
-        dto = InventorySchema(
+        return InventorySchema(
             consumables=consumables,
             permanents=permanents,
         )
 
-        await self.redis.set(
-            cache_key,
-            dto.model_dump_json(),
-            ex=self.CACHE_EX,
-        )
+    async def apply_purchase(self, user_id: int, changes: list[InventoryChange]):
+        """Post-commit хук покупки: точечно обновляет кэш без запроса в БД."""
+        await self.cache.apply_purchase(user_id, changes)
+        await self.version.bump(user_id)
 
-        return dto
+    async def apply_use(
+        self, user_id: int, product_id: int, remaining: int, version: int
+    ):
+        """Post-commit хук использования товара."""
+        await self.cache.apply_use(user_id, product_id, remaining, version)
+        await self.version.bump(user_id)
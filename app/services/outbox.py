@@ -0,0 +1,153 @@
+import enum
+import logging
+from collections import Counter, defaultdict
+from datetime import UTC, datetime
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.replica import ReadYourWrites
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.event_stream import EventStream
+from app.services.inventory_cache import (
+    HashInventoryCache,
+    InventoryVersion,
+    JsonInventoryCache,
+)
+from app.services.inventory_service import InventoryService
+from app.services.popularity_counter import PopularityCounter
+from app.services.settings import ServiceSettings
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxTopic(str, enum.Enum):
+    # {user_id, items: [{product_id, quantity, amount}]}
+    PURCHASE_COMPLETED = "purchase.completed"
+    # {user_id, product_id, remaining}
+    PRODUCT_USED = "product.used"
+    # {user_id, amount, balance}
+    BALANCE_CREDITED = "balance.credited"
+
+
+# события, после которых кэш инвентаря пользователя устарел
+INVENTORY_TOPICS = {OutboxTopic.PURCHASE_COMPLETED, OutboxTopic.PRODUCT_USED}
+
+
+class Outbox:
+    """Доменные события покупок, использования и пополнений.
+
+    С SERVICE_OUTBOX_ENABLED событие пишется в outbox_events внутри текущей
+    транзакции, а в Redis его переносит relay_outbox. Без outbox сервисы сами
+    обновляют Redis после коммита, а события при SERVICE_EVENTS_ENABLED
+    копятся в памяти и уходят в поток из dispatch() — без гарантии доставки
+    при падении между коммитом и XADD.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        settings: ServiceSettings | None = None,
+    ):
+        self.settings = settings or ServiceSettings()
+        self.enabled = self.settings.outbox_enabled
+        self.repo = OutboxRepository(session)
+        self.stream = EventStream(redis, self.settings)
+        self.pending: list[tuple[str, dict[str, Any], datetime]] = []
+
+    async def publish(self, topic: OutboxTopic, payload: dict[str, Any]):
+        """Вызывается внутри транзакции изменения."""
+        if self.enabled:
+            await self.repo.add(topic.value, payload)
+        elif self.settings.events_enabled:
+            self.pending.append((topic.value, payload, datetime.now(UTC)))
+
+    async def dispatch(self):
+        """Вызывается после коммита: отправляет накопленные события в поток."""
+        if not self.pending:
+            return
+
+        events, self.pending = self.pending, []
+        try:
+            await self.stream.publish(events)
+        except RedisError:
+            # изменение уже закоммичено — потребители лишь недополучат событие
+            logger.warning("Failed to publish domain events", exc_info=True)
+
+
+class OutboxRelay:
+    """Переносит события из outbox_events в Redis.
+
+    Пачка блокируется FOR UPDATE SKIP LOCKED, применяется к Redis (сброс
+    кэша инвентаря, счётчики популярности, запись в поток событий) и только
+    потом удаляется; в поток события попадают независимо от
+    SERVICE_EVENTS_ENABLED. Если Redis недоступен или relay упал, строки
+    остаются и будут применены повторно — доставка «хотя бы один раз».
+
+    С репликой пользователи сброшенных кэшей закрепляются за primary перед
+    сбросом: промах кэша не должен заполнить его из отстающей реплики.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        settings: ServiceSettings | None = None,
+        read_your_writes: ReadYourWrites | None = None,
+    ):
+        self.session = session
+        self.redis = redis
+        self.read_your_writes = read_your_writes
+        self.settings = settings or ServiceSettings()
+        self.repo = OutboxRepository(session)
+        self.stream = EventStream(redis, self.settings)
+        self.popularity = PopularityCounter(redis)
+        self.version = InventoryVersion(redis, InventoryService.CACHE_EX)
+
+    async def relay(self) -> int:
+        """Переносит одну пачку, возвращает число событий."""
+        async with self.session.begin():
+            events = await self.repo.lock_batch(self.settings.outbox_batch_size)
+            if not events:
+                return 0
+
+            if self.read_your_writes:
+                await self.read_your_writes.pin(
+                    *{
+                        event.payload["user_id"]
+                        for event in events
+                        if event.topic in INVENTORY_TOPICS
+                    }
+                )
+
+            popularity: dict[datetime, Counter[int]] = defaultdict(Counter)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for event in events:
+                    user_id = event.payload["user_id"]
+                    if event.topic in INVENTORY_TOPICS:
+                        pipe.delete(
+                            JsonInventoryCache.key(user_id),
+                            JsonInventoryCache.rows_key(user_id),
+                            HashInventoryCache.key(user_id),
+                        )
+                        # после сброса кэша, чтобы ETag не пережил документ
+                        self.version.bump_in(pipe, user_id)
+                    if event.topic == OutboxTopic.PURCHASE_COMPLETED:
+                        hour = event.created_at.astimezone(UTC).replace(
+                            minute=0, second=0, microsecond=0
+                        )
+                        for item in event.payload["items"]:
+                            popularity[hour][item["product_id"]] += item["quantity"]
+
+                    self.stream.add(pipe, event.topic, event.payload, event.created_at)
+                await pipe.execute()
+
+            for hour, counts in popularity.items():
+                await self.popularity.record(counts, hour)
+
+            await self.repo.delete([event.id for event in events])
+
+        return len(events)
@@ -0,0 +1,51 @@
+from datetime import UTC, date, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.partition_repository import (
+    TransactionPartitionRepository,
+    add_months,
+)
+from app.services.settings import ServiceSettings
+
+
+class TransactionPartitionService:
+    """Обслуживание месячных партиций transactions.
+
+    Партиции создаются заранее на `transactions_partitions_ahead` месяцев вперёд:
+    если строки успеют попасть в DEFAULT-партицию, создать партицию их месяца
+    уже не получится без переноса данных. Партиции старше
+    `transactions_retention_months` отсоединяются и уезжают в схему-архив —
+    горячая таблица и её индексы остаются ограниченного размера.
+    """
+
+    def __init__(self, session: AsyncSession, settings: ServiceSettings | None = None):
+        self.session = session
+        self.settings = settings or ServiceSettings()
+        self.repo = TransactionPartitionRepository(session)
+
+    async def maintain(self, today: date | None = None) -> dict[str, list[str]]:
+        today = today or datetime.now(UTC).date()
+        current = today.replace(day=1)
+        cutoff = add_months(current, -self.settings.transactions_retention_months)
+
+        async with self.session.begin():
+            existing = await self.repo.list_partitions()
+
+            created = []
+            for offset in range(self.settings.transactions_partitions_ahead + 1):
+                month = add_months(current, offset)
+                if self.repo.partition_name(month) not in existing:
+                    created.append(await self.repo.create_month(month))
+
+            archived = []
+            for name in existing:
+                month = self.repo.partition_month(name)
+                if month is not None and month < cutoff:
+                    await self.repo.detach(name)
+                    await self.repo.archive(
+                        name, self.settings.transactions_archive_schema
+                    )
+                    archived.append(name)
+
+        return {"created": created, "archived": archived}
@@ -0,0 +1,80 @@
+import logging
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityCounter:
+    """Популярность товаров в почасовых Redis ZSET: `analytics:popularity:{YYYYMMDDHH}`.
+
+    Каждая покупка после коммита делает ZINCRBY в бакет текущего часа. Топ за
+    окно в N часов — объединение N бакетов. Закрытые часы окна не меняются,
+    поэтому их объединение кэшируется до конца часа, и на запрос остаётся
+    объединить два множества: закрытую часть и текущий час.
+    """
+
+    KEY_PREFIX = "analytics:popularity"
+    RETENTION = timedelta(days=31)
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @classmethod
+    def bucket_key(cls, at: datetime) -> str:
+        return f"{cls.KEY_PREFIX}:{at.astimezone(UTC):%Y%m%d%H}"
+
+    async def record(self, counts: dict[int, int], at: datetime | None = None):
+        """Учитывает закоммиченную покупку {product_id: количество}."""
+        at = at or datetime.now(UTC)
+        key = self.bucket_key(at)
+        expire_at = at.replace(minute=0, second=0, microsecond=0) + self.RETENTION
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for product_id, count in counts.items():
+                    pipe.zincrby(key, count, product_id)
+                pipe.expireat(key, expire_at)
+                await pipe.execute()
+        except RedisError:
+            # покупка уже закоммичена — счётчик лишь недосчитает её
+            logger.warning("Failed to record product popularity", exc_info=True)
+
+    async def top(self, hours: int, limit: int) -> list[tuple[int, int]]:
+        """Топ-N (product_id, count) за последние `hours` часов, включая текущий."""
+        now = datetime.now(UTC)
+        current = self.bucket_key(now)
+        closed = await self._closed_window(now, hours)
+
+        result_key = f"{self.KEY_PREFIX}:top:{uuid.uuid4().hex}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(result_key, [closed, current])
+            pipe.zrevrange(result_key, 0, limit - 1, withscores=True)
+            pipe.delete(result_key)
+            _, rows, _ = await pipe.execute()
+
+        return [(int(product_id), int(score)) for product_id, score in rows]
+
+    async def _closed_window(self, now: datetime, hours: int) -> str:
+        """Объединение завершённых часов окна, пересобирается раз в час.
+
+        Пустое объединение ключа не создаёт, поэтому о сборке говорит отдельная
+        метка `...:built` — иначе тихое окно пересобиралось бы на каждый запрос.
+        """
+        key = f"{self.KEY_PREFIX}:window:{hours}:{now:%Y%m%d%H}"
+        built = f"{key}:built"
+        if await self.redis.exists(built):
+            return key
+
+        buckets = [self.bucket_key(now - timedelta(hours=i)) for i in range(1, hours)]
+        if buckets:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zunionstore(key, buckets)
+                pipe.expire(key, 60 * 60)
+                pipe.set(built, 1, ex=60 * 60)
+                await pipe.execute()
+
+        return key
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.product_repository import ProductRepository
+from app.schemas.product import ProductSchema
+from app.services.settings import ServiceSettings
+from app.utils.single_flight import SingleFlight
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    """Двухуровневый кэш товаров: LRU/TTL процесса -> Redis -> Postgres.
+
+    Экземпляр один на процесс (app.state.product_catalog). Параллельные промахи
+    по одному товару склеиваются в одну загрузку. При изменении товара нужно
+    вызвать `invalidate`: ключ в Redis удаляется, а остальные воркеры получают
+    id товара через pub/sub и выкидывают его из локального уровня. Локальный
+    TTL ограничивает устаревание, если сообщение потерялось.
+
+    Отсутствующие товары не кэшируются.
+    """
+
+    INVALIDATION_CHANNEL = "products:invalidate"
+    RECONNECT_DELAY = 1
+
+    def __init__(self, settings: ServiceSettings | None = None):
+        settings = settings or ServiceSettings()
+        self.ttl = settings.product_cache_ttl
+        self.local = TTLCache(
+            settings.product_cache_size, settings.product_cache_local_ttl
+        )
+        self.flights = SingleFlight()
+
+    @staticmethod
+    def key(product_id: int) -> str:
+        return f"product:{product_id}"
+
+    async def get(
+        self, session: AsyncSession, redis: Redis, product_id: int
+    ) -> ProductSchema | None:
+        """Товар по id без фильтра по is_active — его проверяет вызывающий."""
+        product = self.local.get(product_id)
+        if product is not None:
+            return product
+
+        return await self.flights.do(
+            product_id, lambda: self._load(session, redis, product_id)
+        )
+
+    async def get_many(
+        self, session: AsyncSession, redis: Redis, product_ids: list[int]
+    ) -> dict[int, ProductSchema]:
+        """Пакетный вариант `get`: один MGET и один IN-запрос на все промахи."""
+        products: dict[int, ProductSchema] = {}
+        for product_id in product_ids:
+            product = self.local.get(product_id)
+            if product is not None:
+                products[product_id] = product
+
+        missing = [
+            product_id for product_id in product_ids if product_id not in products
+        ]
+        if missing:
+            products.update(await self._load_many(session, redis, missing))
+
+        return products
+
+    async def invalidate(self, redis: Redis, product_id: int):
+        self.local.pop(product_id)
+        await redis.delete(self.key(product_id))
+        await redis.publish(self.INVALIDATION_CHANNEL, product_id)
+
+    def clear(self):
+        self.local.clear()
+
+    async def listen(self, redis: Redis):
+        """Фоновая задача: применяет инвалидации других воркеров к локальному уровню."""
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                    # пока подписки не было, сообщения могли потеряться
+                    self.local.clear()
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.local.pop(int(message["data"]))
+            except RedisError:
+                logger.warning("Product catalog subscription lost", exc_info=True)
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _load(
+        self, session: AsyncSession, redis: Redis, product_id: int
+    ) -> ProductSchema | None:
+        products = await self._load_many(session, redis, [product_id])
+        return products.get(product_id)
+
+    async def _load_many(
+        self, session: AsyncSession, redis: Redis, product_ids: list[int]
+    ) -> dict[int, ProductSchema]:
+        products: dict[int, ProductSchema] = {}
+
+        try:
+            cached = await redis.mget(
+                [self.key(product_id) for product_id in product_ids]
+            )
+        except RedisError:
+            logger.warning("Failed to read product cache", exc_info=True)
+            cached = [None] * len(product_ids)
+
+        for product_id, raw in zip(product_ids, cached, strict=True):
+            if raw:
+                products[product_id] = ProductSchema.model_validate_json(raw)
+
+        missing = [
+            product_id for product_id in product_ids if product_id not in products
+        ]
+        if missing:
+            rows = await ProductRepository(session).get_many(
+                missing, with_is_active=False
+            )
+            loaded = {
+                product_id: ProductSchema.model_validate(row)
+                for product_id, row in rows.items()
+            }
+            products.update(loaded)
+
+            if loaded:
+                try:
+                    async with redis.pipeline(transaction=False) as pipe:
+                        for product_id, product in loaded.items():
+                            pipe.set(
+                                self.key(product_id),
+                                product.model_dump_json(),
+                                ex=self.ttl,
+                            )
+                        await pipe.execute()
+                except RedisError:
+                    logger.warning("Failed to write product cache", exc_info=True)
+
+        for product_id, product in products.items():
+            self.local.set(product_id, product)
+
+        return products
@@ -7,44 +7,56 @@ from app.exceptions.product import (
     ProductNotFoundError,
 )
 from app.repositories.inventory_repository import InventoryRepository
-from app.repositories.product_repository import ProductRepository
+from app.services.inventory_service import InventoryService
+from app.services.outbox import Outbox, OutboxTopic
+from app.services.product_catalog import ProductCatalog
+from app.services.settings import ServiceSettings
 
 
 class ProductUseService:
-    def __init__(self, session: AsyncSession, redis):
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis,
+        settings: ServiceSettings | None = None,
+        catalog: ProductCatalog | None = None,
+    ):
         self.session = session
         self.redis = redis
+        self.catalog = catalog or ProductCatalog(settings)
         self.inventory_repo = InventoryRepository(session)
-        self.product_repo = ProductRepository(session)
+        self.inventory_service = InventoryService(session, redis, settings)
+        self.outbox = Outbox(session, redis, settings)
 
     async def use_product(self, user_id: int, product_id: int):
         async with self.session.begin():
             # может быть так, что товар не доступен, но есть в инвентаре
-            product = await self.product_repo.get(product_id, with_is_active=False)
+            product = await self.catalog.get(self.session, self.redis, product_id)
             if not product:
                 raise ProductNotFoundError()
 
             if product.type != ProductType.CONSUMABLE:
                 raise ProductNotConsumableError()
 
-            item = await self.inventory_repo.get(
-                user_id, product_id, with_for_update=True
-            )
+            # один запрос: уменьшение quantity или удаление последней штуки
+            decremented = await self.inventory_repo.decrement(user_id, product_id)
 
-            if not item:
+            if decremented is None:
+                # ошибочная ветка: выясняем причину отдельным запросом
+                if await self.inventory_repo.exists(user_id, product_id):
+                    raise InventoryEmptyError()
                 raise InventoryNotFoundError()
+            remaining, version = decremented
 
-            if item.quantity <= 0:
-                raise InventoryEmptyError()
-
-            item.quantity -= 1
-
-            if item.quantity == 0:
-                await self.session.delete(item)
-            else:
-                self.session.add(item)
-            await self.session.commit()
+            await self.outbox.publish(
+                OutboxTopic.PRODUCT_USED,
+                {"user_id": user_id, "product_id": product_id, "remaining": remaining},
+            )
 
-        await self.redis.delete(f"user:{user_id}:inventory")
+        await self.outbox.dispatch()
+        if not self.outbox.enabled:
+            await self.inventory_service.apply_use(
+                user_id, product_id, remaining, version
+            )
 
-        return {"product_id": product_id, "remaining": max(item.quantity, 0)}
+        return {"product_id": product_id, "remaining": remaining}
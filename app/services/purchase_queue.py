@@ -0,0 +1,185 @@
+import uuid
+from datetime import UTC, datetime
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.database.models.purchase_request import PurchaseRequestStatus
+from app.exceptions.user import UserLowBalanceError, UserNotFoundError
+from app.services.settings import ServiceSettings
+
+# KEYS: баланс, покупка, поток; ARGV: amount, purchase_id, user_id, product_id,
+# created_at. -1 — баланса в Redis нет (нужно засеять из БД), 0 — не хватает.
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local amount = tonumber(ARGV[1])
+if tonumber(redis.call('HGET', KEYS[1], 'available')) < amount then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'available', -amount)
+redis.call('HINCRBY', KEYS[1], 'pending', amount)
+-- пока есть непроведённые резервы, ключ не должен истечь
+redis.call('PERSIST', KEYS[1])
+redis.call('HSET', KEYS[2], 'status', 'pending', 'user_id', ARGV[3],
+    'product_id', ARGV[4], 'amount', ARGV[1], 'created_at', ARGV[5])
+redis.call('XADD', KEYS[3], '*', 'purchase_id', ARGV[2], 'user_id', ARGV[3],
+    'product_id', ARGV[4], 'amount', ARGV[1], 'created_at', ARGV[5])
+return 1
+"""
+
+SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'available', ARGV[1], 'pending', 0)
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# изменение баланса в обход очереди (пополнение, синхронная покупка)
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HINCRBY', KEYS[1], 'available', ARGV[1])
+end
+return false
+"""
+
+# KEYS: покупка, баланс; ARGV: status, error, refund, status_ttl, balance_ttl.
+# Повторный вызов для уже проведённой покупки ничего не делает.
+FINALIZE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'pending' then
+    return 0
+end
+local amount = tonumber(redis.call('HGET', KEYS[1], 'amount'))
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'error', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    if ARGV[3] == '1' then
+        redis.call('HINCRBY', KEYS[2], 'available', amount)
+    end
+    if redis.call('HINCRBY', KEYS[2], 'pending', -amount) <= 0 then
+        redis.call('EXPIRE', KEYS[2], ARGV[5])
+    end
+end
+return 1
+"""
+
+
+class PurchaseQueue:
+    """Резерв баланса и очередь асинхронных покупок в Redis.
+
+    `purchase:balance:{user_id}` — hash: available (баланс из БД минус
+    непроведённые резервы) и pending (сумма резервов). Засевается из БД при
+    первой покупке и истекает только без непроведённых резервов. Резерв,
+    статус покупки `purchase:{id}` и запись в поток делаются одним скриптом.
+    """
+
+    GROUP = "settlement"
+
+    def __init__(self, redis: Redis, settings: ServiceSettings | None = None):
+        self.redis = redis
+        self.settings = settings or ServiceSettings()
+        self.stream = self.settings.purchase_stream
+
+    @staticmethod
+    def balance_key(user_id: int) -> str:
+        return f"purchase:balance:{user_id}"
+
+    @staticmethod
+    def purchase_key(purchase_id: str) -> str:
+        return f"purchase:{purchase_id}"
+
+    async def reserve(
+        self,
+        user_id: int,
+        product_id: int,
+        amount: int,
+        load_balance: Callable[[], Awaitable[int | None]],
+    ) -> str:
+        """Резервирует `amount` и ставит покупку в поток, возвращает её id."""
+        purchase_id = uuid.uuid4().hex
+        keys = [
+            self.balance_key(user_id),
+            self.purchase_key(purchase_id),
+            self.stream,
+        ]
+        args = [amount, purchase_id, user_id, product_id, datetime.now(UTC).isoformat()]
+
+        result = await self.redis.eval(RESERVE_SCRIPT, len(keys), *keys, *args)
+        if result == -1:
+            balance = await load_balance()
+            if balance is None:
+                raise UserNotFoundError()
+            await self.redis.eval(
+                SEED_SCRIPT,
+                1,
+                self.balance_key(user_id),
+                balance,
+                self.settings.purchase_balance_ttl,
+            )
+            result = await self.redis.eval(RESERVE_SCRIPT, len(keys), *keys, *args)
+
+        if result != 1:
+            raise UserLowBalanceError()
+        return purchase_id
+
+    async def adjust(self, user_id: int, delta: int):
+        await self.redis.eval(ADJUST_SCRIPT, 1, self.balance_key(user_id), delta)
+
+    async def status(self, purchase_id: str) -> dict[str, str] | None:
+        return await self.redis.hgetall(self.purchase_key(purchase_id)) or None
+
+    async def finalize(
+        self,
+        purchase_id: str,
+        user_id: int,
+        status: PurchaseRequestStatus,
+        error: str | None = None,
+    ):
+        """Закрывает резерв; для неуспешной покупки возвращает его в available."""
+        await self.redis.eval(
+            FINALIZE_SCRIPT,
+            2,
+            self.purchase_key(purchase_id),
+            self.balance_key(user_id),
+            status.value,
+            error or "",
+            int(status == PurchaseRequestStatus.FAILED),
+            self.settings.purchase_status_ttl,
+            self.settings.purchase_balance_ttl,
+        )
+
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(
+                self.stream, self.GROUP, id="0", mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    async def read(self, consumer: str, count: int) -> list[tuple[str, dict]]:
+        """Пачка записей: сначала зависшие у упавших воркеров, затем новые."""
+        _, entries, *_ = await self.redis.xautoclaim(
+            self.stream,
+            self.GROUP,
+            consumer,
+            self.settings.purchase_claim_idle_ms,
+            count=count,
+        )
+        if entries:
+            return entries
+
+        response = await self.redis.xreadgroup(
+            self.GROUP, consumer, {self.stream: ">"}, count=count
+        )
+        return response[0][1] if response else []
+
+    async def ack(self, entry_ids: list[str]):
+        # проведённые записи больше не нужны — поток не растёт
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, self.GROUP, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            await pipe.execute()
@@ -2,93 +2,407 @@ from typing import Any
 
 from fastapi import HTTPException
 from redis.asyncio import Redis
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.models import Inventory
+from app.database.models.balance import BalanceEntryReason
+from app.database.models.purchase_request import PurchaseRequestStatus
 from app.database.models.product import ProductType
 from app.database.models.transaction import Transaction, TransactionStatus
 from app.exceptions.inventory import InventoryAlreadyOwnedError
-from app.exceptions.product import ProductInactiveError, ProductNotFoundError
+from app.exceptions.product import (
+    ProductInactiveError,
+    ProductNotFoundError,
+    ProductPermanentQuantityError,
+)
+from app.exceptions.purchase import PurchaseNotFoundError
 from app.exceptions.user import UserNotFoundError, UserLowBalanceError
-from app.repositories.inventory_repository import InventoryRepository
-from app.repositories.product_repository import ProductRepository
-from app.repositories.user_repository import UserRepository
+from app.repositories.inventory_repository import (
+    UNIQUE_USER_PRODUCT,
+    InventoryRepository,
+)
+from app.repositories.purchase_repository import PurchaseRepository
+from app.repositories.purchase_request_repository import PurchaseRequestRepository
+from app.schemas.purchase import PurchaseStatusSchema
+from app.services.balance import BALANCE_BACKENDS
+from app.services.inventory_cache import InventoryChange
 from app.services.inventory_service import InventoryService
+from app.services.outbox import Outbox, OutboxTopic
+from app.services.popularity_counter import PopularityCounter
+from app.services.product_catalog import ProductCatalog
+from app.services.purchase_queue import PurchaseQueue
+from app.services.settings import (
+    BalanceBackend,
+    PurchaseEngine,
+    PurchaseMode,
+    ServiceSettings,
+)
 
 
 class PurchaseService:
     CACHE_TTL = 300  # 5 минут
 
-    def __init__(self, session: AsyncSession, redis: Redis):
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        settings: ServiceSettings | None = None,
+        catalog: ProductCatalog | None = None,
+    ):
         self.session = session
         self.redis = redis
+        self.settings = settings or ServiceSettings()
+        self.catalog = catalog or ProductCatalog(self.settings)
 
-        self.user_repo = UserRepository(session)
-        self.product_repo = ProductRepository(session)
+        self.balance = BALANCE_BACKENDS[self.settings.balance_backend](session)
         self.inventory_repo = InventoryRepository(session)
-        self.inventory_service = InventoryService(session, redis)
+        self.purchase_repo = PurchaseRepository(session)
+        self.purchase_request_repo = PurchaseRequestRepository(session)
+        self.inventory_service = InventoryService(session, redis, self.settings)
+        self.popularity = PopularityCounter(redis)
+        self.queue = PurchaseQueue(redis, self.settings)
+        self.outbox = Outbox(session, redis, self.settings)
 
     async def purchase(self, user_id: int, product_id: int) -> dict[str, Any]:
         """Основная операция покупки товара пользователем."""
-        async with (self.session.begin()):
+        if self.settings.purchase_mode == PurchaseMode.ASYNC:
+            return await self._purchase_async(user_id, product_id)
 
-            user = await self.user_repo.get(user_id, with_for_update=True)
-            if not user:
+        # SQL-движок списывает из users.balance внутри своего выражения
+        if (
+            self.settings.purchase_engine == PurchaseEngine.SQL
+            and self.settings.balance_backend == BalanceBackend.COLUMN
+        ):
+            return await self._purchase_sql(user_id, product_id)
+
+        async with self.session.begin():
+
+            balance = await self.balance.get_for_debit(user_id)
+            if balance is None:
                 raise UserNotFoundError()
 
-            product = await self.product_repo.get(product_id)
-            
-            if not product:
+            # метаданные товара из каталога, без запроса в БД в типичном случае
+            product = await self.catalog.get(self.session, self.redis, product_id)
+            if not product or not product.is_active:
                 raise ProductNotFoundError()
 
-            if user.balance < product.price:
-                raise UserLowBalanceError()
+            item = await self.charge(
+                user_id, product_id, product.type, product.price, balance
+            )
+            await self.session.commit()
+
+        await self.outbox.dispatch()
+        if not self.outbox.enabled:
+            await self.inventory_service.apply_purchase(
+                user_id,
+                [
+                    InventoryChange(
+                        product_id,
+                        product.type,
+                        item.quantity,
+                        item.purchased_at,
+                        item.version,
+                    )
+                ],
+            )
+            await self.popularity.record({product_id: 1})
+
+        return {
+            "status": "ok",
+            "user_id": user_id,
+            "product_id": product_id,
+            "amount_spent": product.price,
+        }
+
+    async def charge(
+        self,
+        user_id: int,
+        product_id: int,
+        product_type: ProductType,
+        price: int,
+        balance: int,
+    ) -> Inventory:
+        """Списание и выдача товара внутри открытой транзакции.
+
+        `balance` — значение из get_for_debit: строка пользователя уже заблокирована.
+        """
+        if balance < price:
+            raise UserLowBalanceError()
+
+        await self.balance.debit(user_id, price, balance, BalanceEntryReason.PURCHASE)
+
+        if product_type == ProductType.CONSUMABLE:
+            item = await self._process_consumable(user_id, product_id)
 
-            user.balance -= product.price
-            self.session.add(user)
+        elif product_type == ProductType.PERMANENT:
+            item = await self._process_permanent(user_id, product_id)
 
-            if product.type == ProductType.CONSUMABLE:
-                await self._process_consumable(user_id, product_id)
+        txn = Transaction(
+            user_id=user_id,
+            product_id=product_id,
+            amount=price,
+            status=TransactionStatus.PENDING,
+        )
+        self.session.add(txn)
 
-            elif product.type == ProductType.PERMANENT:
-                await self._process_permanent(user_id, product_id)
+        txn.status = TransactionStatus.COMPLETED
 
-            txn = Transaction(
-                user_id=user_id,
-                product_id=product_id,
-                amount=product.price,
-                status=TransactionStatus.PENDING,
+        await self.outbox.publish(
+            OutboxTopic.PURCHASE_COMPLETED,
+            self._purchase_event(user_id, {product_id: 1}, {product_id: price}),
+        )
+        await self.session.flush()
+        return item
+
+    async def _purchase_async(self, user_id: int, product_id: int) -> dict[str, Any]:
+        """Резерв в Redis и постановка в очередь; в БД покупку проводит воркер."""
+        # транзакция только читает: соединение берётся, если каталог или
+        # засев баланса в Redis промахнутся мимо кэша
+        async with self.session.begin():
+            product = await self.catalog.get(self.session, self.redis, product_id)
+            if not product or not product.is_active:
+                raise ProductNotFoundError()
+
+            purchase_id = await self.queue.reserve(
+                user_id,
+                product_id,
+                product.price,
+                lambda: self.balance.read(user_id),
             )
-            self.session.add(txn)
 
-            txn.status = TransactionStatus.COMPLETED
+        return {
+            "status": PurchaseRequestStatus.PENDING.value,
+            "purchase_id": purchase_id,
+            "user_id": user_id,
+            "product_id": product_id,
+            "amount_spent": product.price,
+        }
 
-            await self.session.flush()
-            await self.inventory_service.get_inventory(user_id)
-            await self.session.commit()
+    async def get_status(self, purchase_id: str) -> PurchaseStatusSchema:
+        queued = await self.queue.status(purchase_id)
+        if queued:
+            return PurchaseStatusSchema(
+                purchase_id=purchase_id,
+                status=queued["status"],
+                user_id=queued["user_id"],
+                product_id=queued["product_id"],
+                amount=queued["amount"],
+                error=queued.get("error") or None,
+            )
+
+        async with self.session.begin():
+            purchase = await self.purchase_request_repo.get(purchase_id)
+        if not purchase:
+            raise PurchaseNotFoundError()
+        return PurchaseStatusSchema.model_validate(purchase)
+
+    async def _purchase_sql(self, user_id: int, product_id: int) -> dict[str, Any]:
+        """Покупка одним выражением, без SELECT ... FOR UPDATE и ORM flush."""
+        async with self.session.begin():
+            try:
+                result = await self.purchase_repo.purchase(user_id, product_id)
+            except IntegrityError as exc:
+                if UNIQUE_USER_PRODUCT in str(exc.orig):
+                    raise InventoryAlreadyOwnedError() from exc
+                raise
+
+            if not result.user_exists:
+                raise UserNotFoundError()
+
+            if result.price is None:
+                raise ProductNotFoundError()
+
+            if result.new_balance is None:
+                # порядок проверок такой же, как в ORM-ветке
+                if (
+                    result.current_balance >= result.price
+                    and result.product_type == ProductType.PERMANENT
+                    and result.owned
+                ):
+                    raise InventoryAlreadyOwnedError()
+                raise UserLowBalanceError()
+
+            await self.outbox.publish(
+                OutboxTopic.PURCHASE_COMPLETED,
+                self._purchase_event(
+                    user_id, {product_id: 1}, {product_id: result.price}
+                ),
+            )
+
+        await self.outbox.dispatch()
+        if not self.outbox.enabled:
+            await self.inventory_service.apply_purchase(
+                user_id,
+                [
+                    InventoryChange(
+                        product_id,
+                        result.product_type,
+                        result.quantity,
+                        result.purchased_at,
+                        result.version,
+                    )
+                ],
+            )
+            await self.popularity.record({product_id: 1})
 
         return {
             "status": "ok",
             "user_id": user_id,
             "product_id": product_id,
-            "amount_spent": product.price,
+            "amount_spent": result.price,
         }
 
-    async def _process_consumable(self, user_id: int, product_id: int):
-        """Увеличивает quantity consumable товара."""
-        inv = await self.inventory_repo.get(user_id, product_id, with_for_update=True)
+    async def purchase_batch(
+        self, user_id: int, items: list[tuple[int, int]]
+    ) -> dict[str, Any]:
+        """Покупка корзины (product_id, quantity) одной транзакцией: всё или ничего."""
+        quantities: dict[int, int] = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        async with self.session.begin():
+            balance = await self.balance.get_for_debit(user_id)
+            if balance is None:
+                raise UserNotFoundError()
+
+            found = await self.catalog.get_many(
+                self.session, self.redis, list(quantities)
+            )
+            products = {
+                product_id: product
+                for product_id, product in found.items()
+                if product.is_active
+            }
+            if len(products) != len(quantities):
+                raise ProductNotFoundError()
+
+            for product_id, quantity in quantities.items():
+                if products[product_id].type == ProductType.PERMANENT and quantity > 1:
+                    raise ProductPermanentQuantityError()
+
+            total = sum(
+                products[product_id].price * quantity
+                for product_id, quantity in quantities.items()
+            )
+            if balance < total:
+                raise UserLowBalanceError()
+
+            balance = await self.balance.debit(
+                user_id, total, balance, BalanceEntryReason.PURCHASE
+            )
+
+            permanents = [
+                product_id
+                for product_id in quantities
+                if products[product_id].type == ProductType.PERMANENT
+            ]
+            consumables = {
+                product_id: quantity
+                for product_id, quantity in quantities.items()
+                if products[product_id].type == ProductType.CONSUMABLE
+            }
 
-        if inv:
-            inv.quantity += 1
-        else:
-            await self.inventory_repo.add(user_id, product_id, quantity=1)
+            added, upserted = [], []
+            if permanents:
+                added = await self.inventory_repo.add_if_absent(user_id, permanents)
+                if len(added) != len(permanents):
+                    raise InventoryAlreadyOwnedError()
+
+            if consumables:
+                upserted = await self.inventory_repo.upsert_increment_many(
+                    user_id, consumables
+                )
+
+            # одна строка Transaction на единицу товара — как при поштучной покупке,
+            # чтобы аналитика популярности не зависела от способа покупки
+            await self.session.execute(
+                insert(Transaction),
+                [
+                    {
+                        "user_id": user_id,
+                        "product_id": product_id,
+                        "amount": products[product_id].price,
+                        "status": TransactionStatus.COMPLETED,
+                    }
+                    for product_id, quantity in quantities.items()
+                    for _ in range(quantity)
+                ],
+            )
+            await self.outbox.publish(
+                OutboxTopic.PURCHASE_COMPLETED,
+                self._purchase_event(
+                    user_id,
+                    quantities,
+                    {
+                        product_id: product.price
+                        for product_id, product in products.items()
+                    },
+                ),
+            )
+
+        await self.outbox.dispatch()
+        if not self.outbox.enabled:
+            await self.inventory_service.apply_purchase(
+                user_id,
+                [
+                    InventoryChange(
+                        row.product_id,
+                        products[row.product_id].type,
+                        row.quantity,
+                        row.purchased_at,
+                        row.version,
+                    )
+                    for row in added + upserted
+                ],
+            )
+            await self.popularity.record(quantities)
+        if self.settings.purchase_mode == PurchaseMode.ASYNC:
+            await self.queue.adjust(user_id, -total)
+
+        return {
+            "status": "ok",
+            "user_id": user_id,
+            "total_spent": total,
+            "balance": balance,
+            "items": [
+                {
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "amount_spent": products[product_id].price * quantity,
+                }
+                for product_id, quantity in quantities.items()
+            ],
+        }
+
+    @staticmethod
+    def _purchase_event(
+        user_id: int, quantities: dict[int, int], prices: dict[int, int]
+    ) -> dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "items": [
+                {
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "amount": prices[product_id] * quantity,
+                }
+                for product_id, quantity in quantities.items()
+            ],
+        }
+
+    async def _process_consumable(self, user_id: int, product_id: int) -> Inventory:
+        """Увеличивает quantity consumable товара."""
+        return await self.inventory_repo.upsert_increment(user_id, product_id)
 
-    async def _process_permanent(self, user_id: int, product_id: int):
+    async def _process_permanent(self, user_id: int, product_id: int) -> Inventory:
         """Проверяет и добавляет permanent товар."""
-        exists = await self.inventory_repo.exists(user_id, product_id)
-        if exists:
+        added = await self.inventory_repo.add_if_absent(user_id, [product_id])
+        if not added:
             raise InventoryAlreadyOwnedError()
 
-        await self.inventory_repo.add(user_id, product_id, quantity=1)
+        return added[0]
 
     @staticmethod
     def _inventory_cache_key(user_id: int) -> str:
@@ -0,0 +1,150 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import PurchaseRequest
+from app.database.models.purchase_request import PurchaseRequestStatus
+from app.database.replica import ReadYourWrites
+from app.exceptions.base import AppError
+from app.exceptions.product import ProductNotFoundError
+from app.exceptions.user import UserNotFoundError
+from app.repositories.purchase_request_repository import PurchaseRequestRepository
+from app.services.inventory_cache import InventoryChange
+from app.services.product_catalog import ProductCatalog
+from app.services.purchase_service import PurchaseService
+from app.services.settings import ServiceSettings
+
+logger = logging.getLogger(__name__)
+
+
+class PurchaseSettlementService:
+    """Проведение асинхронных покупок из потока в Postgres.
+
+    Пачка записей проводится одной транзакцией, каждая покупка — в своём
+    SAVEPOINT: доменная ошибка (не хватило средств, товар уже есть) откатывает
+    только её, покупка помечается failed, а резерв возвращается в Redis.
+    Записи подтверждаются после коммита. Если воркер упал раньше, записи
+    заберёт другой (XAUTOCLAIM); уже проведённые покупки узнаются по строке
+    purchase_requests и только закрываются в Redis.
+
+    С репликой пользователи проведённых покупок закрепляются за primary до
+    коммита: иначе промах кэша инвентаря прочитал бы реплику без покупки и
+    сохранил бы устаревший документ на весь TTL кэша.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        settings: ServiceSettings | None = None,
+        catalog: ProductCatalog | None = None,
+        read_your_writes: ReadYourWrites | None = None,
+    ):
+        self.session = session
+        self.read_your_writes = read_your_writes
+        self.redis = redis
+        self.settings = settings or ServiceSettings()
+        self.purchases = PurchaseService(session, redis, self.settings, catalog)
+        self.queue = self.purchases.queue
+        self.repo = PurchaseRequestRepository(session)
+
+    async def settle(self, consumer: str) -> int:
+        """Проводит одну пачку, возвращает число обработанных записей."""
+        entries = await self.queue.read(consumer, self.settings.purchase_batch_size)
+        if not entries:
+            return 0
+
+        results: dict[str, PurchaseRequest] = {}
+        changes: dict[int, list[InventoryChange]] = defaultdict(list)
+        counts: Counter[int] = Counter()
+
+        async with self.session.begin():
+            for _, fields in entries:
+                purchase_id = fields["purchase_id"]
+                if purchase_id in results:
+                    continue
+
+                existing = await self.repo.get(purchase_id)
+                if existing:
+                    results[purchase_id] = existing
+                    continue
+
+                purchase = PurchaseRequest(
+                    id=purchase_id,
+                    user_id=int(fields["user_id"]),
+                    product_id=int(fields["product_id"]),
+                    amount=int(fields["amount"]),
+                    created_at=datetime.fromisoformat(fields["created_at"]),
+                )
+                try:
+                    async with self.session.begin_nested():
+                        change = await self._settle_one(purchase)
+                except AppError as exc:
+                    purchase.status = PurchaseRequestStatus.FAILED
+                    purchase.error = type(exc).__name__
+                else:
+                    purchase.status = PurchaseRequestStatus.COMPLETED
+                    changes[purchase.user_id].append(change)
+                    counts[purchase.product_id] += 1
+
+                await self.repo.add(purchase)
+                results[purchase_id] = purchase
+
+            if self.read_your_writes:
+                await self.read_your_writes.pin(*changes)
+
+        for purchase in results.values():
+            await self.queue.finalize(
+                purchase.id, purchase.user_id, purchase.status, purchase.error
+            )
+        await self.purchases.outbox.dispatch()
+        # с outbox кэш и счётчики обновит relay_outbox по событиям из charge
+        if not self.purchases.outbox.enabled:
+            for user_id, user_changes in changes.items():
+                await self.purchases.inventory_service.apply_purchase(
+                    user_id, user_changes
+                )
+            if counts:
+                await self.purchases.popularity.record(counts)
+
+        await self.queue.ack([entry_id for entry_id, _ in entries])
+
+        failed = sum(
+            purchase.status == PurchaseRequestStatus.FAILED
+            for purchase in results.values()
+        )
+        if failed:
+            logger.info(f"Purchases settled with {failed} failed of {len(results)}")
+
+        return len(entries)
+
+    async def _settle_one(self, purchase: PurchaseRequest) -> InventoryChange:
+        balance = await self.purchases.balance.get_for_debit(purchase.user_id)
+        if balance is None:
+            raise UserNotFoundError()
+
+        # цена зафиксирована при резерве; товар мог стать неактивным — покупка
+        # уже принята, проводим её
+        product = await self.purchases.catalog.get(
+            self.session, self.redis, purchase.product_id
+        )
+        if not product:
+            raise ProductNotFoundError()
+
+        item = await self.purchases.charge(
+            purchase.user_id,
+            purchase.product_id,
+            product.type,
+            purchase.amount,
+            balance,
+        )
+        return InventoryChange(
+            purchase.product_id,
+            product.type,
+            item.quantity,
+            item.purchased_at,
+            item.version,
+        )
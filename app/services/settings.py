@@ -0,0 +1,87 @@
+import enum
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class PurchaseEngine(str, enum.Enum):
+    ORM = "orm"
+    SQL = "sql"
+
+
+class PurchaseMode(str, enum.Enum):
+    SYNC = "sync"
+    ASYNC = "async"
+
+
+class InventoryCacheBackend(str, enum.Enum):
+    JSON = "json"
+    HASH = "hash"
+
+
+class AnalyticsSource(str, enum.Enum):
+    TRANSACTIONS = "transactions"
+    COUNTERS = "counters"
+
+
+class BalanceBackend(str, enum.Enum):
+    COLUMN = "column"
+    LEDGER = "ledger"
+    SHARDED = "sharded"
+
+
+class ServiceSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        env_prefix="SERVICE_",
+        extra="ignore",
+    )
+
+    purchase_engine: PurchaseEngine = Field(PurchaseEngine.ORM)
+    # async: покупка резервирует баланс в Redis и отвечает 202, в Postgres
+    # её проводит задача settle_purchases пачками
+    purchase_mode: PurchaseMode = Field(PurchaseMode.SYNC)
+    purchase_stream: str = Field("purchases:stream")
+    purchase_batch_size: int = Field(100)
+    # через сколько мс необработанную запись забирает другой воркер
+    purchase_claim_idle_ms: int = Field(60_000)
+    # сколько живут статус проведённой покупки и резерв баланса без покупок
+    purchase_status_ttl: int = Field(60 * 60 * 24)
+    purchase_balance_ttl: int = Field(60 * 60)
+    inventory_cache_backend: InventoryCacheBackend = Field(InventoryCacheBackend.JSON)
+
+    # покупки, использование и пополнения пишут событие в outbox_events в своей
+    # транзакции, а кэши и поток событий в Redis обновляет задача relay_outbox
+    outbox_enabled: bool = Field(False)
+    outbox_batch_size: int = Field(500)
+    # без outbox события пишутся в поток после коммита, если включено
+    events_enabled: bool = Field(False)
+    events_stream: str = Field("events:stream")
+    # примерная длина потока: XADD ... MAXLEN ~
+    events_stream_maxlen: int = Field(100_000)
+
+    # где хранится баланс: колонка users.balance, журнал balance_entries
+    # со снимками или колонка плюс шарды balance_shards для «горячих»
+    # пользователей; purchase_engine=sql работает только с колонкой
+    balance_backend: BalanceBackend = Field(BalanceBackend.COLUMN)
+    # сколько пользователей сворачивает в снимки один запуск задачи
+    balance_snapshot_batch_size: int = Field(1000)
+    # возраст (сек), после которого строка журнала считается закоммиченной:
+    # водяной знак свёртки не перешагивает более свежие строки
+    balance_snapshot_settle_seconds: int = Field(60)
+
+    # каталог товаров: размер и TTL (сек) локального уровня, TTL ключей в Redis
+    product_cache_size: int = Field(1024)
+    product_cache_local_ttl: float = Field(30)
+    product_cache_ttl: int = Field(3600)
+
+    # откуда строится топ популярных товаров: GROUP BY по transactions
+    # или почасовые счётчики в Redis
+    analytics_source: AnalyticsSource = Field(AnalyticsSource.TRANSACTIONS)
+
+    # месячные партиции transactions: сколько создавать вперёд,
+    # сколько месяцев держать в горячей таблице и куда переносить старые
+    transactions_partitions_ahead: int = Field(3)
+    transactions_retention_months: int = Field(12)
+    transactions_archive_schema: str = Field("archive")
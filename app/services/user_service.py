@@ -1,35 +1,51 @@
-from fastapi import HTTPException
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.exceptions.user import UserIdempotencyConflictError, UserInvalidTopUpAmountError, UserNotFoundError
+from app.database.models.balance import BalanceEntryReason
+from app.exceptions.user import UserInvalidTopUpAmountError, UserNotFoundError
 from app.repositories.user_repository import UserRepository
+from app.services.balance import BALANCE_BACKENDS
+from app.services.outbox import Outbox, OutboxTopic
+from app.services.purchase_queue import PurchaseQueue
+from app.services.settings import PurchaseMode, ServiceSettings
 
 
 class UserService:
-    IDEMPOTENCY_TTL = 60 * 60 * 24
-
-    def __init__(self, session: AsyncSession, redis: Redis):
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        settings: ServiceSettings | None = None,
+    ):
         self.session = session
         self.user_repository: UserRepository = UserRepository(session=session)
         self.redis = redis
-
-    async def add_funds(self, user_id: int, amount: int, idem_key: str):
-        if await self.redis.exists(f"idempotency:{idem_key}"):
-            raise UserIdempotencyConflictError()
-
+        self.settings = settings or ServiceSettings()
+        self.balance = BALANCE_BACKENDS[self.settings.balance_backend](session)
+        self.queue = PurchaseQueue(redis, self.settings)
+        self.outbox = Outbox(session, redis, self.settings)
+
+    async def add_funds(self, user_id: int, amount: int) -> int:
+        """Зачисляет `amount`, возвращает новый баланс."""
+        # повторы по Idempotency-Key отсекает зависимость Idempotency в ручке
         if amount <= 0:
             raise UserInvalidTopUpAmountError()
 
         async with self.session.begin():
-            user = await self.user_repository.get_for_update(user_id)
-            if not user:
+            balance = await self.balance.credit(
+                user_id, amount, BalanceEntryReason.TOP_UP
+            )
+            if balance is None:
                 raise UserNotFoundError()
 
-            user.balance += amount
-            self.session.add(user)
-            await self.session.commit()
+            await self.outbox.publish(
+                OutboxTopic.BALANCE_CREDITED,
+                {"user_id": user_id, "amount": amount, "balance": balance},
+            )
 
-        await self.redis.set(f"idempotency:{idem_key}", "1", ex=self.IDEMPOTENCY_TTL)
+        await self.outbox.dispatch()
+        if self.settings.purchase_mode == PurchaseMode.ASYNC:
+            # резерв в Redis видит пополнение сразу, без пересева из БД
+            await self.queue.adjust(user_id, amount)
 
-        return user
+        return balance
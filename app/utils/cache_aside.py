@@ -0,0 +1,190 @@
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, TypeVar
+
+from redis.asyncio import Redis
+
+from app.utils.single_flight import SingleFlight
+
+T = TypeVar("T")
+
+# снимаем блокировку, только если она всё ещё наша
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# загрузки склеиваются в пределах процесса, а не одного экземпляра CacheAside
+_flights = SingleFlight()
+
+
+class CacheAside:
+    """Cache-aside с защитой от stampede.
+
+    Промах по ключу пересчитывается один раз на кластер: внутри процесса
+    параллельные запросы ждут общий future, между воркерами — короткую
+    блокировку `{key}:lock` в Redis. Не получившие блокировку ждут, пока
+    значение появится, и только по таймауту считают сами.
+
+    `get_or_load` дополнительно хранит рядом `{key}:meta` (время пересчёта и
+    логическое истечение). Значение живёт в Redis на `stale_ttl` дольше `ttl`:
+    после логического истечения его отдают, пока один запрос пересчитывает
+    (stale-while-revalidate), а незадолго до истечения пересчёт запускается
+    заранее с вероятностью по XFetch. Каждый пересчёт получает новое поколение
+    (generation в meta) — по нему строится ETag без чтения самого значения.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        lock_ttl: float = 5.0,
+        wait_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+        flights: SingleFlight | None = None,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.flights = flights or _flights
+
+    @staticmethod
+    def meta_key(key: str) -> str:
+        return f"{key}:meta"
+
+    @staticmethod
+    def lock_key(key: str) -> str:
+        return f"{key}:lock"
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[str]]) -> str:
+        """Строковое значение по ключу; `loader` возвращает уже сериализованное."""
+        value, _ = await self.get_or_load_versioned(key, loader)
+        return value
+
+    async def get_or_load_versioned(
+        self, key: str, loader: Callable[[], Awaitable[str]]
+    ) -> tuple[str, str | None]:
+        """Как get_or_load, но вместе с поколением значения.
+
+        Поколение None — значение записано в обход хелпера (без meta).
+        """
+        value, meta = await self.redis.mget([key, self.meta_key(key)])
+
+        if value is not None:
+            meta = json.loads(meta) if meta is not None else None
+            if not self._should_refresh(meta):
+                return value, self._generation(meta)
+
+            # пересчитывает тот, кто взял блокировку; остальные отдают старое
+            token = await self._acquire(key)
+            if token is None:
+                return value, self._generation(meta)
+            try:
+                return await self._compute(key, loader)
+            finally:
+                await self._release(key, token)
+
+        return await self.coalesce(
+            key, lambda: self._compute(key, loader), lambda: self._read(key)
+        )
+
+    async def generation(self, key: str) -> str | None:
+        """Поколение закэшированного значения одним GET, без самого значения."""
+        meta = await self.redis.get(self.meta_key(key))
+        return self._generation(json.loads(meta) if meta is not None else None)
+
+    async def coalesce(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[T]],
+        recheck: Callable[[], Awaitable[T | None]],
+    ) -> T:
+        """Выполняет `loader` один раз на ключ; `loader` сам пишет результат в кэш.
+
+        `recheck` читает кэш, пока блокировку держит другой воркер.
+        """
+        return await self.flights.do(
+            key, lambda: self._load_locked(key, loader, recheck)
+        )
+
+    async def _load_locked(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[T]],
+        recheck: Callable[[], Awaitable[T | None]],
+    ) -> T:
+        token = await self._acquire(key)
+        if token is not None:
+            try:
+                return await loader()
+            finally:
+                await self._release(key, token)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            value = await recheck()
+            if value is not None:
+                return value
+
+        # владелец блокировки завис или упал — не держим запрос дольше таймаута
+        return await loader()
+
+    async def _compute(
+        self, key: str, loader: Callable[[], Awaitable[str]]
+    ) -> tuple[str, str]:
+        started = time.monotonic()
+        value = await loader()
+        delta = time.monotonic() - started
+
+        generation = uuid.uuid4().hex
+        meta = json.dumps(
+            {"delta": delta, "expiry": time.time() + self.ttl, "generation": generation}
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, ex=self.ttl + self.stale_ttl)
+            pipe.set(self.meta_key(key), meta, ex=self.ttl + self.stale_ttl)
+            await pipe.execute()
+
+        return value, generation
+
+    async def _read(self, key: str) -> tuple[str, str | None] | None:
+        value, meta = await self.redis.mget([key, self.meta_key(key)])
+        if value is None:
+            return None
+        return value, self._generation(json.loads(meta) if meta is not None else None)
+
+    @staticmethod
+    def _generation(meta: dict | None) -> str | None:
+        return meta.get("generation") if meta else None
+
+    def _should_refresh(self, meta: dict | None) -> bool:
+        # значение без meta записано в обход хелпера — живёт до своего TTL
+        if meta is None:
+            return False
+
+        # XFetch: чем дольше пересчёт и ближе истечение, тем вероятнее ранний пересчёт
+        jitter = -meta["delta"] * self.beta * math.log(1 - random.random())
+        return time.time() + jitter >= meta["expiry"]
+
+    async def _acquire(self, key: str) -> str | None:
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            self.lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)
+        )
+        return token if acquired else None
+
+    async def _release(self, key: str, token: str):
+        await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_key(key), token)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import uuid
+
+from fastapi import Depends, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from redis.asyncio import Redis
+
+from app.exceptions.idempotency import (
+    IdempotencyInProgressError,
+    IdempotencyKeyReusedError,
+)
+from app.redis.deps import get_redis
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# записываем ответ, только если резерв всё ещё наш (не истёк и не перехвачен)
+COMPLETE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+end
+return false
+"""
+
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def fingerprint(method: str, path: str, query: str, body: bytes) -> str:
+    """Отпечаток запроса: тот же ключ с другим отпечатком — ошибка клиента."""
+    return hashlib.sha256(
+        b"\n".join([method.encode(), path.encode(), query.encode(), body])
+    ).hexdigest()
+
+
+class IdempotentReplay(Exception):
+    """Повтор уже выполненного запроса: middleware отдаёт сохранённый ответ."""
+
+    def __init__(self, status_code: int, body: str, media_type: str | None):
+        self.status_code = status_code
+        self.body = body
+        self.media_type = media_type
+
+    def response(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+class IdempotencyReservation:
+    """Резерв ключа на время выполнения запроса, хранится в request.state."""
+
+    def __init__(self, redis: Redis, key: str, record: str, ttl: int):
+        self.redis = redis
+        self.key = key
+        self.record = record
+        self.ttl = ttl
+
+    async def complete(self, status_code: int, body: bytes, media_type: str | None):
+        stored_fingerprint = json.loads(self.record)["fingerprint"]
+        stored = json.dumps(
+            {
+                "state": "completed",
+                "fingerprint": stored_fingerprint,
+                "status": status_code,
+                "body": body.decode(),
+                "media_type": media_type,
+            }
+        )
+        await self.redis.eval(
+            COMPLETE_SCRIPT, 1, self.key, self.record, stored, self.ttl
+        )
+
+    async def release(self):
+        await self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.record)
+
+
+class Idempotency:
+    """Зависимость FastAPI для мутирующих ручек.
+
+    Один `SET NX GET` резервирует ключ (состояние in_progress) и сразу
+    возвращает прежнюю запись, если она есть: повтор завершённого запроса
+    получает сохранённый ответ, параллельный дубль — 409, тот же ключ с другим
+    телом — 422. Ответ сохраняет middleware после успешного выполнения; при
+    ошибке резерв снимается, и клиент может повторить запрос.
+
+    Резерв живёт `lock_ttl` секунд — упавший запрос не блокирует ключ навсегда.
+    """
+
+    TTL = 60 * 60 * 24
+
+    def __init__(
+        self, scope: str, required: bool = True, ttl: int = TTL, lock_ttl: int = 60
+    ):
+        self.scope = scope
+        self.required = required
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    def key(self, idempotency_key: str) -> str:
+        return f"idempotency:{self.scope}:{idempotency_key}"
+
+    async def __call__(
+        self,
+        request: Request,
+        idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_HEADER),
+        redis: Redis = Depends(get_redis),
+    ):
+        if idempotency_key is None:
+            if self.required:
+                raise RequestValidationError(
+                    [
+                        {
+                            "type": "missing",
+                            "loc": ("header", IDEMPOTENCY_HEADER),
+                            "msg": "Field required",
+                            "input": None,
+                        }
+                    ]
+                )
+            return
+
+        request_fingerprint = fingerprint(
+            request.method,
+            request.url.path,
+            request.url.query,
+            await request.body(),
+        )
+        key = self.key(idempotency_key)
+        record = json.dumps(
+            {
+                "state": "in_progress",
+                "fingerprint": request_fingerprint,
+                "token": uuid.uuid4().hex,
+            }
+        )
+
+        previous = await redis.set(key, record, nx=True, get=True, ex=self.lock_ttl)
+        if previous is None:
+            request.state.idempotency = IdempotencyReservation(
+                redis, key, record, self.ttl
+            )
+            return
+
+        previous = json.loads(previous)
+        if previous["fingerprint"] != request_fingerprint:
+            raise IdempotencyKeyReusedError()
+        if previous["state"] == "in_progress":
+            raise IdempotencyInProgressError()
+
+        raise IdempotentReplay(
+            previous["status"], previous["body"], previous["media_type"]
+        )
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Awaitable, Callable
+
+from fastapi import Response, status
+
+
+def json_response(body: str | bytes, version: str | None = None) -> Response:
+    """Ответ из уже сериализованного JSON, без повторной валидации FastAPI.
+
+    ETag — версия документа, а без неё хэш тела: одинаковый документ даёт
+    одинаковый ETag на всех воркерах.
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": make_etag(body, version)},
+    )
+
+
+def make_etag(body: bytes, version: str | None = None) -> str:
+    if version is None:
+        version = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Слабое сравнение If-None-Match (RFC 9110): префикс W/ не учитывается."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+async def conditional_json_response(
+    if_none_match: str | None,
+    get_version: Callable[[], Awaitable[str | None]],
+    load: Callable[[], Awaitable[tuple[str, str | None]]],
+) -> Response:
+    """JSON-ответ с поддержкой If-None-Match.
+
+    Сначала сверяется только версия (`get_version` — один GET в Redis), и при
+    совпадении отвечаем 304, не загружая документ. Иначе `load` отдаёт
+    документ с версией; без версии ETag считается по телу.
+    """
+    if if_none_match:
+        version = await get_version()
+        if version is not None and etag_matches(if_none_match, f'"{version}"'):
+            return not_modified(f'"{version}"')
+
+    body, version = await load()
+    response = json_response(body, version)
+    if etag_matches(if_none_match, response.headers["ETag"]):
+        return not_modified(response.headers["ETag"])
+    return response
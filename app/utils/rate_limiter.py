@@ -1,27 +1,320 @@
-from fastapi import Depends, HTTPException, Request
+import enum
+import math
+import time
+import uuid
+from typing import Callable, NamedTuple
+
+from fastapi import Depends, HTTPException, Request, Response
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 
 from app.redis.deps import get_redis
+from app.utils.ttl_cache import TTLCache
 
+# Все скрипты: KEYS[1] — ключ клиента, ARGV = limit, window_ms, cost[, member].
+# Время берётся из Redis (TIME), чтобы воркеры с разными часами видели одно окно.
+# Ответ: {allowed, remaining, retry_after_ms, reset_after_ms}.
 
-def simple_rate_limit(limit: int, window: int):
-    async def dependency(
-        request: Request,
-        redis: Redis = Depends(get_redis),
+SLIDING_LOG_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local member = ARGV[4]
+
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+
+if count + cost <= limit then
+    for i = 1, cost do
+        redis.call('ZADD', key, now, member .. ':' .. i)
+    end
+    redis.call('PEXPIRE', key, window)
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    return {1, limit - count - cost, 0, oldest[2] + window - now}
+end
+
+if cost > limit then
+    return {0, limit - count, window, window}
+end
+
+-- ждать, пока из окна выйдет столько запросов, чтобы поместился cost
+local need = count + cost - limit
+local blocker = redis.call('ZRANGE', key, need - 1, need - 1, 'WITHSCORES')
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return {0, limit - count, blocker[2] + window - now, oldest[2] + window - now}
+"""
+
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+
+local index = math.floor(now / window)
+local elapsed = now - index * window
+local current_key = key .. ':' .. index
+local previous = tonumber(redis.call('GET', key .. ':' .. (index - 1)) or '0')
+local current = tonumber(redis.call('GET', current_key) or '0')
+
+-- предыдущее окно учитывается пропорционально своей части в скользящем окне
+local weight = (window - elapsed) / window
+local estimated = previous * weight + current
+
+if estimated + cost <= limit then
+    redis.call('INCRBY', current_key, cost)
+    redis.call('PEXPIRE', current_key, window * 2)
+    return {1, math.floor(limit - estimated - cost), 0, window - elapsed}
+end
+
+local retry
+if current + cost > limit then
+    -- не поместится даже без предыдущего окна: ждём следующего окна, где
+    -- текущий счётчик станет предыдущим и его вес должен упасть достаточно
+    local next_weight = math.max(0, (limit - cost) / current)
+    retry = window - elapsed + math.ceil((1 - math.min(1, next_weight)) * window)
+else
+    local allowed_weight = (limit - current - cost) / previous
+    retry = math.ceil((weight - allowed_weight) * window)
+end
+return {0, math.max(0, math.floor(limit - estimated)), retry, window - elapsed}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+
+-- ведро на capacity токенов, полностью наполняется за window
+local rate = capacity / window
+local state = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+
+redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', key, window)
+return {allowed, math.floor(tokens), retry, math.ceil((capacity - tokens) / rate)}
+"""
+
+
+class RateLimitAlgorithm(str, enum.Enum):
+    # точный журнал запросов в ZSET, память O(limit) на клиента
+    SLIDING_LOG = "sliding_log"
+    # два счётчика соседних окон, взвешенная оценка, память O(1)
+    SLIDING_WINDOW = "sliding_window"
+    # ведро токенов: допускает всплеск до limit, дальше limit / window в среднем
+    TOKEN_BUCKET = "token_bucket"
+
+
+SCRIPTS = {
+    RateLimitAlgorithm.SLIDING_LOG: SLIDING_LOG_SCRIPT,
+    RateLimitAlgorithm.SLIDING_WINDOW: SLIDING_WINDOW_SCRIPT,
+    RateLimitAlgorithm.TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+}
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def client_ip(request: Request) -> str:
+    return f"ip:{request.client.host}"
+
+
+def user_or_ip(request: Request) -> str:
+    """user_id из пути или query, иначе IP клиента."""
+    user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return client_ip(request)
+
+
+class LocalBucket:
+    """Состояние ключа в локальном уровне."""
+
+    __slots__ = ("budget", "remaining", "blocked_until", "reset_at")
+
+    def __init__(self):
+        self.budget = 0
+        self.remaining = 0
+        self.blocked_until = 0.0
+        self.reset_at = 0.0
+
+
+class LocalRateLimitTier:
+    """Предварительная проверка лимита в памяти процесса.
+
+    Разрешения берутся у Redis в аренду пачкой (одним вызовом скрипта с
+    cost = размер аренды) и расходуются локально. Размер аренды — половина
+    остатка в Redis, не больше `max_lease`, чтобы воркеры делили остаток
+    честно. После отказа Redis ключ блокируется локально до Retry-After:
+    клиент за лимитом больше не стоит похода в Redis. Ключей не больше
+    `max_keys` (LRU), неизрасходованная аренда просто сгорает.
+    """
+
+    def __init__(self, limiter: "RateLimiter", max_keys: int, max_lease: int):
+        self.limiter = limiter
+        self.max_lease = max_lease
+        self.buckets = TTLCache(max_keys, limiter.window)
+
+    async def hit(self, redis: Redis, key: str) -> RateLimitResult:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+
+        if bucket is not None:
+            if now < bucket.blocked_until:
+                return self._result(bucket, now, allowed=False)
+            if bucket.budget > 0:
+                bucket.budget -= 1
+                return self._result(bucket, now, allowed=True)
+        else:
+            bucket = LocalBucket()
+            self.buckets.set(key, bucket)
+
+        lease = max(1, min(self.max_lease, bucket.remaining // 2))
+        result = await self.limiter.hit(redis, key, cost=lease)
+        if not result.allowed and lease > 1:
+            # остаток съели другие воркеры — берём хотя бы этот запрос
+            lease = 1
+            result = await self.limiter.hit(redis, key, cost=lease)
+
+        now = time.monotonic()
+        bucket.remaining = result.remaining
+        bucket.reset_at = now + result.reset_after
+        if result.allowed:
+            bucket.budget = lease - 1
+            bucket.blocked_until = 0.0
+        else:
+            bucket.budget = 0
+            bucket.blocked_until = now + result.retry_after
+
+        return self._result(bucket, now, result.allowed)
+
+    def _result(self, bucket: LocalBucket, now: float, allowed: bool):
+        return RateLimitResult(
+            allowed=allowed,
+            limit=self.limiter.limit,
+            remaining=bucket.budget + bucket.remaining if allowed else 0,
+            retry_after=0 if allowed else bucket.blocked_until - now,
+            reset_after=max(0.0, bucket.reset_at - now),
+        )
+
+
+class RateLimiter:
+    """Зависимость FastAPI: один EVALSHA на запрос, заголовки X-RateLimit-*."""
+
+    def __init__(
+        self,
+        limit: int,
+        window: int,
+        algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW,
+        key_func: Callable[[Request], str] = client_ip,
+        cost: int = 1,
     ):
-        ip = request.client.host
-        path = request.url.path
+        self.limit = limit
+        self.window = window
+        self.algorithm = algorithm
+        self.key_func = key_func
+        self.cost = cost
+        self._script: AsyncScript | None = None
+        self.local_tier: LocalRateLimitTier | None = None
+
+    def key(self, request: Request) -> str:
+        # шаблон маршрута, а не конкретный путь: /users/1/... и /users/2/... —
+        # одна ручка; фигурные скобки — hash tag для Redis Cluster
+        route = request.scope.get("route")
+        path = route.path if route else request.url.path
+        return f"rl:{self.algorithm.value}:{{{self.key_func(request)}}}:{path}"
 
-        key = f"rl:{ip}:{path}"
+    async def hit(self, redis: Redis, key: str, cost: int | None = None):
+        """Списывает `cost` из лимита ключа, если он помещается."""
+        if self._script is None:
+            # Script сам делает EVALSHA и откатывается на EVAL при NOSCRIPT
+            self._script = redis.register_script(SCRIPTS[self.algorithm])
 
-        current = await redis.incr(key)
+        args = [self.limit, self.window * 1000, cost or self.cost]
+        if self.algorithm == RateLimitAlgorithm.SLIDING_LOG:
+            args.append(uuid.uuid4().hex)
 
-        if current == 1:
-            await redis.expire(key, window)
+        allowed, remaining, retry_after_ms, reset_after_ms = await self._script(
+            keys=[key], args=args, client=redis
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=self.limit,
+            remaining=max(0, int(remaining)),
+            retry_after=int(retry_after_ms) / 1000,
+            reset_after=int(reset_after_ms) / 1000,
+        )
 
-        if current > limit:
+    async def __call__(
+        self,
+        request: Request,
+        response: Response,
+        redis: Redis = Depends(get_redis),
+    ):
+        settings = request.app.state.settings.api
+        if settings.rate_limit_local:
+            if self.local_tier is None:
+                self.local_tier = LocalRateLimitTier(
+                    self,
+                    settings.rate_limit_local_max_keys,
+                    settings.rate_limit_local_max_lease,
+                )
+            result = await self.local_tier.hit(redis, self.key(request))
+        else:
+            result = await self.hit(redis, self.key(request))
+
+        if not result.allowed:
             raise HTTPException(
-                429, f"Rate limit exceeded: max {limit} requests per {window} seconds"
+                429,
+                f"Rate limit exceeded: max {self.limit} requests "
+                f"per {self.window} seconds",
+                headers=result.headers,
             )
 
-    return dependency
+        response.headers.update(result.headers)
+
+
+def simple_rate_limit(
+    limit: int,
+    window: int,
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW,
+    key_func: Callable[[Request], str] = client_ip,
+) -> RateLimiter:
+    return RateLimiter(limit, window, algorithm, key_func)
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Склеивает параллельные загрузки одного ключа в один вызов.
+
+    Первый вызов по ключу выполняет `loader`, остальные ждут его результат
+    (или исключение) вместо того, чтобы идти в БД/Redis самостоятельно.
+    Отмена первого вызова (клиент отключился) ожидающих не роняет: один из
+    них становится новым ведущим и загружает заново.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while (flight := self._flights.get(key)) is not None:
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # отменили нас самих, а не ведущего, — отмену пробрасываем
+                if not flight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            # чтобы не было "Future exception was never retrieved" без ожидающих
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
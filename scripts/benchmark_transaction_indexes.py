@@ -0,0 +1,177 @@
+"""Сравнение набора индексов transactions до и после b7d2c9e04a13.
+
+Создаёт две временные таблицы той же формы, что transactions: помесячные
+партиции по created_at и status типа transaction_status_enum. Одна получает
+прежние индексы, другая — частичный покрывающий. В каждую вставляет
+одинаковые данные пачками (пропускная способность вставки) и гоняет запрос
+аналитики популярных товаров (медиана задержки).
+
+Запуск против отдельной БД с применёнными миграциями — нужен enum статуса
+(настройки DB_* из .env):
+
+    python scripts/benchmark_transaction_indexes.py --rows 1000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from os.path import abspath, dirname
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from app.database.settings import DBSettings  # noqa: E402
+
+VARIANTS = {
+    "before": [
+        "CREATE INDEX ON {table} (status)",
+        "CREATE INDEX ON {table} (created_at)",
+        "CREATE INDEX ON {table} (product_id)",
+        "CREATE INDEX ON {table} (status, created_at)",
+    ],
+    "after": [
+        "CREATE INDEX ON {table} (product_id)",
+        "CREATE INDEX ON {table} (created_at) INCLUDE (product_id) "
+        "WHERE status = 'completed'",
+    ],
+}
+
+INSERT_BATCH = """
+INSERT INTO {table} (user_id, product_id, amount, status, created_at)
+SELECT
+    1 + (random() * 10000)::int,
+    1 + (random() * 200)::int,
+    100,
+    (CASE WHEN random() < 0.95 THEN 'completed' ELSE 'failed' END)
+        ::transaction_status_enum,
+    now() - random() * interval '90 days'
+FROM generate_series(1, :batch)
+"""
+
+# как в миграции 8e3f1a6b2d47: месяц на партицию, на случай краёв — DEFAULT
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    partition_month date;
+BEGIN
+    FOR partition_month IN
+        SELECT generate_series(
+            date_trunc('month', (now() - interval '90 days') AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC'),
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+            '{table}_' || to_char(partition_month, '"y"YYYY"m"MM'),
+            partition_month::text || ' 00:00+00',
+            (partition_month + interval '1 month')::date::text || ' 00:00+00'
+        );
+    END LOOP;
+END
+$$
+"""
+
+POPULAR_PRODUCTS = """
+SELECT product_id, count(*) AS total
+FROM {table}
+WHERE status = 'completed' AND created_at >= now() - interval '7 days'
+GROUP BY product_id
+ORDER BY total DESC
+LIMIT 5
+"""
+
+
+async def benchmark(
+    conn: AsyncConnection, variant: str, rows: int, batch: int, runs: int
+) -> dict[str, float]:
+    table = f"bench_transactions_{variant}"
+    await conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    await conn.execute(
+        text(
+            f"""
+            CREATE TABLE {table} (
+                id bigserial,
+                user_id integer NOT NULL,
+                product_id integer NOT NULL,
+                amount integer NOT NULL,
+                status transaction_status_enum NOT NULL,
+                created_at timestamptz NOT NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+    )
+    await conn.execute(
+        text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    )
+    await conn.execute(text(CREATE_PARTITIONS.format(table=table)))
+    for ddl in VARIANTS[variant]:
+        await conn.execute(text(ddl.format(table=table)))
+
+    started = time.perf_counter()
+    for _ in range(rows // batch):
+        await conn.execute(text(INSERT_BATCH.format(table=table)), {"batch": batch})
+    insert_seconds = time.perf_counter() - started
+
+    # карта видимости нужна для index-only scan
+    await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+    query = text(POPULAR_PRODUCTS.format(table=table))
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await conn.execute(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # у партиционированного родителя своих данных нет — суммируем по партициям
+    size = await conn.scalar(
+        text(
+            "SELECT coalesce(sum(pg_indexes_size(inhrelid)), 0) / 1024 / 1024 "
+            f"FROM pg_inherits WHERE inhparent = '{table}'::regclass"
+        )
+    )
+    await conn.execute(text(f"DROP TABLE {table}"))
+
+    return {
+        "rows_per_sec": rows / insert_seconds,
+        "query_p50_ms": statistics.median(latencies),
+        "indexes_mb": float(size),
+    }
+
+
+async def main(rows: int, batch: int, runs: int):
+    engine = create_async_engine(
+        DBSettings().url, isolation_level="AUTOCOMMIT", pool_size=1
+    )
+    try:
+        async with engine.connect() as conn:
+            results = {
+                variant: await benchmark(conn, variant, rows, batch, runs)
+                for variant in VARIANTS
+            }
+    finally:
+        await engine.dispose()
+
+    print(
+        f"{'variant':<8} {'insert rows/s':>14} {'query p50 ms':>13} {'indexes MB':>11}"
+    )
+    for variant, result in results.items():
+        print(
+            f"{variant:<8} {result['rows_per_sec']:>14.0f} "
+            f"{result['query_p50_ms']:>13.2f} {result['indexes_mb']:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.batch, args.runs))
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import UTC, datetime, timedelta
 
@@ -6,6 +7,9 @@ from sqlalchemy import delete
 
 from app.database.models import Product, TransactionStatus, User
 from app.database.models.transaction import Transaction
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.services.popularity_counter import PopularityCounter
+from app.services.settings import AnalyticsSource
 
 
 @pytest.mark.anyio
@@ -165,3 +169,186 @@ class TestPopularProducts:
 
         cache = await redis_mock.get("analytics:popular-products")
         assert json.loads(cache) == [{"product_id": p.id, "count": 1}]
+
+    async def test_cache_hit_returns_stored_bytes(self, client, redis_mock):
+        cached = '[{"product_id": 7, "count": 3}]'
+        await redis_mock.set("analytics:popular-products", cached)
+
+        response = await client.get("/api/v1/analytics/popular-products")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.text == cached
+        assert response.headers["etag"].startswith('"')
+
+    async def test_not_modified_while_cache_generation_holds(self, client, redis_mock):
+        first = await client.get("/api/v1/analytics/popular-products")
+        etag = first.headers["etag"]
+
+        response = await client.get(
+            "/api/v1/analytics/popular-products", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+        # пересчёт топа — новое поколение и новый ETag
+        await redis_mock.delete(
+            "analytics:popular-products", "analytics:popular-products:meta"
+        )
+        response = await client.get(
+            "/api/v1/analytics/popular-products", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    async def test_concurrent_cold_requests_compute_once(
+        self, client, session_maker, redis_mock, monkeypatch
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            p = await self._create_product(session)
+            await session.flush()
+
+            await self._create_transaction(session, user.id, p.id)
+            await session.commit()
+
+        calls = 0
+        original = AnalyticsRepository.get_popular_products
+
+        async def counting_get_popular_products(self, *args, **kwargs):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return await original(self, *args, **kwargs)
+
+        monkeypatch.setattr(
+            AnalyticsRepository, "get_popular_products", counting_get_popular_products
+        )
+
+        responses = await asyncio.gather(
+            *(client.get("/api/v1/analytics/popular-products") for _ in range(5))
+        )
+
+        assert all(
+            response.json() == [{"product_id": p.id, "count": 1}]
+            for response in responses
+        )
+        assert calls == 1
+
+    async def test_expired_top_recomputed_by_lock_holder(
+        self, client, session_maker, redis_mock
+    ):
+        await redis_mock.set(
+            "analytics:popular-products", json.dumps([{"product_id": 1, "count": 9}])
+        )
+        await redis_mock.set(
+            "analytics:popular-products:meta",
+            json.dumps({"delta": 0, "expiry": 0}),
+        )
+
+        response = await client.get("/api/v1/analytics/popular-products")
+
+        # истёкший топ пересчитан запросом, взявшим блокировку
+        assert response.json() == []
+        assert json.loads(await redis_mock.get("analytics:popular-products")) == []
+
+    async def test_success_days_and_limit_params(
+        self, client, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            p1 = await self._create_product(session, "A")
+            p2 = await self._create_product(session, "B")
+            await session.flush()
+
+            await self._create_transaction(session, user.id, p1.id, days_ago=20)
+            await self._create_transaction(session, user.id, p1.id, days_ago=20)
+            await self._create_transaction(session, user.id, p2.id)
+            await session.commit()
+
+        response = await client.get(
+            "/api/v1/analytics/popular-products", params={"days": 30, "limit": 1}
+        )
+        assert response.status_code == 200
+        assert response.json() == [{"product_id": p1.id, "count": 2}]
+
+        # другие параметры — другой ключ кэша
+        response = await client.get("/api/v1/analytics/popular-products")
+        assert response.json() == [{"product_id": p2.id, "count": 1}]
+
+    @pytest.mark.parametrize("params", [{"days": 0}, {"days": 31}, {"limit": 0}])
+    async def test_unprocessable_entity_when_params_out_of_range(
+        self, client, redis_mock, params
+    ):
+        response = await client.get("/api/v1/analytics/popular-products", params=params)
+
+        assert response.status_code == 422
+
+
+@pytest.mark.anyio
+class TestPopularProductsCounters:
+    """Топ по почасовым счётчикам в Redis вместо GROUP BY по transactions."""
+
+    @pytest.fixture(autouse=True)
+    def counters_source(self, app_settings):
+        app_settings.services.analytics_source = AnalyticsSource.COUNTERS
+
+    async def test_success_counts_committed_purchases(
+        self, client, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=1000)
+            p1 = Product(name="A", price=10, type="consumable", is_active=True)
+            p2 = Product(name="B", price=10, type="consumable", is_active=True)
+            session.add_all([user, p1, p2])
+            await session.commit()
+
+        for product_id in (p1.id, p2.id, p2.id):
+            response = await client.post(
+                f"/api/v1/products/{product_id}/purchase", params={"user_id": user.id}
+            )
+            assert response.status_code == 200
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={"items": [{"product_id": p1.id, "quantity": 3}]},
+        )
+        assert response.status_code == 200
+
+        response = await client.get("/api/v1/analytics/popular-products")
+        assert response.status_code == 200
+        assert response.json() == [
+            {"product_id": p1.id, "count": 4},
+            {"product_id": p2.id, "count": 2},
+        ]
+
+    async def test_success_window_and_limit(self, client, redis_mock):
+        counter = PopularityCounter(redis_mock)
+        now = datetime.now(UTC)
+        await counter.record({1: 1, 2: 2})
+        await counter.record({3: 5}, at=now - timedelta(hours=30))
+        await counter.record({4: 9}, at=now - timedelta(days=10))
+
+        response = await client.get(
+            "/api/v1/analytics/popular-products", params={"days": 1}
+        )
+        assert response.json() == [
+            {"product_id": 2, "count": 2},
+            {"product_id": 1, "count": 1},
+        ]
+
+        response = await client.get(
+            "/api/v1/analytics/popular-products", params={"days": 30, "limit": 2}
+        )
+        assert response.json() == [
+            {"product_id": 4, "count": 9},
+            {"product_id": 3, "count": 5},
+        ]
+
+    async def test_empty_closed_window_cached_until_next_hour(self, redis_mock):
+        counter = PopularityCounter(redis_mock)
+        assert await counter.top(24, 5) == []
+
+        # закрытая часть окна уже собрана пустой — до смены часа её не пересобирают
+        await counter.record({1: 3}, at=datetime.now(UTC) - timedelta(hours=2))
+        assert await counter.top(24, 5) == []
@@ -0,0 +1,56 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.deps import get_engine
+from app.database.engine import MeteredPool
+from app.main import app
+from tests.fixtures.db import TEST_CONNECT_ARGS, TEST_DATABASE_URL
+
+
+@pytest.mark.anyio
+class TestDbPoolMetrics:
+    @pytest.fixture
+    async def metered_engine(self):
+        engine = create_async_engine(
+            TEST_DATABASE_URL,
+            poolclass=MeteredPool,
+            pool_size=2,
+            max_overflow=1,
+            connect_args=TEST_CONNECT_ARGS,
+        )
+        app.dependency_overrides[get_engine] = lambda: engine
+        yield engine
+        app.dependency_overrides.pop(get_engine, None)
+        await engine.dispose()
+
+    async def test_reports_checked_out_connections(
+        self, client: AsyncClient, metered_engine
+    ):
+        async with metered_engine.connect():
+            response = await client.get("/api/v1/metrics/db-pool")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["size"] == 2
+        assert data["max_overflow"] == 1
+        assert data["checked_out"] == 1
+        assert data["acquired"] == 1
+        assert data["timeouts"] == 0
+        assert data["wait_max_ms"] >= data["wait_avg_ms"] > 0
+
+        response = await client.get("/api/v1/metrics/db-pool")
+        assert response.json()["checked_out"] == 0
+
+    async def test_not_found_without_app_pool(self, client: AsyncClient):
+        engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+        app.dependency_overrides[get_engine] = lambda: engine
+
+        try:
+            response = await client.get("/api/v1/metrics/db-pool")
+        finally:
+            app.dependency_overrides.pop(get_engine, None)
+            await engine.dispose()
+
+        assert response.status_code == 404
@@ -1,4 +1,5 @@
 import json
+from datetime import UTC, datetime
 
 import pytest
 from freezegun import freeze_time
@@ -8,6 +9,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import Inventory, Product, User
 from app.database.models.product import ProductType
+from app.services.inventory_cache import InventoryChange
+from app.services.inventory_service import InventoryService
+from app.services.settings import InventoryCacheBackend, PurchaseEngine
 
 
 @pytest.mark.anyio
@@ -44,6 +48,12 @@ class TestPurchaseConsumable:
         session.add(item)
         return item
 
+    async def _version(self, session_maker, user_id):
+        async with session_maker() as session:
+            return await session.scalar(
+                select(Inventory.version).where(Inventory.user_id == user_id)
+            )
+
     async def test_purchase_consumable(
         self, client: AsyncClient, session_maker, redis_mock
     ):
@@ -54,6 +64,9 @@ class TestPurchaseConsumable:
             )
             await session.commit()
 
+        # прогреваем кэш: покупка обновляет только уже закэшированный документ
+        await client.get(f"api/v1/users/{user.id}/inventory")
+
         response = await client.post(
             f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
         )
@@ -77,6 +90,180 @@ class TestPurchaseConsumable:
             "permanents": [],
         }
 
+    async def test_purchase_consumable_increments_existing_item(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "ann", balance=500)
+            product = await self._create_product(
+                session, "Boost", price=100, type_=ProductType.CONSUMABLE
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=2)
+            await session.commit()
+
+        response = await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        async with session_maker() as session:
+            items = list(
+                await session.scalars(
+                    select(Inventory).where(Inventory.user_id == user.id)
+                )
+            )
+            assert [item.quantity for item in items] == [3]
+
+            user_db = await session.get(User, user.id)
+            assert user_db.balance == 400
+
+    async def test_purchase_updates_cached_inventory_with_existing_items(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "ann", balance=500)
+            boost = await self._create_product(session, "Boost", price=100)
+            potion = await self._create_product(session, "Potion", price=50)
+            await session.flush()
+            await self._add_inventory(session, user.id, boost.id, qty=2)
+            await self._add_inventory(session, user.id, potion.id, qty=1)
+            await session.commit()
+
+        await client.get(f"api/v1/users/{user.id}/inventory")
+
+        response = await client.post(
+            f"api/v1/products/{boost.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        radis_cache = await redis_mock.get(f"user:{user.id}:inventory")
+        consumables = json.loads(radis_cache)["consumables"]
+        assert sorted(consumables, key=lambda item: item["product_id"]) == sorted(
+            [
+                {"product_id": boost.id, "quantity": 3},
+                {"product_id": potion.id, "quantity": 1},
+            ],
+            key=lambda item: item["product_id"],
+        )
+
+    async def test_purchase_updates_hash_cache(
+        self, client: AsyncClient, session_maker, redis_mock, app_settings
+    ):
+        app_settings.services.inventory_cache_backend = InventoryCacheBackend.HASH
+
+        async with session_maker() as session:
+            user = await self._create_user(session, "hash", balance=500)
+            product = await self._create_product(session, "Boost", price=100)
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=2)
+            await session.commit()
+
+        await client.get(f"api/v1/users/{user.id}/inventory")
+
+        response = await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        cached = await redis_mock.hgetall(f"user:{user.id}:inventory:hash")
+        assert cached.pop("_loaded")
+        assert cached == {
+            f"c:{product.id}": "3",
+            f"v:{product.id}": str(await self._version(session_maker, user.id)),
+        }
+
+    async def test_late_purchase_hook_after_reload_is_idempotent(
+        self, client: AsyncClient, session_maker, redis_mock, app_settings
+    ):
+        app_settings.services.inventory_cache_backend = InventoryCacheBackend.HASH
+
+        async with session_maker() as session:
+            user = await self._create_user(session, "late", balance=500)
+            product = await self._create_product(session, "Boost", price=100)
+            await session.commit()
+
+        response = await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        version = await self._version(session_maker, user.id)
+
+        # кэш загружен уже после коммита, а хук покупки пришёл следом
+        await client.get(f"api/v1/users/{user.id}/inventory")
+        service = InventoryService(None, redis_mock, app_settings.services)
+        await service.apply_purchase(
+            user.id,
+            [
+                InventoryChange(
+                    product.id, ProductType.CONSUMABLE, 1, datetime.now(UTC), version
+                )
+            ],
+        )
+
+        cached = await redis_mock.hgetall(f"user:{user.id}:inventory:hash")
+        assert cached.pop("_loaded")
+        assert cached == {f"c:{product.id}": "1", f"v:{product.id}": str(version)}
+
+    @pytest.mark.parametrize(
+        "backend", [InventoryCacheBackend.JSON, InventoryCacheBackend.HASH]
+    )
+    async def test_late_purchase_hook_after_use_is_ignored(
+        self, client: AsyncClient, session_maker, redis_mock, app_settings, backend
+    ):
+        app_settings.services.inventory_cache_backend = backend
+
+        async with session_maker() as session:
+            user = await self._create_user(session, "order", balance=500)
+            product = await self._create_product(session, "Boost", price=100)
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=4)
+            await session.commit()
+
+        await client.get(f"api/v1/users/{user.id}/inventory")
+        response = await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+        purchased = InventoryChange(
+            product.id,
+            ProductType.CONSUMABLE,
+            5,
+            datetime.now(UTC),
+            await self._version(session_maker, user.id),
+        )
+
+        response = await client.post(
+            f"api/v1/products/{product.id}/use", params={"user_id": user.id}
+        )
+        assert response.json()["remaining"] == 4
+        await client.get(f"api/v1/users/{user.id}/inventory")
+
+        # хук покупки пришёл уже после хука использования
+        service = InventoryService(None, redis_mock, app_settings.services)
+        await service.apply_purchase(user.id, [purchased])
+
+        response = await client.get(f"api/v1/users/{user.id}/inventory")
+        assert response.json()["consumables"] == [
+            {"product_id": product.id, "quantity": 4}
+        ]
+
+    async def test_purchase_keeps_cold_cache_cold(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "cold", balance=500)
+            product = await self._create_product(session, "Boost", price=100)
+            await session.commit()
+
+        response = await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        assert await redis_mock.get(f"user:{user.id}:inventory") is None
+
     @freeze_time("2025-11-18T17:08:30.016582+00:00")
     async def test_purchase_permanent(
         self, client: AsyncClient, session_maker, redis_mock
@@ -88,6 +275,9 @@ class TestPurchaseConsumable:
             )
             await session.commit()
 
+        # прогреваем кэш: покупка обновляет только уже закэшированный документ
+        await client.get(f"api/v1/users/{user.id}/inventory")
+
         response = await client.post(
             f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
         )
@@ -142,9 +332,7 @@ class TestPurchaseConsumable:
             )
             await session.flush()
 
-            await self._add_inventory(
-                session, user_id=user.id, product_id=product.id
-            )
+            await self._add_inventory(session, user_id=user.id, product_id=product.id)
             await session.commit()
 
         response = await client.post(
@@ -180,3 +368,11 @@ class TestPurchaseConsumable:
         )
 
         assert response.status_code == 404
+
+
+class TestPurchaseSqlEngine(TestPurchaseConsumable):
+    """Те же сценарии для покупки одним SQL-выражением."""
+
+    @pytest.fixture(autouse=True)
+    def sql_engine(self, app_settings):
+        app_settings.services.purchase_engine = PurchaseEngine.SQL
@@ -1,9 +1,12 @@
+import asyncio
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy import func, select
 
 from app.database.models import Inventory, Product, User
 from app.database.models.product import ProductType
+from app.services.settings import InventoryCacheBackend
 
 
 @pytest.mark.anyio
@@ -84,6 +87,79 @@ class TestUseConsumable:
 
         assert await redis_mock.get(f"user:{user.id}:inventory") is None
 
+    async def test_concurrent_uses_consume_last_items(
+        self, client, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(session)
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, quantity=2)
+            await session.commit()
+
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    f"/api/v1/products/{product.id}/use", params={"user_id": user.id}
+                )
+                for _ in range(3)
+            )
+        )
+
+        # две штуки списаны ровно дважды, третий запрос упирается в пустую строку
+        assert sorted(response.status_code for response in responses) == [
+            200,
+            200,
+            400,
+        ]
+        assert sorted(
+            response.json()["remaining"]
+            for response in responses
+            if response.status_code == 200
+        ) == [0, 1]
+
+        async with session_maker() as session:
+            count = await session.scalar(
+                select(func.count())
+                .select_from(Inventory)
+                .where(Inventory.user_id == user.id, Inventory.product_id == product.id)
+            )
+            assert count == 0
+
+    async def test_success_updates_hash_cache(
+        self, client: AsyncClient, session_maker, redis_mock, app_settings
+    ):
+        app_settings.services.inventory_cache_backend = InventoryCacheBackend.HASH
+
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(session)
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, quantity=2)
+            await session.commit()
+
+        await client.get(f"/api/v1/users/{user.id}/inventory")
+
+        for remaining in (1, 0):
+            response = await client.post(
+                f"/api/v1/products/{product.id}/use",
+                params={"user_id": user.id},
+            )
+            assert response.json() == {
+                "product_id": product.id,
+                "remaining": remaining,
+            }
+
+        # последняя штука убирает поле, версия остаётся отметкой удаления
+        cache_key = f"user:{user.id}:inventory:hash"
+        assert set(await redis_mock.hgetall(cache_key)) == {
+            "_loaded",
+            f"v:{product.id}",
+        }
+
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.json() == {"consumables": [], "permanents": []}
+
     async def test_use_missing_item(self, client, session_maker, redis_mock):
         async with session_maker() as session:
             user = await self._create_user(session)
@@ -1,8 +1,11 @@
+import json
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User
+from app.utils.idempotency import fingerprint
 
 
 @pytest.mark.anyio
@@ -68,7 +71,7 @@ class TestAddFunds:
 
         assert response.status_code == 422  # Pydantic схема отклоняет
 
-    async def test_conflict_when_idempotency_duplicate(
+    async def test_replay_when_idempotency_duplicate(
         self, client: AsyncClient, session_maker, redis_mock
     ):
         async with session_maker() as session:
@@ -87,8 +90,79 @@ class TestAddFunds:
             headers={"Idempotency-Key": "dup-1"},
             json={"amount": 100},
         )
-        assert response2.status_code == 409
-        assert response2.json()["error"]["message"] == "Duplicate top-up request"
+        assert response2.status_code == 200
+        assert response2.json() == response1.json()
+        assert response2.headers["Idempotent-Replayed"] == "true"
+
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 100
+
+    async def test_unprocessable_entity_when_idempotency_key_reused(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, balance=0)
+            await session.commit()
+
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "dup-2"},
+            json={"amount": 100},
+        )
+        response = await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "dup-2"},
+            json={"amount": 200},
+        )
+
+        assert response.status_code == 422
+        assert response.json()["error"]["type"] == "IdempotencyKeyReusedError"
+
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 100
+
+    async def test_conflict_when_idempotency_in_progress(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, balance=0)
+            await session.commit()
+
+        path = f"/api/v1/users/{user.id}/add-funds"
+        body = b'{"amount": 100}'
+        await redis_mock.set(
+            "idempotency:add-funds:dup-3",
+            json.dumps(
+                {
+                    "state": "in_progress",
+                    "fingerprint": fingerprint("POST", path, "", body),
+                    "token": "other",
+                }
+            ),
+        )
+
+        response = await client.post(
+            path,
+            headers={
+                "Idempotency-Key": "dup-3",
+                "Content-Type": "application/json",
+            },
+            content=body,
+        )
+
+        assert response.status_code == 409
+        assert response.json()["error"]["type"] == "IdempotencyInProgressError"
+
+    async def test_failed_request_releases_idempotency_key(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        response = await client.post(
+            "/api/v1/users/999999/add-funds",
+            headers={"Idempotency-Key": "dup-4"},
+            json={"amount": 50},
+        )
+        assert response.status_code == 404
+        assert await redis_mock.get("idempotency:add-funds:dup-4") is None
 
     async def test_not_found_when_user_not_exists(
         self, client: AsyncClient, redis_mock
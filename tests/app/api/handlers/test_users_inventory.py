@@ -1,13 +1,21 @@
+import asyncio
 import json
 
 import pytest
 from freezegun import freeze_time
 from httpx import AsyncClient
 from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app.database.deps import get_session
+from app.database.engine import MeteredPool
 from app.database.models import Inventory, Product, User
 from app.database.models.product import ProductType
+from app.main import app
+from app.repositories.inventory_repository import InventoryRepository
+from app.services.settings import InventoryCacheBackend
+from tests.fixtures.db import TEST_CONNECT_ARGS, TEST_DATABASE_URL
 
 
 @pytest.mark.anyio
@@ -106,6 +114,41 @@ class TestUserInventory:
         assert cached["consumables"][0]["product_id"] == product.id
         assert cached["consumables"][0]["quantity"] == 3
 
+    async def test_concurrent_cold_requests_load_once(
+        self, client: AsyncClient, session_maker, redis_mock, monkeypatch
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(
+                session, "Potion", 10, ProductType.CONSUMABLE
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=2)
+            await session.commit()
+
+        calls = 0
+        original = InventoryRepository.get_by_user
+
+        async def counting_get_by_user(self, user_id):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return await original(self, user_id)
+
+        monkeypatch.setattr(InventoryRepository, "get_by_user", counting_get_by_user)
+
+        responses = await asyncio.gather(
+            *(client.get(f"/api/v1/users/{user.id}/inventory") for _ in range(5))
+        )
+
+        assert {response.status_code for response in responses} == {200}
+        assert all(
+            response.json()["consumables"]
+            == [{"product_id": product.id, "quantity": 2}]
+            for response in responses
+        )
+        assert calls == 1
+
     async def test_success_when_inventory_empty(
         self, client: AsyncClient, session_maker, redis_mock
     ):
@@ -120,9 +163,174 @@ class TestUserInventory:
         assert data["consumables"] == []
         assert data["permanents"] == []
 
+    async def test_cache_hit_returns_same_document_and_etag(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(
+                session, "Potion", 10, ProductType.CONSUMABLE
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=2)
+            await session.commit()
+
+        miss = await client.get(f"/api/v1/users/{user.id}/inventory")
+        hit = await client.get(f"/api/v1/users/{user.id}/inventory")
+
+        assert hit.headers["content-type"] == "application/json"
+        assert hit.content == miss.content
+        assert hit.headers["etag"] == miss.headers["etag"]
+
+    async def test_cache_hit_does_not_touch_pool(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        engine = create_async_engine(
+            TEST_DATABASE_URL, poolclass=MeteredPool, connect_args=TEST_CONNECT_ARGS
+        )
+        metered_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def override_get_session():
+            async with metered_session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_session] = override_get_session
+
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            await session.commit()
+
+        await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert engine.pool.stats.acquired == 1
+
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.status_code == 200
+        assert engine.pool.stats.acquired == 1
+        await engine.dispose()
+
+    async def test_not_modified_until_purchase(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = User(username="test", email="t@test.com", balance=100)
+            session.add(user)
+            product = await self._create_product(
+                session, "Potion", 10, ProductType.CONSUMABLE
+            )
+            await session.commit()
+
+        first = await client.get(f"/api/v1/users/{user.id}/inventory")
+        etag = first.headers["etag"]
+
+        response = await client.get(
+            f"/api/v1/users/{user.id}/inventory", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        response = await client.get(
+            f"/api/v1/users/{user.id}/inventory", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["consumables"] == [
+            {"product_id": product.id, "quantity": 1}
+        ]
+
+    async def test_not_modified_without_loading_document(
+        self, client: AsyncClient, redis_mock, monkeypatch
+    ):
+        await redis_mock.set("user:5:inventory:version", "42")
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("document loaded")
+
+        monkeypatch.setattr(InventoryRepository, "get_by_user", fail)
+
+        response = await client.get(
+            "/api/v1/users/5/inventory", headers={"If-None-Match": 'W/"1", "42"'}
+        )
+        assert response.status_code == 304
+
     async def test_not_found_when_user_not_exists(
         self, client: AsyncClient, redis_mock
     ):
         response = await client.get("/api/v1/users/999999/inventory")
 
         assert response.status_code == 200
+
+
+@pytest.mark.anyio
+class TestUserInventoryHashCache(TestUserInventory):
+    """Инвентарь в Redis hash вместо JSON-строки."""
+
+    @pytest.fixture(autouse=True)
+    def hash_backend(self, app_settings):
+        app_settings.services.inventory_cache_backend = InventoryCacheBackend.HASH
+
+    @freeze_time("2025-11-18T17:08:30.016582+00:00")
+    async def test_inventory_from_cache(self, client: AsyncClient, redis_mock):
+        user_id = 123
+
+        await redis_mock.hset(
+            f"user:{user_id}:inventory:hash",
+            mapping={"_loaded": 1, "c:10": 5, "c:11": 0, "p:20": "2025-01-01T10:00:00"},
+        )
+
+        response = await client.get(f"/api/v1/users/{user_id}/inventory")
+        assert response.status_code == 200
+        assert response.json() == {
+            "consumables": [{"product_id": 10, "quantity": 5}],
+            "permanents": [{"product_id": 20, "purchased_at": "2025-01-01T10:00:00"}],
+        }
+
+    async def test_success_inventory_cache_write(
+        self, client: AsyncClient, session_maker, redis_mock: Redis
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(
+                session, "Potion", 10, ProductType.CONSUMABLE
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=3)
+            await session.commit()
+
+        cache_key = f"user:{user.id}:inventory:hash"
+        assert await redis_mock.exists(cache_key) == 0
+
+        await client.get(f"/api/v1/users/{user.id}/inventory")
+
+        async with session_maker() as session:
+            version = await session.scalar(
+                select(Inventory.version).where(Inventory.user_id == user.id)
+            )
+        cached = await redis_mock.hgetall(cache_key)
+        assert int(cached.pop("_loaded")) >= version
+        assert cached == {f"c:{product.id}": "3", f"v:{product.id}": str(version)}
+
+    async def test_partial_hash_is_cache_miss(
+        self, client: AsyncClient, session_maker, redis_mock: Redis
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session)
+            product = await self._create_product(
+                session, "Potion", 10, ProductType.CONSUMABLE
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, product.id, qty=3)
+            await session.commit()
+
+        # HINCRBY после истечения TTL создаёт hash без маркера полной загрузки
+        cache_key = f"user:{user.id}:inventory:hash"
+        await redis_mock.hincrby(cache_key, f"c:{product.id}", 1)
+
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.json()["consumables"] == [
+            {"product_id": product.id, "quantity": 3}
+        ]
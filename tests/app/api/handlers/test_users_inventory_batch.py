@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.database.models import Inventory, Product, User
+from app.database.models.product import ProductType
+from app.repositories.inventory_repository import InventoryRepository
+from app.services.settings import InventoryCacheBackend
+
+
+@pytest.mark.anyio
+class TestUserInventoryBatch:
+    async def _create(self, session_maker):
+        async with session_maker() as session:
+            users = [
+                User(username=f"u{i}", email=f"u{i}@test.com", balance=0)
+                for i in range(3)
+            ]
+            potion = Product(
+                name="Potion", price=10, type=ProductType.CONSUMABLE, is_active=True
+            )
+            sword = Product(
+                name="Sword", price=10, type=ProductType.PERMANENT, is_active=True
+            )
+            session.add_all([*users, potion, sword])
+            await session.flush()
+            session.add_all(
+                [
+                    Inventory(user_id=users[0].id, product_id=potion.id, quantity=2),
+                    Inventory(user_id=users[1].id, product_id=potion.id, quantity=5),
+                    Inventory(user_id=users[1].id, product_id=sword.id, quantity=1),
+                ]
+            )
+            await session.commit()
+        return users, potion, sword
+
+    async def test_misses_loaded_with_one_query(
+        self, client: AsyncClient, session_maker, redis_mock, monkeypatch
+    ):
+        users, potion, sword = await self._create(session_maker)
+        # первый пользователь уже в кэше
+        await client.get(f"/api/v1/users/{users[0].id}/inventory")
+
+        loaded = []
+        original = InventoryRepository.get_by_users
+
+        async def counting_get_by_users(self, user_ids):
+            loaded.append(user_ids)
+            return await original(self, user_ids)
+
+        monkeypatch.setattr(InventoryRepository, "get_by_users", counting_get_by_users)
+
+        user_ids = [user.id for user in users]
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": user_ids}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data) == [str(user_id) for user_id in user_ids]
+        assert data[str(users[0].id)]["consumables"] == [
+            {"product_id": potion.id, "quantity": 2}
+        ]
+        assert data[str(users[1].id)]["consumables"] == [
+            {"product_id": potion.id, "quantity": 5}
+        ]
+        assert [
+            item["product_id"] for item in data[str(users[1].id)]["permanents"]
+        ] == [sword.id]
+        assert data[str(users[2].id)] == {"consumables": [], "permanents": []}
+        assert loaded == [user_ids[1:]]
+
+        # промахи дописаны в кэш — повторный запрос в БД не идёт
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": user_ids}
+        )
+        assert response.json() == data
+        assert len(loaded) == 1
+
+    async def test_cache_hits_returned_as_stored(self, client: AsyncClient, redis_mock):
+        cached = '{"consumables":[{"product_id":7,"quantity":3}],"permanents":[]}'
+        await redis_mock.set("user:1:inventory", cached)
+
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": [1, 1]}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"1": json.loads(cached)}
+
+    async def test_unprocessable_entity_when_user_ids_out_of_range(
+        self, client: AsyncClient, redis_mock
+    ):
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": []}
+        )
+        assert response.status_code == 422
+
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": list(range(201))}
+        )
+        assert response.status_code == 422
+
+
+@pytest.mark.anyio
+class TestUserInventoryBatchHashCache(TestUserInventoryBatch):
+    """Инвентарь в Redis hash вместо JSON-строки."""
+
+    @pytest.fixture(autouse=True)
+    def hash_backend(self, app_settings):
+        app_settings.services.inventory_cache_backend = InventoryCacheBackend.HASH
+
+    async def test_cache_hits_returned_as_stored(self, client: AsyncClient, redis_mock):
+        await redis_mock.hset("user:1:inventory:hash", mapping={"_loaded": 1, "c:7": 3})
+
+        response = await client.post(
+            "/api/v1/users/inventory:batch", json={"user_ids": [1, 1]}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "1": {"consumables": [{"product_id": 7, "quantity": 3}], "permanents": []}
+        }
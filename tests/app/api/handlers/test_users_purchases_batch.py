@@ -0,0 +1,227 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Inventory, Product, User
+from app.database.models.product import ProductType
+from app.database.models.transaction import Transaction
+
+
+@pytest.mark.anyio
+class TestPurchaseBatch:
+    async def _create_user(self, session, name="u", balance=0):
+        user = User(username=name, email=f"{name}@test.com", balance=balance)
+        session.add(user)
+        return user
+
+    async def _create_product(
+        self,
+        session,
+        name="p",
+        price=100,
+        type_: ProductType = ProductType.CONSUMABLE,
+    ):
+        product = Product(name=name, price=price, type=type_, is_active=True)
+        session.add(product)
+        return product
+
+    async def _add_inventory(self, session: AsyncSession, user_id, product_id, qty=1):
+        item = Inventory(user_id=user_id, product_id=product_id, quantity=qty)
+        session.add(item)
+        return item
+
+    async def _get_state(self, session_maker, user_id):
+        async with session_maker() as session:
+            user = await session.get(User, user_id)
+            items = {
+                item.product_id: item.quantity
+                for item in await session.scalars(
+                    select(Inventory).where(Inventory.user_id == user_id)
+                )
+            }
+            txn_count = await session.scalar(
+                select(func.count())
+                .select_from(Transaction)
+                .where(Transaction.user_id == user_id)
+            )
+        return user.balance, items, txn_count
+
+    async def test_success(self, client: AsyncClient, session_maker, redis_mock):
+        async with session_maker() as session:
+            user = await self._create_user(session, "alex", balance=1000)
+            potion = await self._create_product(session, "Potion", price=100)
+            sword = await self._create_product(
+                session, "Sword", price=300, type_=ProductType.PERMANENT
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, potion.id, qty=2)
+            await session.commit()
+
+        await client.get(f"/api/v1/users/{user.id}/inventory")
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={
+                "items": [
+                    {"product_id": potion.id, "quantity": 2},
+                    {"product_id": sword.id, "quantity": 1},
+                    {"product_id": potion.id, "quantity": 1},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "ok",
+            "user_id": user.id,
+            "total_spent": 600,
+            "balance": 400,
+            "items": [
+                {"product_id": potion.id, "quantity": 3, "amount_spent": 300},
+                {"product_id": sword.id, "quantity": 1, "amount_spent": 300},
+            ],
+        }
+
+        balance, items, txn_count = await self._get_state(session_maker, user.id)
+        assert balance == 400
+        assert items == {potion.id: 5, sword.id: 1}
+        assert txn_count == 4
+
+        cached = json.loads(await redis_mock.get(f"user:{user.id}:inventory"))
+        assert cached["consumables"] == [{"product_id": potion.id, "quantity": 5}]
+        assert [item["product_id"] for item in cached["permanents"]] == [sword.id]
+
+    async def test_conflict_when_not_enough_balance_for_total(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "low", balance=250)
+            product = await self._create_product(session, "Potion", price=100)
+            await session.commit()
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={"items": [{"product_id": product.id, "quantity": 3}]},
+        )
+
+        assert response.status_code == 409
+        assert response.json()["error"]["message"] == "Not enough funds"
+        assert await self._get_state(session_maker, user.id) == (250, {}, 0)
+
+    async def test_nothing_applied_when_permanent_already_owned(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "kate", balance=1000)
+            potion = await self._create_product(session, "Potion", price=100)
+            vip = await self._create_product(
+                session, "VIP", price=200, type_=ProductType.PERMANENT
+            )
+            await session.flush()
+            await self._add_inventory(session, user.id, vip.id)
+            await session.commit()
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={
+                "items": [
+                    {"product_id": potion.id, "quantity": 1},
+                    {"product_id": vip.id, "quantity": 1},
+                ]
+            },
+        )
+
+        assert response.status_code == 409
+        assert response.json()["error"]["message"] == "Permanent product already owned"
+        assert await self._get_state(session_maker, user.id) == (1000, {vip.id: 1}, 0)
+
+    async def test_bad_request_when_permanent_quantity_greater_than_one(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "tom", balance=1000)
+            vip = await self._create_product(
+                session, "VIP", price=200, type_=ProductType.PERMANENT
+            )
+            await session.commit()
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={"items": [{"product_id": vip.id, "quantity": 2}]},
+        )
+
+        assert response.status_code == 400
+        assert (
+            response.json()["error"]["message"]
+            == "Permanent product can be bought only once"
+        )
+
+    async def test_not_found_when_one_product_not_exists(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "max", balance=500)
+            product = await self._create_product(session, "Potion", price=100)
+            await session.commit()
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/purchases:batch",
+            json={
+                "items": [
+                    {"product_id": product.id, "quantity": 1},
+                    {"product_id": 777, "quantity": 1},
+                ]
+            },
+        )
+
+        assert response.status_code == 404
+        assert await self._get_state(session_maker, user.id) == (500, {}, 0)
+
+    async def test_not_found_when_user_not_exists(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            product = await self._create_product(session, "Potion")
+            await session.commit()
+
+        response = await client.post(
+            "/api/v1/users/999/purchases:batch",
+            json={"items": [{"product_id": product.id, "quantity": 1}]},
+        )
+
+        assert response.status_code == 404
+
+    async def test_unprocessable_entity_when_items_empty(
+        self, client: AsyncClient, redis_mock
+    ):
+        response = await client.post(
+            "/api/v1/users/1/purchases:batch", json={"items": []}
+        )
+
+        assert response.status_code == 422
+
+    async def test_replay_with_idempotency_key(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        async with session_maker() as session:
+            user = await self._create_user(session, "ann", balance=1000)
+            potion = await self._create_product(session, "Potion", price=100)
+            await session.commit()
+
+        request = {
+            "url": f"/api/v1/users/{user.id}/purchases:batch",
+            "headers": {"Idempotency-Key": "batch-1"},
+            "json": {"items": [{"product_id": potion.id, "quantity": 2}]},
+        }
+        response1 = await client.post(**request)
+        response2 = await client.post(**request)
+
+        assert response1.status_code == response2.status_code == 200
+        assert response2.json() == response1.json()
+        assert await self._get_state(session_maker, user.id) == (
+            800,
+            {potion.id: 2},
+            2,
+        )
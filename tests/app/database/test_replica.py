@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.models import User
+from app.database.replica import ReadYourWrites, ReplicaRouter
+from app.database.settings import DBSettings
+from app.main import app
+
+
+@pytest.mark.anyio
+class TestReplicaRouter:
+    @pytest.fixture
+    def db_settings(self):
+        return DBSettings(name="test", replica_max_lag=2.0)
+
+    @pytest.fixture
+    def router(self, engine, db_settings):
+        # «реплика» — та же тестовая БД: она не в recovery, отставание 0
+        router = ReplicaRouter(engine, db_settings)
+        app.state.replica_router = router
+        yield router
+        app.state.replica_router = None
+
+    async def test_available_when_lag_within_limit(self, router):
+        assert await router.available()
+        assert router.lag == 0
+
+    async def test_unavailable_when_lag_over_limit(self, router, db_settings):
+        db_settings.replica_max_lag = -1
+
+        assert not await router.available()
+
+    async def test_lag_check_is_cached(self, router, db_settings):
+        assert await router.available()
+
+        broken = create_async_engine("postgresql+asyncpg://u:p@127.0.0.1:1/none")
+        router.engine = broken
+        assert await router.available()
+
+        db_settings.replica_lag_check_interval = 0
+        assert not await router.available()
+        await broken.dispose()
+
+    async def test_write_pins_user_reads_to_primary(
+        self, client: AsyncClient, session_maker, redis_mock, router
+    ):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=0)
+            session.add(user)
+            await session.commit()
+
+        pins = ReadYourWrites(redis_mock, router.settings)
+        assert not await pins.pinned(user.id)
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "replica-1"},
+            json={"amount": 100},
+        )
+        assert response.status_code == 200
+        assert await pins.pinned(user.id)
+        assert await pins.pinned(user.id + 1, user.id)
+        assert not await pins.pinned(user.id + 1)
+        assert 0 < await redis_mock.ttl(pins.key(user.id)) <= 5
+
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.status_code == 200
+
+    async def test_route_chosen_on_first_query(
+        self, client: AsyncClient, session_maker, redis_mock, router
+    ):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=0)
+            session.add(user)
+            await session.commit()
+
+        cached = {"consumables": [], "permanents": []}
+        await redis_mock.set(f"user:{user.id}:inventory", json.dumps(cached))
+
+        # ответ из кэша: отставание реплики не проверялось
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.json() == cached
+        assert router.lag is None
+
+        await redis_mock.delete(f"user:{user.id}:inventory")
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.json() == cached
+        assert router.lag == 0
@@ -0,0 +1,194 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.database.models import BalanceEntry, BalanceSnapshot, Product, User
+from app.database.models.balance import BalanceEntryReason
+from app.database.models.product import ProductType
+from app.repositories.balance_repository import BalanceRepository
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.settings import BalanceBackend, ServiceSettings
+
+
+@pytest.mark.anyio
+class TestLedgerBalance:
+    @pytest.fixture(autouse=True)
+    def ledger(self, app_settings):
+        app_settings.services.balance_backend = BalanceBackend.LEDGER
+
+    async def _create_user(self, session_maker, balance=0):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=balance)
+            product = Product(
+                name="Potion", price=100, type=ProductType.CONSUMABLE, is_active=True
+            )
+            session.add_all([user, product])
+            await session.commit()
+        return user, product
+
+    async def _balance(self, session_maker, user_id):
+        async with session_maker() as session:
+            return await BalanceRepository(session).balance(user_id)
+
+    async def _entries(self, session_maker, user_id):
+        async with session_maker() as session:
+            return [
+                (entry.amount, entry.reason)
+                for entry in await BalanceRepository(session).history(user_id)
+            ]
+
+    async def test_credit_and_debit_append_entries(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(session_maker, balance=50)
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "ledger-1"},
+            json={"amount": 100},
+        )
+        assert response.status_code == 200
+        assert response.json() == {"user_id": user.id, "new_balance": 150}
+
+        response = await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert response.status_code == 200
+
+        assert await self._balance(session_maker, user.id) == 50
+        assert await self._entries(session_maker, user.id) == [
+            (-100, BalanceEntryReason.PURCHASE),
+            (100, BalanceEntryReason.TOP_UP),
+        ]
+
+        # колонка не трогается до свёртки
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 50
+
+    async def test_debit_checks_snapshot_and_entries(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(session_maker, balance=50)
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "ledger-2"},
+            json={"amount": 40},
+        )
+
+        response = await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        assert response.status_code == 409
+        assert await self._balance(session_maker, user.id) == 90
+        assert await self._entries(session_maker, user.id) == [
+            (40, BalanceEntryReason.TOP_UP)
+        ]
+
+    async def test_not_found_when_user_not_exists(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        response = await client.post(
+            "/api/v1/users/999999/add-funds",
+            headers={"Idempotency-Key": "ledger-3"},
+            json={"amount": 10},
+        )
+
+        assert response.status_code == 404
+
+    async def test_compaction_folds_entries_into_snapshot(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(session_maker, balance=50)
+        for key in ("a", "b"):
+            await client.post(
+                f"/api/v1/users/{user.id}/add-funds",
+                headers={"Idempotency-Key": f"ledger-{key}"},
+                json={"amount": 100},
+            )
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session).compact() == 1
+
+        async with session_maker() as session:
+            snapshot = await session.get(BalanceSnapshot, user.id)
+            last_entry_id = await session.scalar(
+                select(BalanceEntry.id).order_by(BalanceEntry.id.desc()).limit(1)
+            )
+            assert (snapshot.balance, snapshot.last_entry_id) == (150, last_entry_id)
+            assert (await session.get(User, user.id)).balance == 150
+
+        # повторная свёртка ничего не делает, новые строки ложатся поверх снимка
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session).compact() == 0
+
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        assert await self._balance(session_maker, user.id) == 50
+
+        async with session_maker() as session:
+            settings = ServiceSettings(balance_snapshot_batch_size=10)
+            assert await BalanceSnapshotService(session, settings).compact() == 1
+        assert await self._balance(session_maker, user.id) == 50
+
+    async def test_compaction_scans_entries_above_watermark(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(session_maker, balance=50)
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "ledger-w"},
+            json={"amount": 100},
+        )
+        settings = ServiceSettings(balance_snapshot_settle_seconds=0)
+
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session, settings).compact() == 1
+
+        async with session_maker() as session:
+            last_entry_id = await session.scalar(select(func.max(BalanceEntry.id)))
+            assert await BalanceRepository(session).watermark() == last_entry_id
+
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session, settings).compact() == 1
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 50
+
+        # строки под знаком больше не просматриваются: сдвигаем знак вручную
+        # поверх ещё не свёрнутой строки
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "ledger-w2"},
+            json={"amount": 30},
+        )
+        async with session_maker() as session:
+            last_entry_id = await session.scalar(select(func.max(BalanceEntry.id)))
+            await BalanceRepository(session).advance_watermark(last_entry_id)
+            await session.commit()
+
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session, settings).compact() == 0
+        assert await self._balance(session_maker, user.id) == 80
+
+    async def test_watermark_skips_fresh_entries(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, _ = await self._create_user(session_maker, balance=50)
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "ledger-f"},
+            json={"amount": 100},
+        )
+
+        async with session_maker() as session:
+            assert await BalanceSnapshotService(session).compact() == 1
+
+        async with session_maker() as session:
+            assert await BalanceRepository(session).watermark() == 0
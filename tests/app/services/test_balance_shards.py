@@ -0,0 +1,126 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.database.models import BalanceShard, Product, User
+from app.database.models.product import ProductType
+from app.repositories.balance_repository import BalanceShardRepository
+from app.services.settings import BalanceBackend
+
+
+@pytest.mark.anyio
+class TestShardedBalance:
+    @pytest.fixture(autouse=True)
+    def sharded(self, app_settings):
+        app_settings.services.balance_backend = BalanceBackend.SHARDED
+
+    async def _create_user(self, session_maker, balance=0, shards=0, price=100):
+        async with session_maker() as session:
+            user = User(username="guild", email="guild@test.com", balance=balance)
+            product = Product(
+                name="Potion", price=price, type=ProductType.CONSUMABLE, is_active=True
+            )
+            session.add_all([user, product])
+            await session.commit()
+
+        if shards:
+            async with session_maker() as session, session.begin():
+                await BalanceShardRepository(session).reshard(user.id, shards)
+
+        return user, product
+
+    async def _shards(self, session_maker, user_id):
+        async with session_maker() as session:
+            rows = await session.execute(
+                select(BalanceShard.shard, BalanceShard.balance)
+                .where(BalanceShard.user_id == user_id)
+                .order_by(BalanceShard.shard)
+            )
+            return dict(rows.all())
+
+    async def _total(self, session_maker, user_id):
+        async with session_maker() as session:
+            return await BalanceShardRepository(session).total(user_id)
+
+    async def test_reshard_splits_and_merges_balance(self, session_maker):
+        user, _ = await self._create_user(session_maker, balance=1003, shards=4)
+
+        assert await self._shards(session_maker, user.id) == {
+            0: 251,
+            1: 251,
+            2: 251,
+            3: 250,
+        }
+        assert await self._total(session_maker, user.id) == (1003, 4)
+
+        async with session_maker() as session, session.begin():
+            assert await BalanceShardRepository(session).reshard(user.id, 0) == 1003
+
+        assert await self._shards(session_maker, user.id) == {}
+        assert await self._total(session_maker, user.id) == (1003, 0)
+
+    async def test_credit_goes_to_one_shard(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, _ = await self._create_user(session_maker, balance=400, shards=4)
+
+        response = await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "shard-1"},
+            json={"amount": 50},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["new_balance"] == 450
+        assert sorted((await self._shards(session_maker, user.id)).values()) == [
+            100,
+            100,
+            100,
+            150,
+        ]
+
+    async def test_debit_falls_back_across_shards(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        # ни в одном шарде нет 100, но в сумме хватает
+        user, product = await self._create_user(
+            session_maker, balance=160, shards=4, price=100
+        )
+
+        response = await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        assert response.status_code == 200
+        assert await self._total(session_maker, user.id) == (60, 4)
+        assert all(
+            balance >= 0
+            for balance in (await self._shards(session_maker, user.id)).values()
+        )
+
+    async def test_conflict_when_shards_total_too_low(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(
+            session_maker, balance=90, shards=3, price=100
+        )
+
+        response = await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        assert response.status_code == 409
+        assert await self._total(session_maker, user.id) == (90, 3)
+
+    async def test_unsharded_user_uses_column(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create_user(session_maker, balance=150)
+
+        response = await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+        assert response.status_code == 200
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 50
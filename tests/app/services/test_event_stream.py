@@ -0,0 +1,120 @@
+import pytest
+from httpx import AsyncClient
+
+from app.background.events import EventConsumer
+from app.database.models import Inventory, Product, User
+from app.database.models.product import ProductType
+from app.services.outbox import OutboxTopic
+
+
+@pytest.mark.anyio
+class TestEventStream:
+    @pytest.fixture(autouse=True)
+    def events(self, app_settings):
+        app_settings.services.events_enabled = True
+        return app_settings.services
+
+    async def _create(self, session_maker):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=500)
+            product = Product(
+                name="Potion", price=100, type=ProductType.CONSUMABLE, is_active=True
+            )
+            session.add_all([user, product])
+            await session.flush()
+            session.add(Inventory(user_id=user.id, product_id=product.id, quantity=1))
+            await session.commit()
+        return user, product
+
+    async def _activity(self, client, user, product):
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "events-1"},
+            json={"amount": 50},
+        )
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        await client.post(
+            f"/api/v1/products/{product.id}/use", params={"user_id": user.id}
+        )
+
+    async def test_consumer_group_reads_and_acks(
+        self, client: AsyncClient, session_maker, redis_mock, events
+    ):
+        user, product = await self._create(session_maker)
+        consumer = EventConsumer(redis_mock, "analytics", "worker-1", events)
+        await consumer.ensure_group()
+
+        await self._activity(client, user, product)
+
+        batches = []
+
+        async def handler(batch):
+            batches.append([(event.topic, event.user_id) for event in batch])
+
+        assert await consumer.consume(handler, count=2) == 3
+        assert batches == [
+            [
+                (OutboxTopic.BALANCE_CREDITED, user.id),
+                (OutboxTopic.PURCHASE_COMPLETED, user.id),
+            ],
+            [(OutboxTopic.PRODUCT_USED, user.id)],
+        ]
+        pending = await redis_mock.xpending(events.events_stream, "analytics")
+        assert pending["pending"] == 0
+
+    async def test_unacked_events_are_redelivered(
+        self, client: AsyncClient, session_maker, redis_mock, events
+    ):
+        user, product = await self._create(session_maker)
+        crashed = EventConsumer(
+            redis_mock, "exports", "worker-1", events, claim_idle_ms=0
+        )
+        await crashed.ensure_group()
+        await self._activity(client, user, product)
+
+        # потребитель прочитал пачку и упал до ack
+        assert len(await crashed.read()) == 3
+
+        resumed = EventConsumer(
+            redis_mock, "exports", "worker-2", events, claim_idle_ms=0
+        )
+        events_read = await resumed.read()
+        assert [event.topic for event in events_read] == [
+            OutboxTopic.BALANCE_CREDITED,
+            OutboxTopic.PURCHASE_COMPLETED,
+            OutboxTopic.PRODUCT_USED,
+        ]
+
+    async def test_replay_from_offset(
+        self, client: AsyncClient, session_maker, redis_mock, events
+    ):
+        user, product = await self._create(session_maker)
+        consumer = EventConsumer(redis_mock, "antifraud", "worker-1", events)
+        await consumer.ensure_group()
+        await self._activity(client, user, product)
+
+        first, *rest = await consumer.replay()
+        assert [event.id for event in await consumer.replay(first.id)] == [
+            event.id for event in rest
+        ]
+
+        async def skip(batch):
+            pass
+
+        await consumer.consume(skip)
+        await consumer.seek(first.id)
+        assert [event.id for event in await consumer.read()] == [
+            event.id for event in rest
+        ]
+
+    async def test_disabled_by_default(
+        self, client: AsyncClient, session_maker, redis_mock, events
+    ):
+        events.events_enabled = False
+        user, product = await self._create(session_maker)
+
+        await self._activity(client, user, product)
+
+        assert await redis_mock.xlen(events.events_stream) == 0
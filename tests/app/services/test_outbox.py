@@ -0,0 +1,136 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.database.models import Inventory, OutboxEvent, Product, User
+from app.database.models.product import ProductType
+from app.database.replica import ReadYourWrites
+from app.database.settings import DBSettings
+from app.services.outbox import OutboxRelay, OutboxTopic
+
+
+@pytest.mark.anyio
+class TestOutbox:
+    @pytest.fixture(autouse=True)
+    def outbox(self, app_settings):
+        app_settings.services.outbox_enabled = True
+        return app_settings.services
+
+    async def _create(self, session_maker, quantity=0):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=500)
+            product = Product(
+                name="Potion", price=100, type=ProductType.CONSUMABLE, is_active=True
+            )
+            session.add_all([user, product])
+            await session.flush()
+            if quantity:
+                session.add(
+                    Inventory(user_id=user.id, product_id=product.id, quantity=quantity)
+                )
+            await session.commit()
+        return user, product
+
+    async def _events(self, session_maker):
+        async with session_maker() as session:
+            events = await session.scalars(select(OutboxEvent).order_by(OutboxEvent.id))
+            return [(event.topic, event.payload) for event in events]
+
+    async def _relay(self, session_maker, redis_mock, settings):
+        async with session_maker() as session:
+            return await OutboxRelay(session, redis_mock, settings).relay()
+
+    async def test_events_written_with_changes(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create(session_maker, quantity=1)
+
+        await client.post(
+            f"/api/v1/users/{user.id}/add-funds",
+            headers={"Idempotency-Key": "outbox-1"},
+            json={"amount": 50},
+        )
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        await client.post(
+            f"/api/v1/products/{product.id}/use", params={"user_id": user.id}
+        )
+
+        assert await self._events(session_maker) == [
+            (
+                OutboxTopic.BALANCE_CREDITED,
+                {"user_id": user.id, "amount": 50, "balance": 550},
+            ),
+            (
+                OutboxTopic.PURCHASE_COMPLETED,
+                {
+                    "user_id": user.id,
+                    "items": [{"product_id": product.id, "quantity": 1, "amount": 100}],
+                },
+            ),
+            (
+                OutboxTopic.PRODUCT_USED,
+                {"user_id": user.id, "product_id": product.id, "remaining": 1},
+            ),
+        ]
+
+    async def test_failed_purchase_writes_no_event(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create(session_maker)
+        product_id = product.id + 1
+
+        response = await client.post(
+            f"/api/v1/products/{product_id}/purchase", params={"user_id": user.id}
+        )
+
+        assert response.status_code == 404
+        assert await self._events(session_maker) == []
+
+    async def test_relay_invalidates_cache_and_streams_events(
+        self, client: AsyncClient, session_maker, redis_mock, outbox
+    ):
+        user, product = await self._create(session_maker)
+        await client.get(f"/api/v1/users/{user.id}/inventory")
+        cache_key = f"user:{user.id}:inventory"
+        assert await redis_mock.exists(cache_key)
+        version = await redis_mock.get(f"{cache_key}:version")
+
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        # до relay кэш не трогается
+        assert await redis_mock.exists(cache_key)
+
+        assert await self._relay(session_maker, redis_mock, outbox) == 1
+        assert not await redis_mock.exists(cache_key)
+        assert int(await redis_mock.get(f"{cache_key}:version")) == int(version) + 1
+        assert await self._events(session_maker) == []
+
+        [(_, fields)] = await redis_mock.xrange(outbox.events_stream)
+        assert fields["topic"] == OutboxTopic.PURCHASE_COMPLETED
+        assert json.loads(fields["payload"])["user_id"] == user.id
+
+        response = await client.get(f"/api/v1/users/{user.id}/inventory")
+        assert response.json()["consumables"][0]["quantity"] == 1
+
+        assert await self._relay(session_maker, redis_mock, outbox) == 0
+
+    async def test_relay_pins_users_to_primary(
+        self, client: AsyncClient, session_maker, redis_mock, outbox
+    ):
+        user, product = await self._create(session_maker)
+        await client.post(
+            f"/api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+        pins = ReadYourWrites(redis_mock, DBSettings(name="test"))
+        await redis_mock.delete(pins.key(user.id))
+
+        async with session_maker() as session:
+            relay = OutboxRelay(session, redis_mock, outbox, read_your_writes=pins)
+            assert await relay.relay() == 1
+
+        assert await pins.pinned(user.id)
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app.database.models import Product
+from app.database.models.product import ProductType
+from app.repositories.product_repository import ProductRepository
+from app.services.product_catalog import ProductCatalog
+
+
+@pytest.mark.anyio
+class TestProductCatalog:
+    async def _create_product(self, session_maker, name="Boost", price=100):
+        async with session_maker() as session:
+            product = Product(
+                name=name, price=price, type=ProductType.CONSUMABLE, is_active=True
+            )
+            session.add(product)
+            await session.commit()
+        return product
+
+    async def _set_price(self, session_maker, product_id, price):
+        async with session_maker() as session:
+            await session.execute(
+                update(Product).where(Product.id == product_id).values(price=price)
+            )
+            await session.commit()
+
+    async def test_get_fills_both_tiers(self, session_maker, redis_mock):
+        product = await self._create_product(session_maker)
+        catalog = ProductCatalog()
+
+        async with session_maker() as session:
+            cached = await catalog.get(session, redis_mock, product.id)
+
+        assert cached.price == 100
+        assert await redis_mock.get(f"product:{product.id}") is not None
+
+        # меняем товар в обход каталога: обе копии продолжают отдавать старое
+        await self._set_price(session_maker, product.id, 150)
+        async with session_maker() as session:
+            assert (await catalog.get(session, redis_mock, product.id)).price == 100
+            catalog.clear()
+            assert (await catalog.get(session, redis_mock, product.id)).price == 100
+
+            await catalog.invalidate(redis_mock, product.id)
+            assert (await catalog.get(session, redis_mock, product.id)).price == 150
+
+    async def test_missing_product_is_not_cached(self, session_maker, redis_mock):
+        catalog = ProductCatalog()
+
+        async with session_maker() as session:
+            assert await catalog.get(session, redis_mock, 777) is None
+
+        assert await redis_mock.get("product:777") is None
+        assert len(catalog.local) == 0
+
+    async def test_get_many_reads_each_tier(self, session_maker, redis_mock):
+        local = await self._create_product(session_maker, "Local")
+        remote = await self._create_product(session_maker, "Remote")
+        fresh = await self._create_product(session_maker, "Fresh")
+
+        worker = ProductCatalog()
+        async with session_maker() as session:
+            await worker.get(session, redis_mock, remote.id)
+
+        catalog = ProductCatalog()
+        async with session_maker() as session:
+            await catalog.get(session, redis_mock, local.id)
+            products = await catalog.get_many(
+                session, redis_mock, [local.id, remote.id, fresh.id, 777]
+            )
+
+        assert set(products) == {local.id, remote.id, fresh.id}
+        assert products[fresh.id].name == "Fresh"
+        assert await redis_mock.get(f"product:{fresh.id}") is not None
+
+    async def test_concurrent_misses_load_once(
+        self, session_maker, redis_mock, monkeypatch
+    ):
+        product = await self._create_product(session_maker)
+        catalog = ProductCatalog()
+
+        calls = 0
+        original = ProductRepository.get_many
+
+        async def counting_get_many(self, *args, **kwargs):
+            nonlocal calls
+            calls += 1
+            return await original(self, *args, **kwargs)
+
+        monkeypatch.setattr(ProductRepository, "get_many", counting_get_many)
+
+        async with session_maker() as session:
+            results = await asyncio.gather(
+                *(catalog.get(session, redis_mock, product.id) for _ in range(10))
+            )
+
+        assert {result.id for result in results} == {product.id}
+        assert calls == 1
+
+    async def test_invalidation_reaches_other_workers(self, session_maker, redis_mock):
+        product = await self._create_product(session_maker)
+        writer, reader = ProductCatalog(), ProductCatalog()
+
+        listener = asyncio.create_task(reader.listen(redis_mock))
+        try:
+            while not (await redis_mock.pubsub_numsub(writer.INVALIDATION_CHANNEL))[0][
+                1
+            ]:
+                await asyncio.sleep(0.01)
+
+            async with session_maker() as session:
+                await reader.get(session, redis_mock, product.id)
+            assert reader.local.get(product.id) is not None
+
+            await writer.invalidate(redis_mock, product.id)
+
+            for _ in range(100):
+                if reader.local.get(product.id) is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert reader.local.get(product.id) is None
+        finally:
+            listener.cancel()
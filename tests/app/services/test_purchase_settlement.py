@@ -0,0 +1,159 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.database.models import Inventory, Product, PurchaseRequest, User
+from app.database.models.product import ProductType
+from app.database.replica import ReadYourWrites
+from app.database.settings import DBSettings
+from app.services.purchase_queue import PurchaseQueue
+from app.services.purchase_settlement_service import PurchaseSettlementService
+from app.services.settings import PurchaseMode
+
+
+@pytest.mark.anyio
+class TestAsyncPurchase:
+    @pytest.fixture(autouse=True)
+    def async_mode(self, app_settings):
+        app_settings.services.purchase_mode = PurchaseMode.ASYNC
+        app_settings.services.purchase_claim_idle_ms = 0
+        return app_settings.services
+
+    async def _create(self, session_maker, balance=250, type_=ProductType.CONSUMABLE):
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=balance)
+            product = Product(name="p", price=100, type=type_, is_active=True)
+            session.add_all([user, product])
+            await session.commit()
+        return user, product
+
+    async def _purchase(self, client, user, product):
+        return await client.post(
+            f"api/v1/products/{product.id}/purchase", params={"user_id": user.id}
+        )
+
+    async def _settle(self, session_maker, redis_mock, settings, consumer="test"):
+        async with session_maker() as session:
+            service = PurchaseSettlementService(session, redis_mock, settings)
+            await service.queue.ensure_group()
+            return await service.settle(consumer)
+
+    async def test_accepted_then_settled(
+        self, client: AsyncClient, session_maker, redis_mock, async_mode
+    ):
+        user, product = await self._create(session_maker)
+
+        response = await self._purchase(client, user, product)
+        assert response.status_code == 202
+        purchase_id = response.json()["purchase_id"]
+
+        status = await client.get(f"api/v1/purchases/{purchase_id}")
+        assert status.json()["status"] == "pending"
+
+        # в БД ничего не изменилось до проведения
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 250
+
+        assert await self._settle(session_maker, redis_mock, async_mode) == 1
+
+        status = await client.get(f"api/v1/purchases/{purchase_id}")
+        assert status.json() == {
+            "purchase_id": purchase_id,
+            "status": "completed",
+            "user_id": user.id,
+            "product_id": product.id,
+            "amount": 100,
+            "error": None,
+        }
+
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 150
+            item = await session.scalar(
+                select(Inventory).where(Inventory.user_id == user.id)
+            )
+            assert item.quantity == 1
+
+        # после истечения статуса в Redis он читается из purchase_requests
+        await redis_mock.delete(PurchaseQueue.purchase_key(purchase_id))
+        status = await client.get(f"api/v1/purchases/{purchase_id}")
+        assert status.json()["status"] == "completed"
+
+    async def test_reservation_rejects_overspend(
+        self, client: AsyncClient, session_maker, redis_mock
+    ):
+        user, product = await self._create(session_maker, balance=250)
+
+        assert (await self._purchase(client, user, product)).status_code == 202
+        assert (await self._purchase(client, user, product)).status_code == 202
+
+        response = await self._purchase(client, user, product)
+        assert response.status_code == 409
+        assert response.json()["error"]["message"] == "Not enough funds"
+
+    async def test_failed_settlement_refunds_reservation(
+        self, client: AsyncClient, session_maker, redis_mock, async_mode
+    ):
+        user, product = await self._create(
+            session_maker, balance=500, type_=ProductType.PERMANENT
+        )
+
+        first = (await self._purchase(client, user, product)).json()["purchase_id"]
+        second = (await self._purchase(client, user, product)).json()["purchase_id"]
+        balance_key = PurchaseQueue.balance_key(user.id)
+        assert await redis_mock.hget(balance_key, "available") == "300"
+
+        assert await self._settle(session_maker, redis_mock, async_mode) == 2
+
+        completed = (await client.get(f"api/v1/purchases/{first}")).json()
+        assert completed["status"] == "completed"
+        failed = (await client.get(f"api/v1/purchases/{second}")).json()
+        assert failed["status"] == "failed"
+        assert failed["error"] == "InventoryAlreadyOwnedError"
+
+        assert await redis_mock.hgetall(balance_key) == {
+            "available": "400",
+            "pending": "0",
+        }
+        async with session_maker() as session:
+            assert (await session.get(User, user.id)).balance == 400
+
+    async def test_resumes_entries_of_crashed_worker(
+        self, client: AsyncClient, session_maker, redis_mock, async_mode
+    ):
+        user, product = await self._create(session_maker)
+        await self._purchase(client, user, product)
+
+        # воркер прочитал запись и упал, не подтвердив её
+        queue = PurchaseQueue(redis_mock, async_mode)
+        await queue.ensure_group()
+        assert len(await queue.read("crashed", 10)) == 1
+
+        assert await self._settle(session_maker, redis_mock, async_mode) == 1
+        assert await redis_mock.xlen(async_mode.purchase_stream) == 0
+
+        async with session_maker() as session:
+            purchases = list(await session.scalars(select(PurchaseRequest)))
+            assert [purchase.status for purchase in purchases] == ["completed"]
+
+    async def test_settled_users_pinned_to_primary(
+        self, client: AsyncClient, session_maker, redis_mock, async_mode
+    ):
+        user, product = await self._create(session_maker)
+        await self._purchase(client, user, product)
+        pins = ReadYourWrites(redis_mock, DBSettings(name="test"))
+
+        async with session_maker() as session:
+            service = PurchaseSettlementService(
+                session, redis_mock, async_mode, read_your_writes=pins
+            )
+            await service.queue.ensure_group()
+            assert await service.settle("test") == 1
+
+        assert await pins.pinned(user.id)
+
+    async def test_not_found_when_purchase_unknown(
+        self, client: AsyncClient, redis_mock
+    ):
+        response = await client.get("api/v1/purchases/unknown")
+
+        assert response.status_code == 404
@@ -0,0 +1,109 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from sqlalchemy import select, text
+
+from app.database.models import Product, User
+from app.database.models.transaction import Transaction, TransactionStatus
+from app.repositories.partition_repository import TransactionPartitionRepository
+from app.services.partition_service import TransactionPartitionService
+from app.services.settings import ServiceSettings
+
+
+@pytest.fixture
+async def partitions(session_maker):
+    """Партиции переживают clear_db — после теста удаляем созданные и архив."""
+    yield
+
+    async with session_maker() as session:
+        for name in await TransactionPartitionRepository(session).list_partitions():
+            if name != "transactions_default":
+                await session.execute(text(f"DROP TABLE {name}"))
+        await session.execute(text("DROP SCHEMA IF EXISTS test_archive CASCADE"))
+        await session.commit()
+
+
+@pytest.mark.anyio
+class TestTransactionPartitions:
+    settings = ServiceSettings(
+        transactions_partitions_ahead=2,
+        transactions_retention_months=6,
+        transactions_archive_schema="test_archive",
+    )
+
+    async def test_creates_current_and_future_months(self, session_maker, partitions):
+        async with session_maker() as session:
+            result = await TransactionPartitionService(session, self.settings).maintain(
+                date(2026, 11, 15)
+            )
+
+        assert result == {
+            "created": [
+                "transactions_y2026m11",
+                "transactions_y2026m12",
+                "transactions_y2027m01",
+            ],
+            "archived": [],
+        }
+
+        # повторный запуск ничего не делает
+        async with session_maker() as session:
+            result = await TransactionPartitionService(session, self.settings).maintain(
+                date(2026, 11, 20)
+            )
+        assert result == {"created": [], "archived": []}
+
+    async def test_rows_routed_to_month_partition(self, session_maker, partitions):
+        async with session_maker() as session:
+            await TransactionPartitionService(session, self.settings).maintain(
+                date(2026, 11, 1)
+            )
+
+        async with session_maker() as session:
+            user = User(username="u", email="u@test.com", balance=0)
+            product = Product(name="p", price=10, type="consumable", is_active=True)
+            session.add_all([user, product])
+            await session.flush()
+            session.add(
+                Transaction(
+                    user_id=user.id,
+                    product_id=product.id,
+                    amount=10,
+                    status=TransactionStatus.COMPLETED,
+                    created_at=datetime(2026, 12, 31, 23, 59, tzinfo=UTC),
+                )
+            )
+            await session.commit()
+
+            count = await session.scalar(
+                text("SELECT count(*) FROM transactions_y2026m12")
+            )
+            assert count == 1
+            assert len(list(await session.scalars(select(Transaction)))) == 1
+
+    async def test_archives_partitions_older_than_retention(
+        self, session_maker, partitions
+    ):
+        async with session_maker() as session:
+            repo = TransactionPartitionRepository(session)
+            await repo.create_month(date(2026, 3, 1))
+            await repo.create_month(date(2026, 5, 1))
+            await session.commit()
+
+        async with session_maker() as session:
+            result = await TransactionPartitionService(session, self.settings).maintain(
+                date(2026, 10, 18)
+            )
+
+        assert result["archived"] == ["transactions_y2026m03"]
+
+        async with session_maker() as session:
+            remaining = await TransactionPartitionRepository(session).list_partitions()
+            assert "transactions_y2026m03" not in remaining
+            assert "transactions_y2026m05" in remaining
+            assert (
+                await session.scalar(
+                    text("SELECT to_regclass('test_archive.transactions_y2026m03')")
+                )
+                is not None
+            )
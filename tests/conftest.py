@@ -1,5 +1,6 @@
 import pytest
 
+from tests.fixtures.catalog import clear_product_catalog
 from tests.fixtures.client import client
 from tests.fixtures.db import clear_db, engine, session_maker
 
@@ -10,10 +11,13 @@ __all__ = [
     "clear_db",
     "redis_mock",
     "register_test_router",
+    "app_settings",
+    "clear_product_catalog",
 ]
 
 from tests.fixtures.redis import redis_mock
 from tests.fixtures.routers import register_test_router
+from tests.fixtures.settings import app_settings
 
 
 @pytest.fixture(scope="session")
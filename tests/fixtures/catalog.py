@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_product_catalog():
+    """Локальный уровень каталога живёт в процессе — между тестами его чистим."""
+    from app.main import app
+
+    app.state.product_catalog.clear()
+    yield
+    app.state.product_catalog.clear()
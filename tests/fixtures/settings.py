@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def app_settings():
+    """Копия настроек приложения, которую тест может менять."""
+    from app.main import app
+
+    original = app.state.settings
+    app.state.settings = original.model_copy(deep=True)
+
+    yield app.state.settings
+
+    app.state.settings = original
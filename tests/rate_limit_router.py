@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from app.utils.rate_limiter import simple_rate_limit
+from app.utils.idempotency import Idempotency
+from app.utils.rate_limiter import RateLimitAlgorithm, simple_rate_limit, user_or_ip
 
 test_router = APIRouter()
 
@@ -8,3 +9,40 @@ test_router = APIRouter()
 @test_router.get("/test-rate")
 async def rate_limit_handler(_rl=Depends(simple_rate_limit(3, 60))):
     return {"ok": True}
+
+
+@test_router.get("/test-rate/users/{user_id}")
+async def rate_limit_user_handler(
+    user_id: int, _rl=Depends(simple_rate_limit(1, 60, key_func=user_or_ip))
+):
+    return {"ok": True}
+
+
+async def rate_limit_algorithm_handler():
+    return {"ok": True}
+
+
+for algorithm in RateLimitAlgorithm:
+    test_router.add_api_route(
+        f"/test-rate/{algorithm.value}",
+        rate_limit_algorithm_handler,
+        dependencies=[Depends(simple_rate_limit(2, 60, algorithm))],
+    )
+
+
+# отдельный лимитер, чтобы тест локального уровня мог сбросить его состояние
+local_rate_limit = simple_rate_limit(3, 60)
+
+
+@test_router.get("/test-rate-local")
+async def rate_limit_local_handler(_rl=Depends(local_rate_limit)):
+    return {"ok": True}
+
+
+@test_router.post("/test-idempotency")
+async def idempotency_handler(
+    response: Response, _idem=Depends(Idempotency("test", required=False))
+):
+    response.set_cookie("first", "1")
+    response.set_cookie("second", "2")
+    return {"ok": True}
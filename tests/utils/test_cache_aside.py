@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.utils.cache_aside import CacheAside
+from app.utils.single_flight import SingleFlight
+
+
+class CountingLoader:
+    def __init__(self, value="v", delay=0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+@pytest.mark.anyio
+async def test_cold_key_loaded_once_across_workers(redis_mock):
+    loader = CountingLoader()
+    # у каждого «воркера» свой SingleFlight — склеивает их только блокировка в Redis
+    workers = [
+        CacheAside(redis_mock, ttl=60, poll_interval=0.01, flights=SingleFlight())
+        for _ in range(3)
+    ]
+
+    results = await asyncio.gather(
+        *(worker.get_or_load("key", loader) for worker in workers for _ in range(5))
+    )
+
+    assert results == ["v"] * 15
+    assert loader.calls == 1
+    assert await redis_mock.get("key") == "v"
+    assert await redis_mock.get("key:lock") is None
+
+
+@pytest.mark.anyio
+async def test_stale_value_served_while_one_request_refreshes(redis_mock):
+    cache = CacheAside(redis_mock, ttl=60, stale_ttl=30)
+    await redis_mock.set("key", "old")
+    await redis_mock.set(
+        "key:meta", json.dumps({"delta": 0.01, "expiry": time.time() - 1})
+    )
+    loader = CountingLoader("new")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("key", loader) for _ in range(5))
+    )
+
+    assert sorted(results) == ["new"] + ["old"] * 4
+    assert loader.calls == 1
+    assert await redis_mock.get("key") == "new"
+    assert json.loads(await redis_mock.get("key:meta"))["expiry"] > time.time()
+
+
+@pytest.mark.anyio
+async def test_xfetch_refreshes_early_only_near_expiry(redis_mock):
+    loader = CountingLoader("new", delay=0)
+    await redis_mock.set("key", "old")
+    await redis_mock.set(
+        "key:meta", json.dumps({"delta": 1.0, "expiry": time.time() + 30})
+    )
+
+    assert (
+        await CacheAside(redis_mock, ttl=60, beta=0).get_or_load("key", loader) == "old"
+    )
+    assert loader.calls == 0
+
+    # огромный beta делает ранний пересчёт практически неизбежным
+    assert (
+        await CacheAside(redis_mock, ttl=60, beta=1e6).get_or_load("key", loader)
+        == "new"
+    )
+    assert loader.calls == 1
+
+
+@pytest.mark.anyio
+async def test_value_without_meta_is_fresh(redis_mock):
+    loader = CountingLoader()
+    await redis_mock.set("key", "raw")
+
+    assert await CacheAside(redis_mock, ttl=60).get_or_load("key", loader) == "raw"
+    assert loader.calls == 0
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.mark.anyio
+async def test_stored_response_keeps_repeated_headers(client, redis_mock):
+    response = await client.post(
+        "/api/v1/test-idempotency", headers={"Idempotency-Key": "cookies"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert len(response.headers.get_list("set-cookie")) == 2
+    assert response.cookies["first"] == "1"
+    assert response.cookies["second"] == "2"
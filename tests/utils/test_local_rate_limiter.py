@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from app.utils.rate_limiter import LocalRateLimitTier, RateLimiter
+from tests.rate_limit_router import local_rate_limit
+
+
+@pytest.fixture
+def redis_hits(monkeypatch):
+    """Считает вызовы скрипта лимитера в Redis."""
+    calls = []
+    original = RateLimiter.hit
+
+    async def counting_hit(self, redis, key, cost=None):
+        calls.append(cost)
+        return await original(self, redis, key, cost)
+
+    monkeypatch.setattr(RateLimiter, "hit", counting_hit)
+    return calls
+
+
+@pytest.fixture
+def local_tier(app_settings):
+    app_settings.api.rate_limit_local = True
+    yield
+    local_rate_limit.local_tier = None
+
+
+@pytest.mark.anyio
+async def test_over_limit_client_rejected_without_redis(
+    client, redis_mock, redis_hits, local_tier
+):
+    url = "/api/v1/test-rate-local"
+
+    statuses = [(await client.get(url)).status_code for _ in range(3)]
+    assert statuses == [200, 200, 200]
+    assert (await client.get(url)).status_code == 429
+    hits_at_block = len(redis_hits)
+
+    for _ in range(20):
+        response = await client.get(url)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+
+    assert len(redis_hits) == hits_at_block
+
+
+@pytest.mark.anyio
+async def test_lease_taken_in_batches(redis_mock, redis_hits):
+    tier = LocalRateLimitTier(RateLimiter(100, 60), max_keys=10, max_lease=10)
+
+    results = [await tier.hit(redis_mock, "key") for _ in range(50)]
+
+    assert all(result.allowed for result in results)
+    assert results[-1].remaining == 50
+    # 1, затем аренды по min(10, остаток // 2)
+    assert redis_hits[:3] == [1, 10, 10]
+    assert len(redis_hits) < 10
+
+
+@pytest.mark.anyio
+async def test_local_limit_is_shared_through_redis(redis_mock):
+    limiter = RateLimiter(10, 60)
+    workers = [LocalRateLimitTier(limiter, 10, 10) for _ in range(3)]
+
+    allowed = 0
+    for _ in range(10):
+        for worker in workers:
+            allowed += (await worker.hit(redis_mock, "key")).allowed
+
+    assert allowed == 10
+
+
+@pytest.mark.anyio
+async def test_local_block_lifts_after_retry_after(redis_mock):
+    tier = LocalRateLimitTier(RateLimiter(1, 1), max_keys=10, max_lease=10)
+
+    assert (await tier.hit(redis_mock, "key")).allowed
+    rejected = await tier.hit(redis_mock, "key")
+    assert not rejected.allowed
+
+    await asyncio.sleep(rejected.retry_after + 0.05)
+
+    assert (await tier.hit(redis_mock, "key")).allowed
+
+
+@pytest.mark.anyio
+async def test_keys_bounded():
+    tier = LocalRateLimitTier(RateLimiter(1, 60), max_keys=2, max_lease=10)
+
+    for key in ("a", "b", "c"):
+        tier.buckets.set(key, object())
+
+    assert len(tier.buckets) == 2
@@ -1,5 +1,9 @@
+import asyncio
+
 import pytest
 
+from app.utils.rate_limiter import RateLimitAlgorithm, RateLimiter
+
 
 @pytest.mark.anyio
 async def test_rate_limit(client, redis_mock):
@@ -9,3 +13,66 @@ async def test_rate_limit(client, redis_mock):
     assert (await client.get(url)).status_code == 200
     assert (await client.get(url)).status_code == 200
     assert (await client.get(url)).status_code == 429
+
+
+@pytest.mark.anyio
+async def test_rate_limit_headers(client, redis_mock):
+    url = "/api/v1/test-rate"
+
+    response = await client.get(url)
+    assert response.headers["X-RateLimit-Limit"] == "3"
+    assert response.headers["X-RateLimit-Remaining"] == "2"
+    assert 0 < int(response.headers["X-RateLimit-Reset"]) <= 60
+    assert "Retry-After" not in response.headers
+
+    await client.get(url)
+    await client.get(url)
+    response = await client.get(url)
+
+    assert response.status_code == 429
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+    assert 0 < int(response.headers["Retry-After"]) <= 120
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+async def test_rate_limit_algorithms(client, redis_mock, algorithm):
+    url = f"/api/v1/test-rate/{algorithm.value}"
+
+    statuses = [(await client.get(url)).status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+
+@pytest.mark.anyio
+async def test_rate_limit_keyed_by_user(client, redis_mock):
+    assert (await client.get("/api/v1/test-rate/users/1")).status_code == 200
+    assert (await client.get("/api/v1/test-rate/users/1")).status_code == 429
+    assert (await client.get("/api/v1/test-rate/users/2")).status_code == 200
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+async def test_rate_limit_recovers_after_retry_after(redis_mock, algorithm):
+    limiter = RateLimiter(2, 1, algorithm)
+
+    assert (await limiter.hit(redis_mock, "key")).allowed
+    assert (await limiter.hit(redis_mock, "key")).allowed
+    rejected = await limiter.hit(redis_mock, "key")
+    assert not rejected.allowed
+
+    await asyncio.sleep(rejected.retry_after + 0.05)
+
+    assert (await limiter.hit(redis_mock, "key")).allowed
+
+
+@pytest.mark.anyio
+async def test_rate_limit_sliding_log_has_no_edge_burst(redis_mock):
+    # фиксированное окно пропустило бы 2 * limit на стыке окон
+    limiter = RateLimiter(2, 1, RateLimitAlgorithm.SLIDING_LOG)
+
+    await limiter.hit(redis_mock, "key")
+    await limiter.hit(redis_mock, "key")
+    await asyncio.sleep(0.5)
+
+    assert not (await limiter.hit(redis_mock, "key")).allowed
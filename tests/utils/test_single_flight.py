@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_load():
+    flights = SingleFlight()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.do("key", loader) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert calls == 1
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.anyio
+async def test_error_propagates_to_all_waiters_and_is_not_cached():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flights.do("key", failing) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def ok():
+        return "ok"
+
+    assert await flights.do("key", ok) == "ok"
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_hands_load_to_waiter():
+    flights = SingleFlight()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    leader = asyncio.create_task(flights.do("key", loader))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(flights.do("key", loader)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    # клиент ведущего запроса отключился
+    leader.cancel()
+
+    assert await asyncio.gather(*waiters) == [2] * 3
+    assert leader.cancelled()
+    assert calls == 2
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_does_not_cancel_load():
+    flights = SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    leader = asyncio.create_task(flights.do("key", loader))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(flights.do("key", loader))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+
+    assert await leader == "ok"
+    assert waiter.cancelled()
@@ -0,0 +1,32 @@
+import pytest
+
+from app.utils import ttl_cache
+from app.utils.ttl_cache import TTLCache
+
+
+@pytest.mark.anyio
+async def test_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(1) == "a"
+    assert cache.get(2) is None
+    assert cache.get(3) == "c"
+    assert len(cache) == 2
+
+
+@pytest.mark.anyio
+async def test_expires_after_ttl(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now)
+
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set(1, "a")
+    assert cache.get(1) == "a"
+
+    now = 130.0
+    assert cache.get(1) is None
+    assert len(cache) == 0